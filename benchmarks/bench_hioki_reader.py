@@ -0,0 +1,42 @@
+"""HIOKI8847専用パーサーと pd.read_csv の読み込み速度を比較する
+
+プロジェクトのルートで実行する:
+    python -m benchmarks.bench_hioki_reader [ファイル数]
+"""
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.hioki import HIOKI_HEADER_ROWS, HIOKI_DATA_ROWS, read_hioki_data
+from tests.hioki_samples import make_sample_files
+
+def read_with_pandas(path):
+    """現行の読み込み方法"""
+    return pd.read_csv(path, skiprows=HIOKI_HEADER_ROWS, nrows=HIOKI_DATA_ROWS,
+                       encoding='shift_jis', usecols=[1]).iloc[:, 0].to_numpy()
+
+def measure(reader, paths):
+    start = time.perf_counter()
+    results = [reader(path) for path in paths]
+    return time.perf_counter() - start, results
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_sample_files(directory, file_count)
+
+        # 初回のファイルキャッシュの影響を除くため一度読んでおく
+        measure(read_hioki_data, paths)
+
+        pandas_time, pandas_results = measure(read_with_pandas, paths)
+        fast_time, fast_results = measure(read_hioki_data, paths)
+
+    identical = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(pandas_results, fast_results))
+    print(f"ファイル数: {file_count}")
+    print(f"pd.read_csv : {pandas_time:.3f} 秒")
+    print(f"read_hioki_data: {fast_time:.3f} 秒 ({pandas_time / fast_time:.1f} 倍)")
+    print(f"結果の一致: {identical}")
+
+if __name__ == '__main__':
+    main()
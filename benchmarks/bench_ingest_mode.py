@@ -0,0 +1,38 @@
+"""CSVImporter の読み込みモード（ingest_mode）ごとの読み込み時間を比較する
+
+プロジェクトのルートで実行する:
+    python -m benchmarks.bench_ingest_mode [ファイル数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from src.csvimport import CSVImporter, INGEST_MODES, READERS
+from tests.hioki_samples import make_sample_files
+
+def measure(importer, directory, files, repeat=3):
+    """read_data_columns の最短時間（進行状況の表示は除く）"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            importer.read_data_columns(directory, files)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        make_sample_files(directory, file_count)
+        files = sorted(os.listdir(directory))
+        print(f"ファイル数: {file_count}, CPU数: {os.cpu_count()}")
+        for reader in READERS:
+            for ingest_mode in INGEST_MODES:
+                importer = CSVImporter(directory, ingest_mode=ingest_mode, reader=reader)
+                print(f"{reader:6s} {ingest_mode:7s}: {measure(importer, directory, files):.3f} 秒")
+
+if __name__ == '__main__':
+    main()
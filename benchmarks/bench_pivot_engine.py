@@ -0,0 +1,77 @@
+"""ピボット処理の pandas 方式と NumPy 方式の速度・メモリ使用量を比較する
+
+プロジェクトのルートで実行する:
+    python -m benchmarks.bench_pivot_engine [サンプル数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.csvpivot import CSVPivot
+
+SAMPLE_TYPES = ['HEL_TOP', 'HEL_ZENGO', 'BICYCLE', 'BASEBALL']
+
+def make_merged_file(path, sample_count, row_count=2501):
+    """CSVImporter が出力するものと同じ形式の結合済みCSVを作成する"""
+    rng = np.random.default_rng(0)
+    data = {'Time': np.arange(row_count) * 5e-05 - 0.0125}
+    for index in range(sample_count):
+        name = f"{index // len(SAMPLE_TYPES) + 1:04d}{SAMPLE_TYPES[index % len(SAMPLE_TYPES)]}"
+        data[name] = rng.normal(0, 0.1, row_count).round(5)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+def measure(pivot, input_path, output_path):
+    """ピボットの時間と書き出しの時間、およびピボット中のメモリ使用量のピークを測る"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        df = pivot.pivot_file(input_path)
+        pivot_time = time.perf_counter() - start
+
+        # tracemalloc は処理を遅くするため、時間とは別に測る
+        tracemalloc.start()
+        pivot.pivot_file(input_path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    df.to_csv(output_path, encoding='cp932', index=False)
+    write_time = time.perf_counter() - start
+    return pivot_time, write_time, peak
+
+def main():
+    sample_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'InspectionLOG.CSV')
+        make_merged_file(input_path, sample_count)
+
+        results = {}
+        outputs = {}
+        for engine in ('pandas', 'numpy'):
+            # 2回目以降がキャッシュから読み込まれないようにする
+            pivot = CSVPivot(directory, engine=engine, cache=False)
+            outputs[engine] = os.path.join(directory, f"Output_{engine}.CSV")
+            # 初回のインポートやファイルキャッシュの影響を除くため一度実行しておく
+            measure(pivot, input_path, outputs[engine])
+            results[engine] = measure(pivot, input_path, outputs[engine])
+
+        with open(outputs['pandas'], 'rb') as f:
+            expected = f.read()
+        with open(outputs['numpy'], 'rb') as f:
+            identical = f.read() == expected
+
+    print(f"サンプル数: {sample_count}")
+    for engine, (pivot_time, write_time, peak) in results.items():
+        print(f"{engine:6}: ピボット {pivot_time:.3f} 秒 / 書き出し {write_time:.3f} 秒 / "
+              f"ピボット中のメモリ最大 {peak / 1024 / 1024:.1f} MB")
+    pandas_pivot, _, pandas_peak = results['pandas']
+    numpy_pivot, _, numpy_peak = results['numpy']
+    print(f"ピボット速度: {pandas_pivot / numpy_pivot:.1f} 倍 / メモリ: {numpy_peak / pandas_peak:.0%}")
+    print(f"出力の一致: {identical}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Excelシートへの転記の、従来の1セルずつの方式とシートごとにまとめる方式の速度を比較する
+
+tests/test_data/templates の4つのテンプレートそれぞれに、テンプレートにある
+LOG_ シートの種類のサンプルを転記する。プロジェクトのルートで実行する:
+    python -m benchmarks.bench_sheet_writer [サンプル数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import openpyxl
+import pandas as pd
+from benchmarks.bench_pivot_engine import make_merged_file
+from src.csvpivot import CSVPivot
+from src.csvtoxlsxconverter import (filter_data, get_sheet_name, find_start_row, write_data_to_sheet,
+                                    write_block_to_sheet)
+
+TEMPLATE_DIRECTORY = os.path.join('tests', 'test_data', 'templates')
+
+def make_pivot_output(sample_count):
+    """ピボット処理の出力と同じ形式のデータを作る"""
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'InspectionLOG.CSV')
+        make_merged_file(input_path, sample_count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CSVPivot(directory, cache=False).pivot_file(input_path)
+
+def write_cell_by_cell(workbook, filtered_data):
+    """従来の方式（1行ずつ DataFrame にして1セルずつ転記）"""
+    for _, row in filtered_data.iterrows():
+        sheet = workbook[get_sheet_name(row.iloc[1])]
+        write_data_to_sheet(sheet, pd.DataFrame([row]), find_start_row(sheet, 2), 2)
+
+def write_by_sheet(workbook, filtered_data):
+    """シートごとにまとめて転記する方式"""
+    sheet_names = filtered_data.iloc[:, 1].map(get_sheet_name)
+    for sheet_name in dict.fromkeys(sheet_names):
+        block = filtered_data[(sheet_names == sheet_name).to_numpy()]
+        write_block_to_sheet(workbook[sheet_name], block.to_numpy(dtype=object).tolist(), 2)
+
+def sheet_values(workbook, sheet_names):
+    """比較用にシートの値を取り出す（NaN は None とみなす）"""
+    return {name: [tuple(None if value != value else value for value in row)
+                   for row in workbook[name].iter_rows(values_only=True)]
+            for name in sheet_names}
+
+def main():
+    sample_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    filtered_data = filter_data(make_pivot_output(sample_count))
+    sheet_names = filtered_data.iloc[:, 1].map(get_sheet_name)
+
+    print(f"サンプル数: {sample_count}")
+    for template_file in sorted(os.listdir(TEMPLATE_DIRECTORY)):
+        template_path = os.path.join(TEMPLATE_DIRECTORY, template_file)
+        workbooks = {}
+        times = {}
+        for method, write in (('cell', write_cell_by_cell), ('sheet', write_by_sheet)):
+            workbook = openpyxl.load_workbook(template_path, keep_vba=True)
+            # テンプレートにあるシートのサンプルだけを転記する
+            data = filtered_data[sheet_names.isin(workbook.sheetnames).to_numpy()]
+            start = time.perf_counter()
+            write(workbook, data)
+            times[method] = time.perf_counter() - start
+            workbooks[method] = workbook
+
+        used = sorted(set(sheet_names[sheet_names.isin(workbooks['cell'].sheetnames)]))
+        identical = sheet_values(workbooks['cell'], used) == sheet_values(workbooks['sheet'], used)
+        print(f"{template_file}: {len(data)} 行 / 1セルずつ {times['cell']:.2f} 秒 / "
+              f"シートごと {times['sheet']:.2f} 秒 ({times['cell'] / times['sheet']:.1f} 倍) / 一致: {identical}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Excelファイルの出力を、openpyxl で読み込んで保存する方式と zip パッケージとして扱う方式で比較する
+
+tests/test_data/templates の4つのテンプレートそれぞれに、テンプレートにある
+LOG_ シートの種類のサンプルを転記して保存し、時間・ファイルサイズ・転記した
+値の一致と、テンプレートのパーツ（マクロ・図形など）が残っているかを表示する。
+プロジェクトのルートで実行する:
+    python -m benchmarks.bench_workbook_writer [サンプル数]
+"""
+import os
+import sys
+import tempfile
+import time
+import zipfile
+import openpyxl
+from benchmarks.bench_sheet_writer import TEMPLATE_DIRECTORY, make_pivot_output, sheet_values
+from src.csvtoxlsxconverter import filter_data, get_sheet_name, load_template, fill_workbook
+from src.convert_options import WORKBOOK_WRITERS
+
+def template_parts_kept(template_path, output_path):
+    """テンプレートのパーツのうち、出力に同じ内容で残っているものの数"""
+    with zipfile.ZipFile(template_path) as template, zipfile.ZipFile(output_path) as output:
+        names = set(output.namelist())
+        return sum(1 for name in template.namelist() if name in names and template.read(name) == output.read(name))
+
+def main():
+    sample_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    filtered_data = filter_data(make_pivot_output(sample_count))
+    sheet_names = filtered_data.iloc[:, 1].map(get_sheet_name)
+
+    print(f"サンプル数: {sample_count}")
+    with tempfile.TemporaryDirectory() as directory:
+        for template_file in sorted(os.listdir(TEMPLATE_DIRECTORY)):
+            template_path = os.path.join(TEMPLATE_DIRECTORY, template_file)
+            with zipfile.ZipFile(template_path) as template:
+                part_count = len(template.namelist())
+            results = {}
+            for writer in WORKBOOK_WRITERS:
+                output_path = os.path.join(directory, f'{writer}_{template_file}')
+                start = time.perf_counter()
+                workbook = load_template(template_path, writer)
+                # テンプレートにあるシートのサンプルだけを転記する
+                data = filtered_data[sheet_names.isin(workbook.sheetnames).to_numpy()]
+                used = fill_workbook(workbook, data)
+                workbook.save(output_path)
+                workbook.close()
+                elapsed = time.perf_counter() - start
+                results[writer] = (elapsed, output_path, used)
+
+            used = sorted(results['openpyxl'][2])
+            values = {writer: sheet_values(openpyxl.load_workbook(path), used) for writer, (_, path, _) in results.items()}
+            identical = values['openpyxl'] == values['package']
+            print(f"{template_file}: {len(data)} 行 / 一致: {identical}")
+            for writer, (elapsed, path, _) in results.items():
+                print(f"  {writer:8s} {elapsed:6.2f} 秒 / {os.path.getsize(path) / 1024:8.0f} KB / "
+                      f"そのまま残ったパーツ {template_parts_kept(template_path, path)}/{part_count}")
+
+if __name__ == '__main__':
+    main()
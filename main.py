@@ -1,10 +1,21 @@
 import os
+import time
 import logging
+import argparse
+import functools
 from datetime import datetime
 from pathlib import Path
+# 引数の解析に使う定数だけを読み込む（pandas・openpyxl は各処理の実行時に読み込む）
+from src.convert_options import (DECIMATION_METHODS, DEFAULT_DECIMATION_METHOD, DEFAULT_OUTPUT_MODE,
+                                 DEFAULT_WORKBOOK_WRITER, OUTPUT_MODES, WORKBOOK_WRITERS)
+
+# 中間モードで確認用に保存する中間ファイルのフォルダ
+INTERMEDIATE_DIRECTORY = 'INTERMEDIATE'
 
 class GraphGenerationController:
-    def __init__(self):
+    def __init__(self, convert_options=None):
+        # XLSXコンバートに渡す設定（波形の間引きなど）
+        self.convert_options = convert_options or {}
         self.setup_logging()
         self.setup_paths()
 
@@ -63,7 +74,70 @@ class GraphGenerationController:
             # 3. XLSXコンバート
             self.logger.info("XLSXコンバート処理を開始")
             from src.csvtoxlsxconverter import main as csv_to_xlsx_main
-            csv_to_xlsx_main()
+            csv_to_xlsx_main(**self.convert_options)
+
+            self.logger.info("全てのプロセスが正常に完了しました")
+
+        except Exception as e:
+            self.logger.error(f"予期せぬエラーが発生しました: {str(e)}", exc_info=True)
+            raise
+
+    def run_fused(self, keep_intermediates=False):
+        """各処理段の結果をファイルを経由せず、メモリ上で次の処理段に渡して実行する
+
+        CSVフォルダとOUTPUTフォルダへの書き出し・読み込みを省く。CSV_LOG への
+        アーカイブは通常通り保存する。keep_intermediates を指定すると、確認用に
+        結合結果とピボット結果を INTERMEDIATE フォルダにも保存する。
+        """
+        try:
+            self.logger.info("グラフ生成プロセスを開始します（メモリ上で受け渡し）")
+            import pandas as pd
+            from src.csvimport import CSVImporter, source_roots_from_env
+            from src.csvpivot import CSVPivot
+            from src.csvtoxlsxconverter import write_workbook
+            from src.retention import RetentionPolicy
+
+            importer = CSVImporter(self.base_path, source_roots=source_roots_from_env(), save_merged=False)
+            pivot = CSVPivot(self.base_path)
+            intermediate_dir = os.path.join(self.base_path, INTERMEDIATE_DIRECTORY)
+
+            # 1. CSVインポート
+            self.logger.info("CSVインポートを開始")
+            importer.cleanup_old_files(30)
+            for directory in importer.iter_available_directories():
+                importer.process_directory(directory)
+            merged_frames = importer.take_merged_frames()
+            if not merged_frames:
+                self.logger.warning("取り込んだデータがありません")
+                return
+
+            try:
+                # 2. CSVピボット
+                self.logger.info("CSVピボット処理を開始")
+                pivot.cleanup_old_files(30)
+                if os.path.isdir(intermediate_dir):
+                    pivot.cleanup_old_files(policies={intermediate_dir: RetentionPolicy(max_age_days=30)})
+                outputs = []
+                summaries = []
+                for filename, merged in merged_frames:
+                    df_final, summary = pivot.pivot_frame_with_summary(merged)
+                    if keep_intermediates:
+                        self.save_intermediates(pivot, intermediate_dir, filename, merged, df_final)
+                    outputs.append(df_final)
+                    if summary is not None:
+                        summaries.append(summary)
+
+                # 3. XLSXコンバート
+                self.logger.info("XLSXコンバート処理を開始")
+                write_workbook(self.base_path, pd.concat(outputs, ignore_index=True),
+                               summary=pd.concat(summaries, ignore_index=True) if summaries else None,
+                               **self.convert_options)
+
+            except BaseException:
+                # 中断やテンプレート不足での終了（SystemExit）の場合も、通常の処理で
+                # 続きから処理できるよう取り込んだデータをCSVフォルダに保存しておく
+                importer.save_merged_frames(merged_frames)
+                raise
 
             self.logger.info("全てのプロセスが正常に完了しました")
 
@@ -71,9 +145,126 @@ class GraphGenerationController:
             self.logger.error(f"予期せぬエラーが発生しました: {str(e)}", exc_info=True)
             raise
 
-def main():
-    controller = GraphGenerationController()
-    controller.run_process()
+    def save_intermediates(self, pivot, intermediate_dir, filename, merged, df_final):
+        """確認用に結合結果とピボット結果を保存する（他の処理段は読み込まない）"""
+        os.makedirs(intermediate_dir, exist_ok=True)
+        merged_path = os.path.join(intermediate_dir, filename)
+        merged.to_csv(merged_path, index=False)
+        pivot.retention.register(merged_path)
+        pivot.save_dataframe_with_sequence(df_final, 'Output_' + filename, intermediate_dir)
+
+    def run_watch(self, poll_interval=5.0, settle_time=3.0, use_inotify=True):
+        """HIOKIディレクトリを監視し、届いたファイルを小さなまとまりごとに処理し続ける
+
+        ファイルの追加が settle_time 秒止まったディレクトリから順に、インポート・
+        ピボット・XLSXコンバートを実行する。各モジュールは最初に一度だけ
+        読み込み、pandas/openpyxl の読み込み時間を毎回払わないようにする。
+        """
+        from src.csvimport import CSVImporter, source_roots_from_env
+        from src.csvpivot import CSVPivot
+        from src.csvtoxlsxconverter import main as csv_to_xlsx_main
+        from src.watcher import create_watcher, settled_directories
+
+        importer = CSVImporter(self.base_path, source_roots=source_roots_from_env())
+        pivot = CSVPivot(self.base_path)
+        importer.cleanup_old_files(30)
+        pivot.cleanup_old_files(30)
+
+        watcher = create_watcher(use_inotify)
+        self.logger.info(f"監視モードを開始します（{type(watcher).__name__}）")
+        # ディレクトリごとの最後に変更を検出した時刻
+        last_changed = {}
+
+        try:
+            while True:
+                # 新しく接続されたドライブのHIOKIディレクトリを監視対象に加える
+                for directory in importer.iter_available_directories():
+                    if directory not in watcher:
+                        self.logger.info(f"監視を開始: {directory}")
+                        watcher.add(directory)
+                        last_changed[directory] = time.monotonic()
+
+                for directory in watcher.wait(poll_interval):
+                    last_changed[directory] = time.monotonic()
+
+                ready = settled_directories(last_changed, time.monotonic(), settle_time)
+                self.run_micro_batch(ready, importer, pivot,
+                                     functools.partial(csv_to_xlsx_main, **self.convert_options))
+
+        except KeyboardInterrupt:
+            self.logger.info("監視モードを終了します")
+        finally:
+            watcher.close()
+            importer.archiver.wait()
+
+    def run_micro_batch(self, directories, importer, pivot, csv_to_xlsx_main):
+        """変更の落ち着いたディレクトリを取り込み、ピボットとXLSXコンバートまで行う"""
+        directories = [directory for directory in directories if has_csv_files(directory)]
+        if not directories:
+            return
+
+        try:
+            self.logger.info(f"マイクロバッチを開始: {directories}")
+            imported = False
+            for directory in directories:
+                if importer.process_directory(directory):
+                    imported = True
+            if not imported:
+                self.logger.warning("csvインポートでエラーが発生しました")
+                return
+
+            pivot.process_files()
+            csv_to_xlsx_main()
+            self.logger.info("マイクロバッチが完了しました")
+
+        except Exception as e:
+            # 監視は続けるため、エラーを記録して次のまとまりを待つ
+            self.logger.error(f"マイクロバッチでエラーが発生しました: {str(e)}", exc_info=True)
+
+def has_csv_files(directory):
+    """ディレクトリに未処理のCSVファイルがあるか"""
+    try:
+        return any(f.endswith('.CSV') for f in os.listdir(directory))
+    except OSError:
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HIOKIのCSVデータからグラフ作成用ファイルを生成する')
+    parser.add_argument('--fused', action='store_true', help='中間ファイルを書き出さず、各処理段の結果をメモリ上で受け渡す')
+    parser.add_argument('--keep-intermediates', action='store_true', help='--fused の場合も確認用に中間ファイルを保存する')
+    parser.add_argument('--watch', action='store_true', help='HIOKIディレクトリを監視して届いたファイルを順次処理する')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='監視の確認間隔（秒）')
+    parser.add_argument('--settle-time', type=float, default=3.0, help='ファイルの追加が止まってから処理するまでの時間（秒）')
+    parser.add_argument('--no-inotify', action='store_true', help='inotify を使わずポーリングで監視する')
+    parser.add_argument('--decimate', type=int, metavar='POINTS',
+                        help='Excelに転記する前に各ショットの波形をこの点数程度に間引く（最大値・最小値は残す）')
+    parser.add_argument('--decimation', choices=DECIMATION_METHODS, default=DEFAULT_DECIMATION_METHOD,
+                        help='間引きの方式（minmax: 区間ごとの最大・最小, lttb: 波形の形を保つ）')
+    parser.add_argument('--workbook-writer', choices=WORKBOOK_WRITERS, default=DEFAULT_WORKBOOK_WRITER,
+                        help='Excelの出力方式（openpyxl: テンプレート全体を読み込んで保存, '
+                             'package: 転記するシートのXMLだけを作り直して他はそのままコピー）')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default=DEFAULT_OUTPUT_MODE,
+                        help='Excelファイルの分け方（single: 全カテゴリを1ファイル, category: カテゴリごとに別プロセスで別ファイル）')
+    parser.add_argument('--template-cache', action='store_true',
+                        help='読み込み済みのテンプレートをメモリ上に残し、監視モードの次回の変換から複製を使う')
+    args = parser.parse_args(argv)
+
+    convert_options = {}
+    if args.decimate is not None:
+        convert_options = {'target_points': args.decimate, 'decimation': args.decimation}
+    if args.workbook_writer != DEFAULT_WORKBOOK_WRITER:
+        convert_options['workbook_writer'] = args.workbook_writer
+    if args.template_cache:
+        convert_options['template_cache'] = True
+    if args.output_mode != DEFAULT_OUTPUT_MODE:
+        convert_options['output_mode'] = args.output_mode
+    controller = GraphGenerationController(convert_options)
+    if args.watch:
+        controller.run_watch(args.poll_interval, args.settle_time, use_inotify=not args.no_inotify)
+    elif args.fused:
+        controller.run_fused(keep_intermediates=args.keep_intermediates)
+    else:
+        controller.run_process()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,98 @@
+import gzip
+import lzma
+import os
+import threading
+import traceback
+
+# 保存形式と拡張子（'copy' は従来通り無圧縮）
+# 'lzma' は pd.read_csv がそのまま読めるよう .xz 形式で保存する
+ARCHIVE_MODES = {
+    'copy': '',
+    'gzip': '.gz',
+    'xz': '.xz',
+    'lzma': '.xz',
+}
+
+def archive_filename(filename, mode):
+    """保存形式に応じたアーカイブのファイル名を返す"""
+    return filename + ARCHIVE_MODES[mode]
+
+def archive_mode_of(path):
+    """拡張子からアーカイブの保存形式を判定する"""
+    for mode, extension in ARCHIVE_MODES.items():
+        if extension and path.lower().endswith(extension):
+            return mode
+    return 'copy'
+
+def open_archive(path, mode='rb', archive_mode=None, **kwargs):
+    """圧縮の有無を意識せずにアーカイブを開く（pd.read_csv も拡張子から自動判定する）"""
+    archive_mode = archive_mode or archive_mode_of(path)
+    if archive_mode == 'gzip':
+        return gzip.open(path, mode, **kwargs)
+    if archive_mode in ('xz', 'lzma'):
+        return lzma.open(path, mode, format=lzma.FORMAT_XZ, **kwargs)
+    return open(path, mode, **kwargs)
+
+def find_archive(directory, filename):
+    """いずれかの保存形式で存在するアーカイブのパスを返す（無ければNone）"""
+    for extension in dict.fromkeys(ARCHIVE_MODES.values()):
+        path = os.path.join(directory, filename + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+def write_archive(data, path):
+    """バイト列を拡張子に応じた形式で保存する（書き終わってから置き換える）"""
+    temp_path = path + '.part'
+    archive_mode = archive_mode_of(path)
+    if archive_mode == 'gzip':
+        payload = gzip.compress(data)
+    elif archive_mode in ('xz', 'lzma'):
+        payload = lzma.compress(data, format=lzma.FORMAT_XZ)
+    else:
+        payload = data
+    with open(temp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(temp_path, path)
+
+class ArchiveWriter:
+    """CSV_LOG へのアーカイブをバックグラウンドで書き出す"""
+
+    def __init__(self, on_saved=None):
+        self.threads = []
+        # 保存完了時に保存先のパスを受け取る関数（保持期間インデックスへの登録など）
+        self.on_saved = on_saved
+
+    def submit(self, data, path, on_complete=None):
+        """書き出しを開始してすぐに戻る（次の処理と並行して圧縮・保存する）
+
+        on_complete は保存し終えた後にだけ書き出し用のスレッドで呼ぶ（元ファイルの
+        削除など、アーカイブが無ければ行えない処理）。保存できなかった場合は呼ばない。
+        """
+        thread = threading.Thread(target=self.run, args=(data, path, on_complete))
+        thread.start()
+        self.threads.append(thread)
+        return thread
+
+    def run(self, data, path, on_complete=None):
+        try:
+            write_archive(data, path)
+        except Exception as e:
+            print(f"アーカイブ保存でエラー: {str(e)}")
+            print(traceback.format_exc())
+            return
+        print(f"アーカイブを保存: {os.path.basename(path)}")
+        try:
+            if self.on_saved:
+                self.on_saved(path)
+            if on_complete:
+                on_complete()
+        except Exception as e:
+            print(f"アーカイブ保存後の処理でエラー: {str(e)}")
+            print(traceback.format_exc())
+
+    def wait(self):
+        """書き出し中のアーカイブがすべて保存されるまで待つ"""
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
@@ -0,0 +1,14 @@
+# XLSXコンバートの設定の選択肢と既定値
+# main.py のコマンドライン引数の解析でも使うため、pandas・openpyxl などを読み込まない
+
+# 間引きの方式: 'minmax'（区間ごとの最大・最小）, 'lttb'（Largest-Triangle-Three-Buckets）
+DECIMATION_METHODS = ('minmax', 'lttb')
+DEFAULT_DECIMATION_METHOD = 'minmax'
+
+# Excel出力の方式: 'openpyxl'（テンプレート全体を読み込んで保存）, 'package'（転記するシートのXMLだけを作り直す）
+WORKBOOK_WRITERS = ('openpyxl', 'package')
+DEFAULT_WORKBOOK_WRITER = 'openpyxl'
+
+# 出力モード: 'single'（全カテゴリを1つのファイルに）, 'category'（カテゴリごとに別のプロセスで別のファイルに）
+OUTPUT_MODES = ('single', 'category')
+DEFAULT_OUTPUT_MODE = 'single'
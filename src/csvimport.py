@@ -1,45 +1,283 @@
 import os
+import sys
+import types
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import shutil
 import traceback
+import csv
+import glob
+import queue
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, ProcessPoolExecutor
+
+if not __package__:
+    # run_csv_script.ps1 のようにスクリプトとして直接実行された場合も src.* を読み込めるようにする
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    if os.path.basename(script_directory) == 'src':
+        sys.path.insert(0, os.path.dirname(script_directory))
+    elif 'src' not in sys.modules:
+        # Scripts フォルダに平置きで配置されている場合は、そのフォルダを src パッケージとして扱う
+        sys.modules['src'] = types.ModuleType('src')
+        sys.modules['src'].__path__ = [script_directory]
+
+from src.local_cache import local_state_path
+from src.manifest import ImportManifest
+from src.sequence import allocate_filename, release_filename, sequence_hints_path
+from src.retention import RetentionIndex, RetentionPolicy
+from src.archive import ARCHIVE_MODES, ArchiveWriter, archive_filename, find_archive, open_archive, write_archive
+from src.hioki import HIOKI_HEADER_ROWS, HIOKI_DATA_ROWS, HIOKI_DATA_TIME_OFFSET, read_hioki_time, read_hioki_data
+
+# 読み込みモード: 'serial'（逐次）, 'thread'（スレッドプール）, 'process'（プロセスプール）
+# ローカルのディスクでは並列にしても速くならない（benchmarks/bench_ingest_mode.py）ため逐次を既定とする。
+# 読み込みの待ち時間が長いドライブでは 'thread' を指定する
+INGEST_MODES = ('serial', 'thread', 'process')
+DEFAULT_INGEST_MODE = 'serial'
+# None の場合は CPU 数から決定する
+DEFAULT_MAX_WORKERS = None
+
+# 結合モード: 'memory'（DataFrameで結合）, 'stream'（1行ずつ書き出し、メモリ使用量一定）
+MERGE_MODES = ('memory', 'stream')
+DEFAULT_MERGE_MODE = 'memory'
+# ストリーミング結合で同時に開く元ファイル数の上限（OSの上限を超えないよう、超える場合はグループに分けて結合する）
+STREAM_MERGE_FAN_IN = 256
+
+# HIOKIディレクトリを探すソースルート（ドライブレターまたはマウントポイント、ワイルドカード可）
+DEFAULT_SOURCE_ROOTS = ['S:', 'U:', 'T:', '/media/*/*', '/run/media/*/*', '/mnt/*']
+HIOKI_DIRECTORY_NAME = 'HIOKI8847'
+# 切断されたドライブで待たされないよう、ソースごとの確認時間に上限を設ける（秒）
+DEFAULT_DISCOVERY_TIMEOUT = 3.0
+
+# 取り込み済みファイルの記録（local_state_path で利用者ごとのローカルのフォルダに置く）と保持日数
+MANIFEST_FILENAME = 'import_manifest.json'
+MANIFEST_RETENTION_DAYS = 90
+
+# CSV_LOG への保存形式: 'copy'（無圧縮）, 'gzip', 'xz', 'lzma'
+DEFAULT_ARCHIVE_MODE = 'copy'
+
+# 読み込み方式: 'fast'（HIOKI8847専用パーサー）, 'pandas'（pd.read_csv）
+READERS = ('fast', 'pandas')
+DEFAULT_READER = 'fast'
+
+def read_data_column(file_path):
+    """HIOKIファイルのB列データを読み込む（プロセスプールから呼べるようモジュール関数とする）"""
+    return pd.read_csv(
+        file_path,
+        skiprows=HIOKI_HEADER_ROWS,
+        nrows=HIOKI_DATA_ROWS,
+        encoding='shift_jis',
+        usecols=[1]
+    )
+
+def skip_lines(handle, count):
+    """ファイル先頭の指定行数をバイト単位で読み飛ばす"""
+    for _ in range(count):
+        if not handle.readline():
+            break
+
+def read_field(handle, column):
+    """次の空でない行から指定列の値を取り出す（ファイル終端ならNone）"""
+    while True:
+        line = handle.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if line:
+            break
+    fields = line.split(b',')
+    if column >= len(fields):
+        return b''
+    return fields[column].strip().strip(b'"')
+
+def format_value(value):
+    """DataFrame.to_csv と同じ表記で数値を文字列にする（欠損は空欄）"""
+    if not value:
+        return ''
+    return repr(float(value))
+
+def open_data_file(file_path):
+    """B列を読むためにHIOKIファイルを開く（pd.read_csv(skiprows=8) と同じくヘッダー行の次の行も読み飛ばす）"""
+    handle = open(file_path, 'rb')
+    skip_lines(handle, HIOKI_HEADER_ROWS + HIOKI_DATA_TIME_OFFSET)
+    return handle
+
+def read_data_rows(handles):
+    """各ファイルのB列の値を、1行ずつ表記済みの文字列のリストで返す
+
+    全ファイルが終端に達するか HIOKI_DATA_ROWS 行を返したところで終わる。
+    """
+    for _ in range(HIOKI_DATA_ROWS):
+        values = [read_field(handle, 1) for handle in handles]
+        if all(value is None for value in values):
+            return
+        yield [format_value(value) for value in values]
+
+def merge_column_block(directory, files):
+    """ファイルのグループのB列を一時ファイルにまとめる（1行にグループ分の値をカンマ区切りで書く）"""
+    block = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+    with ExitStack() as stack:
+        handles = [stack.enter_context(open_data_file(os.path.join(directory, file))) for file in files]
+        for values in read_data_rows(handles):
+            block.write(','.join(values) + '\n')
+    block.seek(0)
+    return block
+
+def read_block_rows(blocks, widths):
+    """merge_column_block の一時ファイルを並べて読み、read_data_rows と同じ行を返す"""
+    while True:
+        lines = [block.readline() for block in blocks]
+        if not any(lines):
+            return
+        row = []
+        for line, width in zip(lines, widths):
+            # 先に終端に達したグループは欠損（空欄）とする
+            row.extend(line.rstrip('\n').split(',') if line else [''] * width)
+        yield row
+
+class TeeWriter:
+    """書き込みを複数のファイルに同時に行う"""
+
+    def __init__(self, *handles):
+        self.handles = handles
+
+    def write(self, text):
+        for handle in self.handles:
+            handle.write(text)
+
+def hioki_directory(root):
+    """ソースルートに対応するHIOKIディレクトリのパスを返す"""
+    if root.endswith(':'):
+        # ドライブレターは従来通り "S:\\HIOKI8847" の形にする
+        return f"{root}\\{HIOKI_DIRECTORY_NAME}"
+    return os.path.join(root, HIOKI_DIRECTORY_NAME)
+
+def probe_source_root(root):
+    """1つのソースルートから存在するHIOKIディレクトリを探す"""
+    if any(char in root for char in '*?['):
+        candidates = sorted(glob.glob(root))
+    else:
+        candidates = [root]
+    return [directory for directory in map(hioki_directory, candidates) if os.path.isdir(directory)]
+
+def build_merged_frame(time_values, data_columns, column_names):
+    """Time列と各ファイルのデータ列から結合済みのDataFrameを作る（長さが足りない部分は欠損）"""
+    row_count = max([len(time_values)] + [len(values) for values in data_columns])
+    merged = np.full((row_count, len(column_names)), np.nan)
+    for index, values in enumerate([time_values] + data_columns):
+        merged[:len(values), index] = values
+    return pd.DataFrame(merged, columns=column_names)
 
 class CSVImporter:
-    def __init__(self, base_directory=None):
+    def __init__(self, base_directory=None, ingest_mode=DEFAULT_INGEST_MODE, max_workers=DEFAULT_MAX_WORKERS,
+                 merge_mode=DEFAULT_MERGE_MODE, reader=DEFAULT_READER, source_roots=None,
+                 discovery_timeout=DEFAULT_DISCOVERY_TIMEOUT, use_manifest=True,
+                 archive_mode=DEFAULT_ARCHIVE_MODE, save_merged=True):
         self.base_directory = base_directory or os.path.abspath(os.path.join(os.getcwd(), os.pardir))
         self.save_directory = os.path.join(self.base_directory, 'CSV')
         self.copy_directory = os.path.join(self.base_directory, 'CSV_LOG')
-        self.drive_letters = ['S:', 'U:', 'T:']
+        self.source_roots = list(source_roots or DEFAULT_SOURCE_ROOTS)
+        self.discovery_timeout = discovery_timeout
+        # 確認中のソースルート（応答しないドライブを重ねて確認しないため）
+        self.probing = set()
+
+        if ingest_mode not in INGEST_MODES:
+            raise ValueError(f"不明な読み込みモードです: {ingest_mode}")
+        self.ingest_mode = ingest_mode
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+
+        if merge_mode not in MERGE_MODES:
+            raise ValueError(f"不明な結合モードです: {merge_mode}")
+        self.merge_mode = merge_mode
+
+        if reader not in READERS:
+            raise ValueError(f"不明な読み込み方式です: {reader}")
+        self.reader = reader
+
+        if archive_mode not in ARCHIVE_MODES:
+            raise ValueError(f"不明な保存形式です: {archive_mode}")
+        self.archive_mode = archive_mode
+
+        # 保存したファイルは保持期間インデックスに登録し、古いファイルの削除に使う
+        self.retention = RetentionIndex(self.base_directory)
+        self.archiver = ArchiveWriter(on_saved=self.retention.register)
+
+        # False の場合は結合結果をCSVフォルダに保存せず merged_frames に保持し、
+        # 次の処理段にメモリ上で渡す（CSV_LOG へのアーカイブは保存する）
+        self.save_merged = save_merged
+        self.merged_frames = []
+
+        # 取り込み済みファイルの記録（無効にした場合は毎回すべて取り込む）
+        self.manifest = ImportManifest(local_state_path(self.base_directory, MANIFEST_FILENAME)) if use_manifest else None
 
         # 必要なディレクトリの作成
         os.makedirs(self.save_directory, exist_ok=True)
         os.makedirs(self.copy_directory, exist_ok=True)
 
     def get_available_directories(self):
-            """利用可能なHIOKIディレクトリを取得"""
+        """利用可能なHIOKIディレクトリを取得"""
+        try:
+            available_dirs = list(self.iter_available_directories())
+            print(f"見つかったUSBディレクトリ: {available_dirs}")
+            return available_dirs
+        except Exception as e:
+            print(f"ディレクトリ取得でエラー: {str(e)}")
+            print(traceback.format_exc())
+            raise
+
+    def iter_available_directories(self):
+        """各ソースルートを同時に確認し、見つかったHIOKIディレクトリから順に返す"""
+        results = queue.Queue()
+
+        def probe(root):
+            try:
+                results.put((root, probe_source_root(root)))
+            except OSError as e:
+                print(f"ソースの確認でエラー: {root} - {str(e)}")
+                results.put((root, []))
+            finally:
+                self.probing.discard(root)
+
+        # 応答しないドライブでプロセス終了が妨げられないようデーモンスレッドで確認する
+        # 前回の確認がまだ終わっていないソースは、スレッドが増え続けないよう今回は確認しない
+        pending = set()
+        for root in self.source_roots:
+            if root in self.probing:
+                continue
+            self.probing.add(root)
+            pending.add(root)
+            threading.Thread(target=probe, args=(root,), daemon=True).start()
+
+        deadline = time.monotonic() + self.discovery_timeout
+        found = set()
+        while pending:
             try:
-                # 全環境でUSBドライブを検索
-                available_dirs = [f"{drive}\\HIOKI8847" for drive in self.drive_letters
-                                if os.path.exists(f"{drive}\\HIOKI8847")]
-                print(f"見つかったUSBディレクトリ: {available_dirs}")
-                return available_dirs
-            except Exception as e:
-                print(f"ディレクトリ取得でエラー: {str(e)}")
-                print(traceback.format_exc())
-                raise
+                # 呼び出し側の処理中に確認が終わったものは期限後でも受け取る
+                root, directories = results.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                print(f"応答の無いソースをスキップします: {sorted(pending)}")
+                break
+            pending.discard(root)
+            for directory in directories:
+                if directory not in found:
+                    found.add(directory)
+                    yield directory
 
     def generate_filename(self, base_path, base_filename):
-        """ユニークなファイル名を生成"""
-        counter = 1
-        filename = base_filename
-        while os.path.exists(os.path.join(base_path, filename)):
-            filename = f"{counter}-{base_filename}"
-            counter += 1
-        return filename
+        """ユニークなファイル名を生成（同時実行でも重ならないよう確保し、保存後に release_filename で解除する）"""
+        return allocate_filename(
+            base_path,
+            lambda counter: f"{counter}-{base_filename}" if counter else base_filename,
+            hint_path=sequence_hints_path(self.base_directory)
+        )
 
     def process_directory(self, directory):
         """指定されたディレクトリのCSVファイルを処理"""
         try:
+            # 前回のアーカイブの書き出しと、その後の元ファイルの削除が終わってから処理する
+            self.archiver.wait()
             files = [f for f in os.listdir(directory)
                     if os.path.isfile(os.path.join(directory, f)) and f.endswith('.CSV')]
 
@@ -63,13 +301,123 @@ class CSVImporter:
         """CSVファイルの処理と保存"""
         try:
             output_path = os.path.join(self.save_directory, final_filename)
-            copy_path = os.path.join(self.copy_directory, final_filename)
+            copy_path = os.path.join(self.copy_directory, archive_filename(final_filename, self.archive_mode))
 
             print(f"処理を開始: {directory}")
 
+            # 取り込み済みのファイルは読み込まずにスキップする
+            new_files, file_keys = self.filter_imported_files(directory, files)
+
+            if new_files:
+                if self.manifest:
+                    self.manifest.mark_pending({file_keys[file]: file for file in new_files}, final_filename)
+
+                # 書き終わったファイルだけが出力先に現れるよう一時ファイル経由で保存する
+                temp_path = output_path + '.part'
+                if not self.save_merged:
+                    # メモリ上で次の処理段に渡す場合、アーカイブが唯一の保存先になるため
+                    # 元ファイルを削除する前に保存を終えておく
+                    final_data = self.build_merged_data(directory, new_files)
+                    write_archive(final_data.to_csv(index=False).encode('utf-8'), copy_path)
+                    self.retention.register(copy_path)
+                    print(f"アーカイブを保存: {os.path.basename(copy_path)}")
+                    self.merged_frames.append((final_filename, final_data))
+                elif self.merge_mode == 'stream':
+                    # ストリーミングでは書き出しと同時に CSV_LOG のアーカイブも作成する
+                    self.write_merged_stream(directory, new_files, temp_path, copy_path)
+                    self.retention.register(copy_path)
+                else:
+                    data = self.write_merged_frame(directory, new_files, temp_path)
+                    os.replace(temp_path, output_path)
+                    self.retention.register(output_path)
+                    # アーカイブは次の処理と並行してバックグラウンドで書き出す。元ファイルは
+                    # アーカイブを保存し終えてから削除する（保存できなければ削除せず、次回に
+                    # resume_pending_imports がCSVフォルダの出力からアーカイブを作り直す）
+                    self.archiver.submit(data, copy_path, on_complete=lambda: self.finish_import(
+                        directory, files, new_files, file_keys, final_filename))
+                    return True
+                if self.save_merged:
+                    os.replace(temp_path, output_path)
+                    self.retention.register(output_path)
+
+            self.finish_import(directory, files, new_files, file_keys, final_filename)
+            return True
+
+        except Exception as e:
+            print(f"ファイル処理でエラー: {str(e)}")
+            print(traceback.format_exc())
+            return False
+        finally:
+            # 中断（Ctrl+C を含む）した場合も、確保したファイル名を残さない
+            release_filename(os.path.join(self.save_directory, final_filename))
+
+    def finish_import(self, directory, files, new_files, file_keys, final_filename):
+        """CSVフォルダとCSV_LOGへの保存が終わった後に、取り込み完了を記録して元ファイルを削除する"""
+        if new_files and self.manifest:
+            self.manifest.mark_imported([file_keys[file] for file in new_files])
+
+        # 元ファイルの削除
+        for file in files:
+            file_path = os.path.join(directory, file)
+            print(f"元ファイル削除: {file}")
+            os.remove(file_path)
+
+        if new_files:
+            print(f"CSVファイルの作成、およびUSB内のファイル削除が完了しました。ファイル名: {final_filename}")
+        else:
+            print("すべて取り込み済みのため、USB内のファイル削除のみ行いました")
+
+    def filter_imported_files(self, directory, files):
+        """マニフェストを確認し、未取り込みのファイルとそのキーを返す"""
+        if not self.manifest:
+            return files, {}
+
+        self.resume_pending_imports()
+        file_keys = {file: ImportManifest.file_key(os.path.join(directory, file)) for file in files}
+        new_files = [file for file in files if not self.manifest.is_imported(file_keys[file])]
+        if len(new_files) < len(files):
+            print(f"取り込み済みのためスキップ: {len(files) - len(new_files)}件")
+        return new_files, file_keys
+
+    def resume_pending_imports(self):
+        """前回中断した取り込みのうち、出力が書き終わっているものを完了扱いにする"""
+        def is_output_complete(filename):
+            output_path = os.path.join(self.save_directory, filename)
+            # 出力は一時ファイルから置き換えるため、存在すれば書き終わっている
+            if os.path.exists(output_path) and not find_archive(self.copy_directory, filename):
+                # CSV_LOG への保存前に中断していた場合は保存だけやり直す
+                copy_path = os.path.join(self.copy_directory, archive_filename(filename, self.archive_mode))
+                with open(output_path, 'rb') as f:
+                    write_archive(f.read(), copy_path)
+                self.retention.register(copy_path)
+            return find_archive(self.copy_directory, filename) is not None
+
+        for filename in self.manifest.resume_pending(is_output_complete):
+            print(f"中断していた取り込みを完了扱いにしました: {filename}")
+
+    def write_merged_frame(self, directory, files, output_path):
+        """全ファイルをDataFrameに読み込んで結合し保存する（保存した内容のバイト列を返す）"""
+        final_data = self.build_merged_data(directory, files)
+        print(f"ファイル保存: {output_path}")
+        data = final_data.to_csv(index=False).encode('utf-8')
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        return data
+
+    def build_merged_data(self, directory, files):
+        """全ファイルを読み込み、Time列と各ファイルのデータ列を結合したDataFrameを返す"""
+        first_file = os.path.join(directory, files[0])
+        column_names = ['Time'] + [os.path.splitext(os.path.basename(f))[0] for f in files]
+        print(f"ヘッダー読み込み: {files[0]}")
+
+        if self.reader == 'fast':
+            time_values = read_hioki_time(first_file)
+            data_columns = self.read_data_columns(directory, files)
+
+            print("データ結合処理開始")
+            final_data = build_merged_frame(time_values, data_columns, column_names)
+        else:
             # 最初のファイルからA列のデータを取得
-            first_file = os.path.join(directory, files[0])
-            print(f"ヘッダー読み込み: {files[0]}")
             header_frame = pd.read_csv(
                 first_file,
                 skiprows=7,
@@ -78,61 +426,134 @@ class CSVImporter:
             )
 
             # 各CSVファイルのB列データを読み込み
-            data_frames = []
-            for file in files:
-                file_path = os.path.join(directory, file)
-                print(f"データ読み込み: {file}")
-                data = pd.read_csv(
-                    file_path,
-                    skiprows=8,
-                    nrows=2050,
-                    encoding='shift_jis',
-                    usecols=[1]
-                )
-                data_frames.append(data)
+            data_frames = self.read_data_columns(directory, files)
 
             print("データ結合処理開始")
             combined_data = pd.concat(data_frames, axis=1)
             final_data = pd.concat([header_frame, combined_data], axis=1)
-            final_data.columns = ['Time'] + [
-                os.path.splitext(os.path.basename(f))[0] for f in files
-            ]
+            final_data.columns = column_names
+        return final_data
+
+    def take_merged_frames(self):
+        """保持している結合結果（ファイル名とDataFrameの組）を取り出す"""
+        merged_frames, self.merged_frames = self.merged_frames, []
+        return merged_frames
 
+    def save_merged_frames(self, merged_frames):
+        """保持していた結合結果をCSVフォルダに保存する（通常の処理で続きから処理できるように）"""
+        for filename, final_data in merged_frames:
+            output_path = os.path.join(self.save_directory, self.generate_filename(self.save_directory, filename))
+            temp_path = output_path + '.part'
+            try:
+                final_data.to_csv(temp_path, index=False)
+                os.replace(temp_path, output_path)
+            finally:
+                release_filename(output_path)
+            self.retention.register(output_path)
             print(f"ファイル保存: {output_path}")
-            final_data.to_csv(output_path, index=False)
-            shutil.copy(output_path, copy_path)
 
-            # 元ファイルの削除
-            for file in files:
-                file_path = os.path.join(directory, file)
-                print(f"元ファイル削除: {file}")
-                os.remove(file_path)
+    def write_merged_stream(self, directory, files, output_path, archive_path=None):
+        """全ファイルを同時に開き、結合結果を1行ずつ書き出す
 
-            print(f"CSVファイルの作成、およびUSB内のファイル削除が完了しました。ファイル名: {final_filename}")
-            return True
+        ファイル数が STREAM_MERGE_FAN_IN を超える場合は、同時に開くファイル数が
+        OSの上限を超えないよう、グループごとにB列を一時ファイルにまとめてから結合する。
+        """
+        print(f"ストリーミング結合で保存: {output_path}")
+        with ExitStack() as stack:
+            # A列は最初のファイルのヘッダー行の次から最後まで
+            time_file = stack.enter_context(open(os.path.join(directory, files[0]), 'rb'))
+            skip_lines(time_file, HIOKI_HEADER_ROWS)
 
-        except Exception as e:
-            print(f"ファイル処理でエラー: {str(e)}")
-            print(traceback.format_exc())
-            return False
+            if len(files) <= STREAM_MERGE_FAN_IN:
+                data_files = [stack.enter_context(open_data_file(os.path.join(directory, file))) for file in files]
+                data_rows = read_data_rows(data_files)
+            else:
+                groups = [files[i:i + STREAM_MERGE_FAN_IN] for i in range(0, len(files), STREAM_MERGE_FAN_IN)]
+                print(f"ファイル数が多いため {len(groups)} グループに分けて結合します")
+                blocks = [stack.enter_context(merge_column_block(directory, group)) for group in groups]
+                data_rows = read_block_rows(blocks, [len(group) for group in groups])
+
+            output = stack.enter_context(open(output_path, 'w', encoding='utf-8', newline=''))
+            if archive_path:
+                archive = stack.enter_context(open_archive(
+                    archive_path + '.part', 'wt', archive_mode=self.archive_mode, encoding='utf-8', newline=''))
+                output = TeeWriter(output, archive)
+            writer = csv.writer(output, lineterminator=os.linesep)
+            writer.writerow(['Time'] + [os.path.splitext(os.path.basename(f))[0] for f in files])
+
+            missing = [''] * len(files)
+            while True:
+                time_value = read_field(time_file, 0)
+                values = next(data_rows, None)
+                if time_value is None and values is None:
+                    break
+                writer.writerow([format_value(time_value)] + (missing if values is None else values))
+
+        if archive_path:
+            os.replace(archive_path + '.part', archive_path)
+
+    def read_data_columns(self, directory, files):
+        """各ファイルのB列データをファイル順に読み込む"""
+        file_paths = [os.path.join(directory, file) for file in files]
+        column_reader = read_hioki_data if self.reader == 'fast' else read_data_column
 
-    def cleanup_old_files(self, days=30):
-        """古いファイルの削除"""
+        if self.ingest_mode != 'serial' and self.max_workers > 1 and len(file_paths) > 1:
+            executor_class = ProcessPoolExecutor if self.ingest_mode == 'process' else ThreadPoolExecutor
+            workers = min(self.max_workers, len(file_paths))
+            try:
+                executor = executor_class(max_workers=workers)
+            except (OSError, NotImplementedError) as e:
+                print(f"並列読み込みのプールを作成できないため逐次処理に切り替えます: {str(e)}")
+            else:
+                print(f"並列読み込み開始: {self.ingest_mode} x {workers}")
+                with executor:
+                    futures = []
+                    try:
+                        for file_path in file_paths:
+                            futures.append(executor.submit(column_reader, file_path))
+                        # 入力順で結果を受け取るため列の並びは逐次処理と同じになる
+                        return [future.result() for future in futures]
+                    except BrokenExecutor as e:
+                        # ワーカーが異常終了した場合だけ逐次処理に切り替える
+                        # （ファイルの読み込みで起きた例外は逐次処理と同じく呼び出し元に伝える）
+                        print(f"並列読み込みのワーカーが異常終了したため逐次処理に切り替えます: {str(e)}")
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+
+        data_columns = []
+        for file, file_path in zip(files, file_paths):
+            print(f"データ読み込み: {file}")
+            data_columns.append(column_reader(file_path))
+        return data_columns
+
+    def cleanup_old_files(self, days=30, policies=None):
+        """古いファイルの削除
+
+        保持期間インデックスを使い、期限切れのファイルだけをまとめて削除する。
+        policies に {ディレクトリ: RetentionPolicy} を渡すとディレクトリごとに
+        経過日数や合計サイズの上限を指定できる。
+        """
         try:
-            current_time = datetime.now().timestamp()
-
-            for directory in [self.save_directory, self.copy_directory]:
-                for file in os.listdir(directory):
-                    file_path = os.path.join(directory, file)
-                    if os.path.isfile(file_path):
-                        file_age = current_time - os.path.getmtime(file_path)
-                        if file_age > (days * 24 * 60 * 60):  # days to seconds
-                            os.remove(file_path)
-                            print(f"古いファイルを削除: {file}")
+            if policies is None:
+                policy = RetentionPolicy(max_age_days=days)
+                policies = {self.save_directory: policy, self.copy_directory: policy}
+
+            for file_path in self.retention.apply(policies):
+                print(f"古いファイルを削除: {os.path.basename(file_path)}")
+
+            if self.manifest:
+                self.manifest.prune(MANIFEST_RETENTION_DAYS)
         except Exception as e:
             print(f"クリーンアップでエラー: {str(e)}")
             print(traceback.format_exc())
 
+def source_roots_from_env():
+    """環境変数 'HiokiSourceRoots' で指定されたソースルート（os.pathsep 区切り）を返す"""
+    source_roots = os.environ.get('HiokiSourceRoots')
+    return source_roots.split(os.pathsep) if source_roots else None
+
 def main():
     """メイン処理"""
     try:
@@ -142,25 +563,25 @@ def main():
             return False
 
         print(f"ベースディレクトリ: {base_directory}")
-        importer = CSVImporter(base_directory)
+        importer = CSVImporter(base_directory, source_roots=source_roots_from_env())
 
         # 古いファイルのクリーンアップ（30日以上前のファイル）
         importer.cleanup_old_files(30)
 
-        # 利用可能なディレクトリを取得
-        directories = importer.get_available_directories()
+        # 利用可能なディレクトリを探しながら、見つかったものから処理する
+        directories = []
+        success = False
+        for directory in importer.iter_available_directories():
+            directories.append(directory)
+            print(f"ディレクトリ処理開始: {directory}")
+            if importer.process_directory(directory):
+                success = True
         print(f"検索対象ディレクトリ: {directories}")
 
         if not directories:
             print("利用可能なディレクトリが見つかりません")
             return False
 
-        success = False
-        for directory in directories:
-            print(f"ディレクトリ処理開始: {directory}")
-            if importer.process_directory(directory):
-                success = True
-
         return success
 
     except Exception as e:
@@ -1,12 +1,56 @@
 import pandas as pd
 import numpy as np
 import os
-import re
+import sys
+import types
 import shutil
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+if not __package__:
+    # run_csv_script.ps1 のようにスクリプトとして直接実行された場合も src.* を読み込めるようにする
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    if os.path.basename(script_directory) == 'src':
+        sys.path.insert(0, os.path.dirname(script_directory))
+    elif 'src' not in sys.modules:
+        # Scripts フォルダに平置きで配置されている場合は、そのフォルダを src パッケージとして扱う
+        sys.modules['src'] = types.ModuleType('src')
+        sys.modules['src'].__path__ = [script_directory]
+
+from src.sequence import allocate_filename, release_filename, sequence_hints_path
+from src.retention import RetentionIndex, RetentionPolicy
+from src.csvwriter import write_frame_csv, write_frames_csv
+from src.sample_names import parse_sample_names, sample_sort_order
+from src.features import SUMMARY_PREFIX, summary_table
+from src.pivot_cache import PivotCache, DEFAULT_CACHE_MAX_BYTES, default_cache_directory
+from src.pivot_engine import PIVOT_ENGINES, DEFAULT_PIVOT_ENGINE, DEFAULT_MEMORY_LIMIT, READ_BYTES_PER_CELL, read_pivot_table, pivot_table_from_frame, sort_table, adjust_table, column_plan, read_sorted_table_chunked, iter_adjusted_frames
+
+# 処理モード: 'serial'（1ファイルずつ）, 'process'（プロセスプールで並列にピボット）
+PIVOT_MODES = ('serial', 'process')
+DEFAULT_PIVOT_MODE = 'serial'
+# None の場合は CPU 数から決定する
+DEFAULT_MAX_WORKERS = None
+
+# 書き出し方式: 'fast'（数値の列をまとめて文字列にする専用の書き出し）, 'pandas'（DataFrame.to_csv）
+WRITERS = ('fast', 'pandas')
+DEFAULT_WRITER = 'fast'
+# 数値の書式（None は to_csv と同じ表記、'%.6g' などを指定すると桁数を固定できる）
+DEFAULT_FLOAT_FORMAT = None
+
+def pivot_file_to_path(options, input_path, output_path, summary_path=None):
+    """1ファイルをピボットして確保済みの出力先に保存する（プロセスプールから呼べるようモジュール関数とする）
+
+    options は CSVPivot の設定（CSVPivot.worker_options）。summary_path を指定すると
+    特徴量の表も保存する。
+    """
+    CSVPivot(**options).pivot_to_path(input_path, output_path, summary_path)
+    return output_path
 
 class CSVPivot:
-    def __init__(self, base_directory=None):
+    def __init__(self, base_directory=None, engine=DEFAULT_PIVOT_ENGINE, pivot_mode=DEFAULT_PIVOT_MODE,
+                 max_workers=DEFAULT_MAX_WORKERS, writer=DEFAULT_WRITER, float_format=DEFAULT_FLOAT_FORMAT,
+                 summary=True, cache=True, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, cache_directory=None):
         self.base_directory = base_directory or os.environ.get('OneDriveGraph')
         self.csv_dir = os.path.join(self.base_directory, 'CSV')
         self.output_dir = os.path.join(self.base_directory, 'OUTPUT')
@@ -16,82 +60,265 @@ class CSVPivot:
         for directory in [self.output_dir, self.processed_dir]:
             os.makedirs(directory, exist_ok=True)
 
+        if engine not in PIVOT_ENGINES:
+            raise ValueError(f"不明なピボット方式です: {engine}")
+        self.engine = engine
+        # engine='chunked' でのメモリ使用量の上限（バイト）
+        self.memory_limit = memory_limit
+
+        if pivot_mode not in PIVOT_MODES:
+            raise ValueError(f"不明な処理モードです: {pivot_mode}")
+        self.pivot_mode = pivot_mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        if writer not in WRITERS:
+            raise ValueError(f"不明な書き出し方式です: {writer}")
+        self.writer = writer
+        self.float_format = float_format
+        # ピボットと同時に各サンプルの特徴量（最大値・継続時間・力積など）の表を保存するか
+        self.summary = summary
+        # 同じ内容のファイルを再びピボットする場合（変換失敗後の再実行やCSV_LOGからの
+        # 再処理など）は、保存済みの結果を使う。同期による転送を増やさないよう、
+        # 保存先の既定はベースディレクトリではなくローカルのキャッシュフォルダとする
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_directory = cache_directory or default_cache_directory()
+        self.cache = PivotCache(self.cache_directory, cache_max_bytes) if cache else None
+
+        # 保存・移動したファイルは保持期間インデックスに登録し、古いファイルの削除に使う
+        self.retention = RetentionIndex(self.base_directory)
+
     def read_and_preprocess(self, filepath, encoding='cp932'):
         """CSVファイルを読み込んで前処理を行う"""
         try:
             df = pd.read_csv(filepath, encoding=encoding)
             print(f"ファイル読み込み: {os.path.basename(filepath)}")
             print(f"データ形状: {df.shape}")
-            df_transposed = df.T
-            df_transposed.reset_index(inplace=True)
-            df_transposed.rename(columns={'index': 'New Column'}, inplace=True)
-            return df_transposed
+            return self.transpose(df)
+        except Exception as e:
+            print(f"ファイル読み込みエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def transpose(df):
+        """結合済みのデータを転置し、列名を 'New Column' 列にする"""
+        df_transposed = df.T
+        df_transposed.reset_index(inplace=True)
+        df_transposed.rename(columns={'index': 'New Column'}, inplace=True)
+        return df_transposed
+
+    def read_pivot_table(self, filepath, encoding='cp932'):
+        """CSVファイルを読み込み、サンプル名と波形の配列に分けて転置する"""
+        try:
+            table = read_pivot_table(filepath, encoding=encoding)
+            print(f"ファイル読み込み: {os.path.basename(filepath)}")
+            print(f"データ形状: {(len(table.columns), len(table.labels))}")
+            return table
         except Exception as e:
             print(f"ファイル読み込みエラー: {str(e)}")
             raise
 
+    def pivot_file(self, filepath):
+        """1ファイルを転置・ソート・列調整し、出力用のデータフレームを返す"""
+        if self.cache is not None:
+            return self.cached_pivot(filepath, with_summary=False)[0]
+        return self.compute_file(filepath)
+
+    def compute_file(self, filepath):
+        """キャッシュを使わずに1ファイルをピボットし、出力を返す（特徴量は計算しない）"""
+        if self.engine == 'chunked':
+            return adjust_table(self.read_sorted_table_chunked(filepath))
+        if self.engine == 'numpy':
+            return adjust_table(sort_table(self.read_pivot_table(filepath)))
+
+        # 途中のデータフレームを保持し続けないよう、続けて呼び出す
+        return self.adjust_columns(self.sort_data(self.read_and_preprocess(filepath)))
+
+    def pivot_file_with_summary(self, filepath):
+        """pivot_file と同じ出力と、転置したデータから計算した特徴量の表を返す"""
+        if self.cache is None:
+            return self.compute_file_with_summary(filepath)
+        return self.cached_pivot(filepath, with_summary=True)
+
+    def cached_pivot(self, filepath, with_summary):
+        """保存済みの結果があれば使い、無ければピボットして保存する（出力と特徴量の表を返す）
+
+        特徴量の表は with_summary の場合だけ計算する。特徴量の表の無い結果は、
+        特徴量が必要な場合には使わずに計算し直して保存し直す。
+        """
+        key = self.cache.key(filepath)
+        cached = self.cache.get(key)
+        if cached is not None and (not with_summary or cached[1] is not None):
+            print(f"キャッシュを使用: {os.path.basename(filepath)}")
+            return cached
+        if with_summary:
+            df_final, summary = self.compute_file_with_summary(filepath)
+        else:
+            df_final, summary = self.compute_file(filepath), None
+        self.cache.put(key, df_final, summary)
+        return df_final, summary
+
+    def compute_file_with_summary(self, filepath):
+        """キャッシュを使わずに1ファイルをピボットし、出力と特徴量の表を返す"""
+        if self.engine == 'chunked':
+            table = self.read_sorted_table_chunked(filepath)
+            return adjust_table(table), self.chunked_summary(table)
+        if self.engine == 'numpy':
+            return self.finish_table(self.read_pivot_table(filepath))
+        return self.finish_transposed(self.read_and_preprocess(filepath))
+
+    def pivot_frame(self, df):
+        """メモリ上の結合済みデータを転置・ソート・列調整し、出力用のデータフレームを返す"""
+        print(f"データ形状: {df.shape}")
+        # メモリ上のデータは分割して読み込む必要が無いため、'chunked' も NumPy 方式で処理する
+        if self.engine != 'pandas':
+            return adjust_table(sort_table(pivot_table_from_frame(df)))
+        return self.adjust_columns(self.sort_data(self.transpose(df)))
+
+    def pivot_frame_with_summary(self, df):
+        """pivot_frame と同じ出力と、特徴量の表を返す"""
+        print(f"データ形状: {df.shape}")
+        if self.engine != 'pandas':
+            return self.finish_table(pivot_table_from_frame(df))
+        return self.finish_transposed(self.transpose(df))
+
+    def finish_table(self, table):
+        """転置済みの PivotTable から特徴量を計算し、ソート・列調整した出力と一緒に返す"""
+        summary = summary_table(table.labels, table.values, table.names)
+        # 並べ替え前の配列を保持し続けないよう、同じ名前に置き換える
+        table = sort_table(table)
+        return adjust_table(table), summary
+
+    def finish_transposed(self, df_transposed):
+        """転置済みのデータフレームから特徴量を計算し、ソート・列調整した出力と一緒に返す"""
+        summary = summary_table(df_transposed['New Column'].to_numpy(),
+                                df_transposed.iloc[:, 1:].to_numpy(dtype=np.float64))
+        df_transposed = self.sort_data(df_transposed)
+        return self.adjust_columns(df_transposed), summary
+
+    def read_sorted_table_chunked(self, filepath, encoding='cp932'):
+        """メモリ使用量の上限内で、CSVファイルを少しずつ読み込んで並べ替え済みの PivotTable を作る"""
+        try:
+            table = read_sorted_table_chunked(filepath, encoding=encoding, memory_limit=self.memory_limit)
+            print(f"ファイル読み込み: {os.path.basename(filepath)}")
+            print(f"データ形状: {(len(table.columns), len(table.labels))}")
+            return table
+        except Exception as e:
+            print(f"ファイル読み込みエラー: {str(e)}")
+            raise
+
+    def chunked_summary(self, table):
+        """メモリ使用量の上限に収まる行数ずつ特徴量を計算する"""
+        block_rows = max(1, (self.memory_limit // 2) // (READ_BYTES_PER_CELL * max(1, len(table.columns))))
+        # 並べ替え済みの PivotTable なので並べ替え直さない
+        return summary_table(table.labels, table.values, table.names, block_rows=block_rows, presorted=True)
+
+    def pivot_to_path(self, input_path, output_path, summary_path=None):
+        """1ファイルをピボットして確保済みの出力先に保存する（summary_path を指定すると特徴量の表も保存する）
+
+        engine='chunked' の場合は出力全体の DataFrame を作らず、行のまとまりごとに書き出す。
+        """
+        if self.engine == 'chunked':
+            table = self.read_sorted_table_chunked(input_path)
+            summary = self.chunked_summary(table) if summary_path is not None else None
+            self.write_output_frames(column_plan(table.shape[1]).output_columns,
+                                     iter_adjusted_frames(table, self.memory_limit), output_path)
+        elif summary_path is None:
+            self.write_output(self.pivot_file(input_path), output_path)
+            return
+        else:
+            df_final, summary = self.pivot_file_with_summary(input_path)
+            self.write_output(df_final, output_path)
+
+        if summary_path is None:
+            return
+        if summary is None:
+            # 特徴量を計算できなかった場合は確保を解除する
+            release_filename(summary_path)
+        else:
+            self.write_output(summary, summary_path)
+
     def sort_data(self, df_transposed):
-        """データのソート処理"""
-        sort_priority = ['HEL_TOP', 'HEL_ZENGO', 'HEL_SIDE', 'BICYCLE', 'BASEBALL', 'FALLARR']
-
-        def custom_sort(value):
-            if isinstance(value, float):
-                return (len(sort_priority), 0)
-            match = re.match(r"(\d+)(HEL_TOP|HEL_ZENGO|HEL_SIDE|BICYCLE|BASEBALL|FALLARR)", value)
-            if match:
-                number_part = int(match.group(1))
-                identifier_part = match.group(2)
-                sort_index = sort_priority.index(identifier_part)
-                return (sort_index, number_part)
-            return (len(sort_priority), 0)
-
-        df_sorted = df_transposed.sort_values(by="New Column", key=lambda x: x.apply(custom_sort))
-        return df_sorted
+        """データのソート処理（サンプル名をまとめて解析し、種類の優先順・番号順に並べる）"""
+        parsed = parse_sample_names(df_transposed['New Column'])
+        return df_transposed.iloc[sample_sort_order(parsed)]
 
     def adjust_columns(self, df_sorted):
-        """列の調整処理"""
-        # 52列目から最終列までの値を27列目から並べ直す
-        columns_to_move = df_sorted.iloc[:, 51:]
-        remaining_columns_before = df_sorted.iloc[:, :24]
-        remaining_columns_after = df_sorted.iloc[:, 24:51]
-        df_sorted = pd.concat([remaining_columns_before, columns_to_move, remaining_columns_after], axis=1)
+        """列の調整処理
 
-        # 1列目の前に新しい列(New First Column)を追加し、2列目を削除
-        df_sorted.insert(0, 'New First Column', pd.Series([np.nan]*df_sorted.shape[0]))
-        df_sorted.drop(df_sorted.columns[2], axis=1, inplace=True)
+        52列目以降を25列目に移し、先頭に空の列を追加して元の2列目を削除し、
+        3〜24列目を空欄にする。この並べ替えは列数ごとに事前計算した ColumnPlan で、
+        作成済みの配列に1回で集める。
+        """
+        plan = column_plan(df_sorted.shape[1])
+        values = df_sorted.iloc[:, 1:].to_numpy(dtype=np.float64)
+        return plan.frame(df_sorted.iloc[:, 0].to_numpy(), values)
 
-        # 3列目から26列目までのデータをnp.nanで置き換える
-        df_sorted.iloc[:, 2:24] = np.nan
+    def allocate_output_path(self, base_filename, output_dir=None):
+        """連番付きの出力先を確保する（保存先の既定はOUTPUTディレクトリ）"""
+        filename, ext = os.path.splitext(base_filename)
+        output_dir = output_dir or self.output_dir
+        new_filename = allocate_filename(output_dir, lambda i: f"{filename}_{i}{ext}", start=1,
+                                         hint_path=sequence_hints_path(self.base_directory))
+        return os.path.join(output_dir, new_filename)
+
+    def write_output(self, df, output_path):
+        """ピボット結果を書き出す"""
+        if self.writer == 'fast':
+            write_frame_csv(df, output_path, encoding='cp932', float_format=self.float_format)
+        else:
+            df.to_csv(output_path, encoding='cp932', index=False, float_format=self.float_format)
 
-        return df_sorted
+    def write_output_frames(self, columns, frames, output_path):
+        """行のまとまりごとの DataFrame を1つのピボット結果として書き出す"""
+        if self.writer == 'fast':
+            write_frames_csv(columns, frames, output_path, encoding='cp932', float_format=self.float_format)
+            return
+        with open(output_path, 'w', encoding='cp932', newline='') as f:
+            header = True
+            for frame in frames:
+                frame.to_csv(f, index=False, header=header, float_format=self.float_format)
+                header = False
+            if header:
+                pd.DataFrame(columns=columns).to_csv(f, index=False)
 
-    def save_dataframe_with_sequence(self, df, base_filename):
+    def worker_options(self):
+        """プロセスプールの各ワーカーで CSVPivot を作り直すための設定"""
+        return {'base_directory': self.base_directory, 'engine': self.engine, 'writer': self.writer,
+                'float_format': self.float_format, 'summary': self.summary,
+                'cache': self.cache is not None, 'cache_max_bytes': self.cache_max_bytes,
+                'cache_directory': self.cache_directory,
+                'memory_limit': self.memory_limit}
+
+    def save_dataframe_with_sequence(self, df, base_filename, output_dir=None):
         """連番付きでデータフレームを保存"""
-        filename, ext = os.path.splitext(base_filename)
-        i = 1
-        while True:
-            new_filename = f"{filename}_{i}{ext}"
-            # OUTPUTディレクトリに保存するように修正
-            output_dir = os.path.join(self.base_directory, 'OUTPUT')
-            os.makedirs(output_dir, exist_ok=True)
-            new_filepath = os.path.join(output_dir, new_filename)
-            if not os.path.exists(new_filepath):
-                break
-            i += 1
-
-        df.to_csv(new_filepath, encoding='cp932', index=False)
+        new_filepath = self.allocate_output_path(base_filename, output_dir)
+        try:
+            self.write_output(df, new_filepath)
+        finally:
+            # 保存し終えたか、保存できなかった場合も確保を解除する
+            release_filename(new_filepath)
+        self.retention.register(new_filepath)
         print(f"保存完了: {os.path.basename(new_filepath)}")
         return new_filepath
 
+    def move_to_processed(self, file):
+        """処理済みファイルを PROCESSED ディレクトリに移動"""
+        input_path = os.path.join(self.csv_dir, file)
+        processed_path = os.path.join(self.processed_dir, file)
+        shutil.move(input_path, processed_path)
+        self.retention.forget([input_path])
+        self.retention.register(processed_path)
+        print(f"処理済みファイルを移動: {file}")
+
     def process_files(self):
         """CSVファイルの処理を実行"""
         if not os.path.exists(self.csv_dir):
             print(f"CSVディレクトリが存在しません: {self.csv_dir}")
             return False
 
-        # 未処理のCSVファイルのみを取得
-        files = [file for file in os.listdir(self.csv_dir)
-                if 'InspectionLOG' in file and file.endswith('.CSV')]
+        # 未処理のCSVファイルのみを取得（出力名の割り当てと移動の順序を一定にするため名前順）
+        files = sorted(file for file in os.listdir(self.csv_dir)
+                       if 'InspectionLOG' in file and file.endswith('.CSV'))
 
         if not files:
             print("処理対象のファイルが見つかりません")
@@ -100,22 +327,33 @@ class CSVPivot:
         print(f"処理対象ファイル数: {len(files)}")
 
         try:
+            if self.pivot_mode == 'process' and self.max_workers > 1 and len(files) > 1:
+                self.process_files_in_pool(files)
+                return True
+
             for file in files:
                 input_path = os.path.join(self.csv_dir, file)
 
+                if self.engine == 'chunked':
+                    # 出力を少しずつ書き出すため、先に出力先を確保してから処理する
+                    self.pivot_file_chunked(file, input_path)
+                    self.move_to_processed(file)
+                    continue
+
                 # 1. ファイルを処理
-                df_transposed = self.read_and_preprocess(input_path)
-                df_sorted = self.sort_data(df_transposed)
-                df_final = self.adjust_columns(df_sorted)
+                if self.summary:
+                    df_final, summary = self.pivot_file_with_summary(input_path)
+                else:
+                    df_final, summary = self.pivot_file(input_path), None
 
                 # 2. 結果を OUTPUT ディレクトリに保存
                 output_filename = 'Output_' + file
-                output_path = self.save_dataframe_with_sequence(df_final, output_filename)
+                self.save_dataframe_with_sequence(df_final, output_filename)
+                if summary is not None:
+                    self.save_dataframe_with_sequence(summary, SUMMARY_PREFIX + file)
 
                 # 3. 処理済みファイルを PROCESSED ディレクトリに移動
-                processed_path = os.path.join(self.processed_dir, file)
-                shutil.move(input_path, processed_path)
-                print(f"処理済みファイルを移動: {file}")
+                self.move_to_processed(file)
 
             return True
 
@@ -123,18 +361,115 @@ class CSVPivot:
             print(f"処理中にエラーが発生しました: {str(e)}")
             return False
 
-    def cleanup_old_files(self, days=30):
-        """古いファイルを削除"""
-        current_time = datetime.now().timestamp()
+    def pivot_file_chunked(self, file, input_path):
+        """出力先を確保し、engine='chunked' でピボットして保存する"""
+        output_path = self.allocate_output_path('Output_' + file)
+        summary_path = self.allocate_output_path(SUMMARY_PREFIX + file) if self.summary else None
+        try:
+            self.pivot_to_path(input_path, output_path, summary_path)
+        except BaseException:
+            # 書きかけの出力は残さない
+            for path in (output_path, summary_path):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            for path in (output_path, summary_path):
+                if path is not None:
+                    release_filename(path)
+        for path in (output_path, summary_path):
+            if path is not None and os.path.exists(path):
+                self.retention.register(path)
+                print(f"保存完了: {os.path.basename(path)}")
 
-        for directory in [self.output_dir, self.processed_dir]:
-            for file in os.listdir(directory):
-                file_path = os.path.join(directory, file)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > (days * 24 * 60 * 60):  # days to seconds
-                        os.remove(file_path)
-                        print(f"古いファイルを削除: {file}")
+    def process_files_in_pool(self, files):
+        """プロセスプールで各ファイルのピボットと保存を並列に行う
+
+        出力先は事前にファイル順で確保し、保存の完了確認と PROCESSED への移動も
+        ファイル順に行うため、結果は逐次処理と同じになる。途中で失敗した場合は、
+        移動していないファイルの出力を削除して次回にやり直す。ファイルの処理で
+        起きた例外は逐次処理と同じく呼び出し元に伝える。プールを作成できない場合と
+        ワーカープロセスが異常終了した場合（BrokenProcessPool）だけ、残りのファイルを
+        逐次処理に切り替える。
+        """
+        output_paths = [self.allocate_output_path('Output_' + file) for file in files]
+        summary_paths = [self.allocate_output_path(SUMMARY_PREFIX + file) if self.summary else None
+                         for file in files]
+        input_paths = [os.path.join(self.csv_dir, file) for file in files]
+        options = self.worker_options()
+        workers = min(self.max_workers, len(files))
+        completed = 0
+
+        def finish(file, output_path, summary_path):
+            for path in (output_path, summary_path):
+                if path is not None:
+                    release_filename(path)
+                if path is not None and os.path.exists(path):
+                    self.retention.register(path)
+                    print(f"保存完了: {os.path.basename(path)}")
+            self.move_to_processed(file)
+
+        def remove_output(path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        try:
+            try:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            except (OSError, NotImplementedError) as e:
+                print(f"プロセスプールを作成できないため逐次処理に切り替えます: {str(e)}")
+                executor = None
+
+            if executor is not None:
+                print(f"並列ピボット開始: process x {workers}")
+                with executor:
+                    futures = []
+                    try:
+                        for input_path, output_path, summary_path in zip(input_paths, output_paths, summary_paths):
+                            futures.append(executor.submit(pivot_file_to_path, options, input_path, output_path,
+                                                           summary_path))
+                        for file, future, summary_path in zip(files, futures, summary_paths):
+                            finish(file, future.result(), summary_path)
+                            completed += 1
+                    except BrokenProcessPool as e:
+                        print(f"ワーカープロセスが異常終了したため残りを逐次処理に切り替えます: {str(e)}")
+                    except BaseException:
+                        # 失敗したファイル以降は逐次処理と同じく処理しない
+                        for future in futures:
+                            future.cancel()
+                        raise
+
+            for file, input_path, output_path, summary_path in zip(
+                    files[completed:], input_paths[completed:], output_paths[completed:], summary_paths[completed:]):
+                # 異常終了したワーカーの書きかけの出力は消してから処理し直す
+                for path in (output_path, summary_path):
+                    if path is not None:
+                        remove_output(path)
+                pivot_file_to_path(options, input_path, output_path, summary_path)
+                finish(file, output_path, summary_path)
+                completed += 1
+        finally:
+            for path in output_paths[completed:] + summary_paths[completed:]:
+                if path is None:
+                    continue
+                remove_output(path)
+                release_filename(path)
+
+    def cleanup_old_files(self, days=30, policies=None):
+        """古いファイルを削除
+
+        保持期間インデックスを使い、期限切れのファイルだけをまとめて削除する。
+        policies に {ディレクトリ: RetentionPolicy} を渡すとディレクトリごとに
+        経過日数や合計サイズの上限を指定できる。
+        """
+        if policies is None:
+            policy = RetentionPolicy(max_age_days=days)
+            policies = {self.output_dir: policy, self.processed_dir: policy}
+
+        for file_path in self.retention.apply(policies):
+            print(f"古いファイルを削除: {os.path.basename(file_path)}")
 
 def main():
     """メイン処理"""
@@ -1,7 +1,36 @@
+import csv
+import io
+import numpy as np
 import pandas as pd
 import openpyxl
 import os
 import sys
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+if not __package__:
+    # run_csv_script.ps1 のようにスクリプトとして直接実行された場合も src.* を読み込めるようにする
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    if os.path.basename(script_directory) == 'src':
+        sys.path.insert(0, os.path.dirname(script_directory))
+    elif 'src' not in sys.modules:
+        # Scripts フォルダに平置きで配置されている場合は、そのフォルダを src パッケージとして扱う
+        sys.modules['src'] = types.ModuleType('src')
+        sys.modules['src'].__path__ = [script_directory]
+
+from src.decimation import DEFAULT_DECIMATION_METHOD, decimate_frame
+from src.features import SUMMARY_PREFIX, SUMMARY_SHEET_NAME
+from src.retention import RetentionIndex
+from src.sequence import allocate_filename, release_filename, sequence_hints_path
+from src.template_cache import shared_template_cache
+from src.convert_options import DEFAULT_OUTPUT_MODE, DEFAULT_WORKBOOK_WRITER, OUTPUT_MODES, WORKBOOK_WRITERS
+from src.xlsm_package import XlsmPackage
+
+# None の場合は CPU 数から決定する
+DEFAULT_MAX_WORKERS = None
+
+# ピボット結果（Output_）のサンプル名の列の位置（1列目は空欄の列、3列目以降は数値）
+OUTPUT_LABEL_POSITION = 1
 
 # カテゴリとテンプレートファイルのマッピング（優先順位付き）
 CATEGORY_MAPPING = [
@@ -11,25 +40,127 @@ CATEGORY_MAPPING = [
     ('FALLALL', '安全帯グラフ作成.xlsm')
 ]
 
-def load_csv_files(directory):
-    """指定ディレクトリから条件に合致するCSVファイルを読み込む"""
+def parse_float(value):
+    """数値に変換できない値（空欄）は欠損として扱う"""
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def check_output_columns(columns):
+    """サンプル名の列まで無いヘッダー（空のファイルなど）は読み込めないものとする"""
+    if len(columns) <= OUTPUT_LABEL_POSITION:
+        raise ValueError("サンプル名の列がありません")
+
+def parse_output_bytes(data):
+    """ピボット結果（Output_ のCSV）の内容を (列名, サンプル名, 数値の配列) にする
+
+    数値の配列はサンプル名の列を除いた (行数, 列数 - 1) の float64。引用符を
+    含むなど単純に分割できない場合は None を返す。値はA/D変換で量子化されていて
+    種類が少ないため、同じ文字列は一度だけ数値に変換する。ヘッダーにサンプル名の
+    列が無い場合は ValueError。
+    """
+    if b'"' in data:
+        return None
+    lines = data.replace(b'\r', b'').rstrip(b'\n')
+    header_end = lines.find(b'\n')
+    header_line = lines if header_end < 0 else lines[:header_end]
+    columns = header_line.decode('cp932').split(',')
+    check_output_columns(columns)
+    body = b'' if header_end < 0 else lines[header_end + 1:]
+    if not body:
+        return columns, np.empty(0, dtype=object), np.empty((0, len(columns) - 1))
+
+    row_count = body.count(b'\n') + 1
+    tokens = body.replace(b'\n', b',').split(b',')
+    if len(tokens) != row_count * len(columns):
+        return None
+    labels = np.array([token.decode('cp932') if token else np.nan
+                       for token in tokens[OUTPUT_LABEL_POSITION::len(columns)]], dtype=object)
+    converted = {token: parse_float(token) for token in set(tokens)}
+    values = np.fromiter(map(converted.__getitem__, tokens), np.float64, len(tokens))
+    values = np.delete(values.reshape(row_count, len(columns)), OUTPUT_LABEL_POSITION, axis=1)
+    return columns, labels, values
+
+def read_output_file(path):
+    """ピボット結果（Output_ のCSV）を (列名, サンプル名, 数値の配列) として読み込む
+
+    サンプル名の列（OUTPUT_LABEL_POSITION）は文字列、それ以外の列は全て float64 として
+    扱い、約2000列の型推論を行わない（空欄だけの列も float64 になる）。単純に
+    分割できない内容の場合は、型を指定した pd.read_csv で読み込む。
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    parsed = parse_output_bytes(data)
+    if parsed is not None:
+        return parsed
+
+    header = next(csv.reader(io.StringIO(data.decode('cp932'))), [])
+    check_output_columns(header)
+    dtypes = {name: (str if position == OUTPUT_LABEL_POSITION else np.float64)
+              for position, name in enumerate(header)}
+    frame = pd.read_csv(io.BytesIO(data), encoding='cp932', dtype=dtypes)
+    labels = frame.iloc[:, OUTPUT_LABEL_POSITION].to_numpy(dtype=object)
+    values = frame.drop(columns=frame.columns[OUTPUT_LABEL_POSITION]).to_numpy(dtype=np.float64)
+    return list(frame.columns), labels, values
+
+def combine_outputs(parts):
+    """読み込んだピボット結果（read_output_file の結果のリスト）を1つの DataFrame にまとめる
+
+    数値の列は全ファイル分の行数で確保した1つの float 配列に直接書き込み、
+    サンプル名の列だけを別に持つ（pd.concat のように列ごとに結合し直さない）。
+    列の並びと列の無いファイルの欠損の扱いは pd.concat と同じ。parts の各要素は
+    書き込んだ後に None にして、読み込んだ分のメモリを順に解放する。
+    """
+    label_column = parts[0][0][OUTPUT_LABEL_POSITION]
+    columns = list(dict.fromkeys(column for part in parts for column in part[0]))
+    value_columns = [column for column in columns if column != label_column]
+    positions = {column: position for position, column in enumerate(value_columns)}
+
+    values = np.full((sum(len(part[1]) for part in parts), len(value_columns)), np.nan)
+    labels = np.empty(len(values), dtype=object)
+    start = 0
+    for index, (part_columns, part_labels, part_values) in enumerate(parts):
+        stop = start + len(part_labels)
+        targets = [positions[column] for column in part_columns if column != label_column]
+        if targets == list(range(len(targets))):
+            values[start:stop, :len(targets)] = part_values
+        else:
+            values[start:stop, targets] = part_values
+        labels[start:stop] = part_labels
+        parts[index] = None
+        start = stop
+
+    combined = pd.DataFrame(values, columns=value_columns, copy=False)
+    combined.insert(columns.index(label_column), label_column, pd.Series(labels))
+    return combined
+
+def load_csv_files(directory, max_workers=DEFAULT_MAX_WORKERS):
+    """指定ディレクトリから条件に合致するCSVファイルを読み込む
+
+    OUTPUTディレクトリの Output_ で始まるCSVを名前順にスレッドプールで並列に
+    読み込み（read_output_file）、1つの DataFrame にまとめる（combine_outputs）。
+    (データ, 読み込んだファイルのリスト) を返す。対象が無い場合や全て読み込めな
+    かった場合は (空の DataFrame, []) を返し、読み込めなかったファイルはリストに
+    含めない（処理済みとして削除しない）。
+    """
     # OUTPUTディレクトリからファイルを検索
     output_dir = os.path.join(directory, 'OUTPUT')
     if not os.path.exists(output_dir):
         print(f"OUTPUTディレクトリが存在しません: {output_dir}")
-        return pd.DataFrame()
+        return pd.DataFrame(), []
 
     csv_files = []
     try:
         # ディレクトリ内のファイルを列挙
-        for f in os.listdir(output_dir):
+        for f in sorted(os.listdir(output_dir)):
             if 'Output_' in f and f.lower().endswith('.csv'):
                 full_path = os.path.join(output_dir, f)
                 if os.path.isfile(full_path):  # ファイルが実際に存在することを確認
                     csv_files.append(full_path)
     except Exception as e:
         print(f"ディレクトリの読み込みでエラー: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), []
 
     if not csv_files:
         print("処理対象のCSVファイルが見つかりません")
@@ -37,18 +168,48 @@ def load_csv_files(directory):
 
     print(f"処理対象ファイル: {[os.path.basename(f) for f in csv_files]}")
 
+    def read(file):
+        try:
+            data = read_output_file(file)
+            print(f"{os.path.basename(file)} 読み込み成功")
+            return data
+        except Exception as e:
+            print(f"{os.path.basename(file)} 読み込み失敗: {e}")
+            return None
+
+    workers = min(max_workers or os.cpu_count() or 1, len(csv_files))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map は入力順で結果を返すため、行の並びは逐次処理と同じになる
+            results = list(executor.map(read, csv_files))
+    else:
+        results = [read(file) for file in csv_files]
+
+    loaded_files = [file for file, data in zip(csv_files, results) if data is not None]
+    parts = [data for data in results if data is not None]
+    if parts:
+        return combine_outputs(parts), loaded_files
+    return pd.DataFrame(), []
+
+def load_summary_files(directory):
+    """OUTPUTディレクトリから特徴量の表（Summary_ で始まるCSV）を読み込む"""
+    output_dir = os.path.join(directory, 'OUTPUT')
+    if not os.path.exists(output_dir):
+        return pd.DataFrame(), []
+
+    summary_files = sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir)
+                           if f.startswith(SUMMARY_PREFIX) and f.lower().endswith('.csv'))
     dfs = []
-    for file in csv_files:
+    for file in summary_files:
         try:
-            data = pd.read_csv(file)
+            dfs.append(pd.read_csv(file, encoding='cp932'))
             print(f"{os.path.basename(file)} 読み込み成功")
-            dfs.append(data)
         except Exception as e:
             print(f"{os.path.basename(file)} 読み込み失敗: {e}")
 
     if dfs:
-        return pd.concat(dfs, ignore_index=True), csv_files
-    return pd.DataFrame(), []
+        return pd.concat(dfs, ignore_index=True), summary_files
+    return pd.DataFrame(), summary_files
 
 def filter_data(data_frame):
     """2列目に特定のキーワードが含まれるレコードをフィルタリングする"""
@@ -61,7 +222,9 @@ def get_sheet_name(value):
         'HEL': 'LOG_Helmet',
         'BICYCLE': 'LOG_Bicycle',
         'BASEBALL': 'LOG_BaseBall',
-        'FALLALL': 'LOG_FallArrest'
+        'FALLALL': 'LOG_FallArrest',
+        # ピボットの並び順や特徴量の表では安全帯を FALLARR とも呼ぶ
+        'FALLARR': 'LOG_FallArrest'
     }
     for key, sheet_name in mapping.items():
         if key in value:
@@ -117,12 +280,95 @@ def find_start_row(sheet, start_col):
             return row
     return max_row + 1
 
-def write_data_to_sheet(sheet, data_frame, start_row, start_col):
-    """データフレームの内容をExcelシートに転記する"""
+class SheetCursor:
+    """シートの次に転記する行を保持する
+
+    find_start_row と同じく、2行目以降で start_col の列が空の行を上から順に返す。
+    値のある行はテンプレートの読み込み後に一度だけ調べて記録し、以降は
+    シートを走査し直さずにメモリ上で次の行へ進める。途中に空行のある
+    既存のデータ（テンプレートにあらかじめ入っている行）も飛ばさずに埋める。
+    """
+
+    def __init__(self, sheet, start_col=2, first_row=2):
+        # 値のある行は max_row までにしか無いため、その範囲の start_col の列だけを調べる
+        # （値の無いセルは書式が無ければ保存されないため、走査で作られても出力は変わらない）
+        values = sheet.iter_rows(min_row=first_row, max_row=max(first_row, sheet.max_row),
+                                 min_col=start_col, max_col=start_col, values_only=True)
+        self.occupied = {row for row, (value,) in enumerate(values, start=first_row) if value is not None}
+        self.row = first_row
+
+    @classmethod
+    def from_rows(cls, occupied, first_row=2):
+        """値のある行番号の集合からカーソルを作る（openpyxl を使わない出力方式用）"""
+        cursor = cls.__new__(cls)
+        cursor.occupied = set(occupied)
+        cursor.row = first_row
+        return cursor
+
+    def next_row(self):
+        """次に転記する行を返し、カーソルをその次に進める"""
+        while self.row in self.occupied:
+            self.row += 1
+        row = self.row
+        self.row += 1
+        return row
+
+def create_sheet_cursors(workbook, start_col=2):
+    """LOG_ で始まる各シートのカーソルを作る（テンプレートを読み込んだ直後に一度だけ呼ぶ）"""
+    names = [name for name in workbook.sheetnames if name.startswith('LOG_')]
+    if isinstance(workbook, XlsmPackage):
+        return {name: SheetCursor.from_rows(workbook.occupied_rows(name, start_col)) for name in names}
+    return {name: SheetCursor(workbook[name], start_col) for name in names}
+
+def write_data_to_sheet(sheet, data_frame, start_row, start_col, skip_missing=False):
+    """データフレームの内容をExcelシートに転記する
+
+    skip_missing を指定すると欠損値のセルを作らない（間引いた点が空のセルとして
+    ファイルに残らないようにする）。
+    """
     for index, row in enumerate(data_frame.iterrows(), start=0):
         for col_index, value in enumerate(row[1], start=0):
+            if skip_missing and pd.isna(value):
+                continue
             sheet.cell(row=start_row + index, column=start_col + col_index - 1).value = value
 
+def write_summary_sheet(workbook, summary):
+    """特徴量の表をシートに追記する（シートが無ければ見出し付きで作成する）"""
+    if isinstance(workbook, XlsmPackage):
+        rows = [[None if pd.isna(value) else value for value in row] for row in summary.itertuples(index=False)]
+        if SUMMARY_SHEET_NAME not in workbook.sheetnames:
+            workbook.create_sheet(SUMMARY_SHEET_NAME)
+            rows.insert(0, list(summary.columns))
+        workbook.append_rows(SUMMARY_SHEET_NAME, rows)
+        return
+
+    if SUMMARY_SHEET_NAME in workbook.sheetnames:
+        sheet = workbook[SUMMARY_SHEET_NAME]
+    else:
+        sheet = workbook.create_sheet(SUMMARY_SHEET_NAME)
+        sheet.append(list(summary.columns))
+
+    for row in summary.itertuples(index=False):
+        sheet.append([None if pd.isna(value) else value for value in row])
+
+def write_block_to_sheet(sheet, rows, start_col, skip_missing=False, cursor=None):
+    """2次元のデータ（値のリストのリスト）をまとめてExcelシートに転記する
+
+    各行は cursor（省略時はこのシートの SheetCursor を作成）の示す行に書き込む。
+    DataFrame を経由せず、行を探し直さずに書き込む。テンプレートに既にある
+    セルは書式を残すため値だけ書き換える。skip_missing を指定すると欠損値の
+    セルを作らない。
+    """
+    cursor = cursor or SheetCursor(sheet, start_col)
+    cell = sheet.cell
+    for values in rows:
+        row = cursor.next_row()
+        for column, value in enumerate(values, start=start_col - 1):
+            # NaN は自身と等しくならない
+            if skip_missing and (value is None or value != value):
+                continue
+            cell(row=row, column=column).value = value
+
 def save_workbook(workbook, directory, sheet_names_used):
     """ワークブックを新しいファイル名で保存する"""
     # EXCELディレクトリの決定
@@ -142,22 +388,22 @@ def save_workbook(workbook, directory, sheet_names_used):
         base_filename = '_'.join(unique_prefixes) + '_グラフ作成用ファイル'
 
     file_extension = '.xlsm'
-    count = 0
     pattern = f"{base_filename}_{{}}{file_extension}"
 
-    while True:
-        new_filename = pattern.format(count)
-        new_path = os.path.join(excel_dir, new_filename)
-        if not os.path.exists(new_path):
-            break
-        count += 1
+    new_filename = allocate_filename(excel_dir, pattern.format,
+                                     hint_path=sequence_hints_path(directory))
+    new_path = os.path.join(excel_dir, new_filename)
 
-    workbook.save(new_path)
+    try:
+        workbook.save(new_path)
+    finally:
+        # 保存し終えたか、保存できなかった場合も確保を解除する
+        release_filename(new_path)
     workbook.close()
     print(f"Excelファイルを保存しました: {new_path}")
     return new_path
 
-def cleanup_output_files(files):
+def cleanup_output_files(files, retention=None):
     """処理済みファイルを削除する。"""
     for file in files:
         try:
@@ -166,53 +412,184 @@ def cleanup_output_files(files):
         except Exception as e:
             print(f"ファイル削除でエラー: {os.path.basename(file)} - {e}")
 
-def main():
-    # 環境変数から基本パスを取得
-    base_directory = os.environ.get('OneDriveGraph')
-    if not base_directory:
-        print("環境変数 'OneDriveGraph' が設定されていません")
-        return False
+    # 保持期間インデックスからも外す
+    if retention:
+        retention.forget(files)
 
-    # データの処理
-    df, processed_files = load_csv_files(base_directory)
-    if df.empty:
-        print("処理対象のデータがありません")
-        return False
+def load_template(template_path, workbook_writer=DEFAULT_WORKBOOK_WRITER, template_cache=None):
+    """テンプレートを出力方式に応じて開く（openpyxl のワークブックか XlsmPackage）
+
+    template_cache（TemplateCache）を渡すと、読み込み済みのテンプレートの複製を使う。
+    """
+    if template_cache is not None:
+        return template_cache.load(template_path, workbook_writer)
+    if workbook_writer == 'package':
+        return XlsmPackage(template_path)
+    return openpyxl.load_workbook(template_path, keep_vba=True)
+
+def fill_workbook(workbook, filtered_data, skip_missing=False):
+    """フィルタ済みのデータを転記先のシートごとにまとめて転記し、使用したシート名の集合を返す"""
+    sheet_names_used = set()
+    # 各シートの転記を始める行は、読み込んだ直後に一度だけ調べる
+    cursors = create_sheet_cursors(workbook)
+
+    # データを転記先のシートごとにまとめ、シートごとに1回で転記
+    sheet_names = filtered_data.iloc[:, 1].map(get_sheet_name)
+    for value in filtered_data.iloc[:, 1][sheet_names.isna()]:
+        print(f"警告: 対応するシートが見つかりませんでした。値: {value}")
+    for sheet_name in dict.fromkeys(sheet_names.dropna()):
+        sheet_names_used.add(sheet_name)
+        block = filtered_data[(sheet_names == sheet_name).to_numpy()]
+        rows = block.to_numpy(dtype=object).tolist()
+        if isinstance(workbook, XlsmPackage):
+            # 1列目（A列）から書き込み、カーソルは2列目（B列）の空きで進める
+            cursor = cursors[sheet_name]
+            workbook.write_rows(sheet_name, [cursor.next_row() for _ in rows], rows, 1, skip_missing=skip_missing)
+        else:
+            write_block_to_sheet(workbook[sheet_name], rows, 2, skip_missing=skip_missing,
+                                 cursor=cursors.get(sheet_name))
+    return sheet_names_used
+
+def write_workbook(base_directory, df, target_points=None, decimation=DEFAULT_DECIMATION_METHOD, summary=None,
+                   workbook_writer=DEFAULT_WORKBOOK_WRITER, template_cache=False, output_mode=DEFAULT_OUTPUT_MODE,
+                   max_workers=DEFAULT_MAX_WORKERS):
+    """ピボット済みのデータをテンプレートに転記してExcelファイルを保存する
+
+    summary に特徴量の表を渡すと、「特徴量」シートにも書き出す。
+    target_points を指定すると、各ショットの波形をその点数程度に間引いてから
+    転記する（最大値・最小値の点は必ず残し、列の位置は変えない）。
+    workbook_writer='package' はテンプレートを openpyxl で読み込まず、転記する
+    シートのXMLだけを作り直して他のパーツはそのままコピーする（xlsm_package.py）。
+    template_cache を指定すると、読み込み済みのテンプレートをメモリ上に残して同じ
+    プロセスの次回の変換から使う（監視モード向け、テンプレートを編集すると読み込み直す）。
+    output_mode='category' はカテゴリごとに別のファイルに保存する
+    （write_category_workbooks）。
+    保存したファイルのパスを返す（'category' の場合はパスのリスト、転記する
+    データが無い場合はNone）。
+    """
+    if workbook_writer not in WORKBOOK_WRITERS:
+        raise ValueError(f"不明なExcel出力方式です: {workbook_writer}")
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"不明な出力モードです: {output_mode}")
+    if output_mode == 'category':
+        options = {'target_points': target_points, 'decimation': decimation,
+                   'workbook_writer': workbook_writer, 'template_cache': template_cache}
+        return write_category_workbooks(base_directory, df, summary, options, max_workers)
 
     filtered_data = filter_data(df)
     if filtered_data.empty:
         print("条件に合致するデータがありません。")
-        return False
+        return None
+
+    decimated = target_points is not None
+    if decimated:
+        filtered_data = decimate_frame(filtered_data, target_points, decimation)
+        print(f"波形を間引きました（{decimation}、目標 {target_points} 点）")
 
     # テンプレートファイルの選択と検証
     template_file, show_warning = get_template_file(filtered_data)
     template_path = validate_template(base_directory, template_file)
 
-    # Excelファイルを読み込む
-    workbook = openpyxl.load_workbook(template_path, keep_vba=True)
-
-    # 使用されたシート名を追跡
-    sheet_names_used = set()
+    # Excelファイルを読み込み、データを転記
+    cache = shared_template_cache() if template_cache else None
+    workbook = load_template(template_path, workbook_writer, cache)
+    sheet_names_used = fill_workbook(workbook, filtered_data, skip_missing=decimated)
 
-    # データを適切なシートに転記
-    for index, row in filtered_data.iterrows():
-        sheet_name = get_sheet_name(row.iloc[1])
-        if sheet_name:
-            sheet = workbook[sheet_name]
-            sheet_names_used.add(sheet_name)
-            start_row = find_start_row(sheet, 2)
-            write_data_to_sheet(sheet, pd.DataFrame([row]), start_row, 2)
-        else:
-            print(f"警告: 対応するシートが見つかりませんでした。値: {row[1]}")
+    if summary is not None and not summary.empty:
+        write_summary_sheet(workbook, summary)
 
     # ワークブックを保存
-    save_workbook(workbook, base_directory, sheet_names_used)
-    cleanup_output_files(processed_files)
+    saved_path = save_workbook(workbook, base_directory, sheet_names_used)
 
     # 警告表示（データが1件も無い場合）
     if show_warning:
         print("警告: データが存在しないため、デフォルトテンプレート（ヘルメットグラフ作成.xlsm）を使用しました。")
 
+    return saved_path
+
+def write_category_workbooks(base_directory, df, summary=None, options=None, max_workers=DEFAULT_MAX_WORKERS):
+    """転記先のシート（カテゴリ）ごとにデータを分け、カテゴリごとのファイルを並列に保存する
+
+    各カテゴリはそのカテゴリのテンプレートに転記し、save_workbook の命名規則
+    （Helmet_グラフ作成用ファイル_N.xlsm など）で保存する。特徴量の表も
+    サンプル名でカテゴリごとに分ける。カテゴリが複数あり max_workers（省略時は
+    CPU 数）が2以上の場合はプロセスプールで並列に処理する。1つでも失敗した場合は
+    保存済みのファイルも削除し、次回すべてのカテゴリをやり直せるようにする。
+    保存したファイルのパスのリストを返す（転記するデータが無い場合はNone）。
+    """
+    options = options or {}
+    filtered_data = filter_data(df)
+    if filtered_data.empty:
+        print("条件に合致するデータがありません。")
+        return None
+
+    sheet_names = filtered_data.iloc[:, 1].map(get_sheet_name)
+    for value in filtered_data.iloc[:, 1][sheet_names.isna()]:
+        print(f"警告: 対応するシートが見つかりませんでした。値: {value}")
+    summary_sheet_names = None
+    if summary is not None and not summary.empty:
+        summary_sheet_names = summary.iloc[:, 0].astype(str).map(get_sheet_name)
+
+    tasks = []
+    for sheet_name in dict.fromkeys(sheet_names.dropna()):
+        part = filtered_data[(sheet_names == sheet_name).to_numpy()]
+        part_summary = None
+        if summary_sheet_names is not None:
+            part_summary = summary[(summary_sheet_names == sheet_name).to_numpy()]
+        tasks.append((sheet_name, part, part_summary))
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    saved_paths = []
+    try:
+        if workers > 1:
+            print(f"カテゴリごとに並列に保存: process x {workers}")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(write_workbook, base_directory, part, summary=part_summary, **options)
+                           for _, part, part_summary in tasks]
+                # 失敗したカテゴリがあっても、他のカテゴリの保存が終わるのを待ってから削除する
+                errors = []
+                for future in futures:
+                    try:
+                        saved_paths.append(future.result())
+                    except BaseException as e:
+                        errors.append(e)
+                if errors:
+                    raise errors[0]
+        else:
+            for _, part, part_summary in tasks:
+                saved_paths.append(write_workbook(base_directory, part, summary=part_summary, **options))
+    except BaseException:
+        for path in saved_paths:
+            if path:
+                try:
+                    os.remove(path)
+                    print(f"他のカテゴリの保存に失敗したため削除: {os.path.basename(path)}")
+                except FileNotFoundError:
+                    pass
+        raise
+    return saved_paths
+
+def main(target_points=None, decimation=DEFAULT_DECIMATION_METHOD, workbook_writer=DEFAULT_WORKBOOK_WRITER,
+         template_cache=False, output_mode=DEFAULT_OUTPUT_MODE, max_workers=DEFAULT_MAX_WORKERS):
+    # 環境変数から基本パスを取得
+    base_directory = os.environ.get('OneDriveGraph')
+    if not base_directory:
+        print("環境変数 'OneDriveGraph' が設定されていません")
+        return False
+
+    # データの処理
+    df, processed_files = load_csv_files(base_directory)
+    if df.empty:
+        print("処理対象のデータがありません")
+        return False
+
+    summary, summary_files = load_summary_files(base_directory)
+
+    if not write_workbook(base_directory, df, target_points, decimation, summary, workbook_writer, template_cache,
+                          output_mode, max_workers):
+        return False
+    cleanup_output_files(processed_files + summary_files, RetentionIndex(base_directory))
+
     return True
 
 if __name__ == '__main__':
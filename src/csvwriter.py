@@ -0,0 +1,87 @@
+import os
+import numpy as np
+
+# 一度に文字列にする行数（ファイル全体の文字列を作らず、この行数ずつ書き出す）
+DEFAULT_CHUNK_ROWS = 64
+# 引用符で囲む必要のある文字（csv.QUOTE_MINIMAL と同じ）
+QUOTE_CHARACTERS = (',', '"', '\r', '\n')
+
+def quote_field(text):
+    """必要な場合だけ引用符で囲む"""
+    if any(char in text for char in QUOTE_CHARACTERS):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+def make_float_formatter(float_format=None):
+    """数値を文字列にする関数を返す（None は DataFrame.to_csv と同じ repr 表記）
+
+    float_format は to_csv と同じく '%.6f' のような書式文字列か、関数を指定できる。
+    """
+    if float_format is None:
+        return repr
+    if callable(float_format):
+        return float_format
+    return float_format.__mod__
+
+def format_floats(values, formatter=repr):
+    """float配列を文字列のオブジェクト配列にする（欠損は空欄）
+
+    同じ値は一度だけ文字列にする。HIOKIのデータはA/D変換で量子化されていて
+    値の種類が少ないため、要素ごとに変換するより大幅に速い。
+    """
+    uniques, inverse = np.unique(values, return_inverse=True)
+    # np.unique は 0.0 と -0.0 を区別しないため、代表値を 0.0 にそろえて -0.0 は後で変換する
+    uniques[uniques == 0] = 0.0
+    formatted = np.array([formatter(value) for value in uniques.tolist()] + [''], dtype=object)
+    # 欠損は末尾の空欄を指すようにする
+    inverse = inverse.reshape(values.shape)
+    inverse[np.isnan(values)] = len(uniques)
+    strings = formatted[inverse]
+
+    negative_zero = (values == 0) & np.signbit(values)
+    if negative_zero.any():
+        strings[negative_zero] = formatter(-0.0)
+    return strings
+
+def format_objects(values):
+    """数値以外の列を文字列にする（欠損は空欄）"""
+    strings = np.empty(values.shape, dtype=object)
+    for index, value in np.ndenumerate(values):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            strings[index] = ''
+        else:
+            strings[index] = quote_field(str(value))
+    return strings
+
+def write_frame_csv(df, path, encoding='cp932', float_format=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """DataFrame を to_csv(index=False) と同じ形式で書き出す
+
+    float の列はまとめて文字列に変換し、サンプル名などそれ以外の列と
+    組み合わせて chunk_rows 行ずつファイルに書き出す。
+    """
+    chunks = (df.iloc[start:start + chunk_rows] for start in range(0, df.shape[0], chunk_rows))
+    write_frames_csv(df.columns, chunks, path, encoding=encoding, float_format=float_format)
+
+def write_frames_csv(columns, frames, path, encoding='cp932', float_format=None):
+    """列の同じ DataFrame を順に受け取り、1つのCSVとして書き出す
+
+    frames は DataFrame を返すイテレータでもよく、全体を一度に作らずに
+    書き出せる。出力は全ての行をまとめた DataFrame の write_frame_csv と同じ。
+    """
+    formatter = make_float_formatter(float_format)
+
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(','.join(quote_field(str(column)) for column in columns) + os.linesep)
+
+        for chunk in frames:
+            is_float = [dtype.kind == 'f' for dtype in chunk.dtypes]
+            float_positions = [position for position, flag in enumerate(is_float) if flag]
+            other_positions = [position for position, flag in enumerate(is_float) if not flag]
+            cells = np.empty(chunk.shape, dtype=object)
+            if float_positions:
+                cells[:, float_positions] = format_floats(
+                    chunk.iloc[:, float_positions].to_numpy(dtype=np.float64), formatter)
+            if other_positions:
+                cells[:, other_positions] = format_objects(
+                    chunk.iloc[:, other_positions].to_numpy(dtype=object))
+            f.write(''.join(','.join(row) + os.linesep for row in cells.tolist()))
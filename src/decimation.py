@@ -0,0 +1,136 @@
+import numpy as np
+from src.convert_options import DECIMATION_METHODS, DEFAULT_DECIMATION_METHOD
+from src.sample_names import parse_sample_names, UNKNOWN_TYPE_CODE
+
+# 1ショットあたりに残す点数の既定値
+DEFAULT_TARGET_POINTS = 500
+
+def minmax_mask(values, target_points):
+    """区間ごとに最大値と最小値の点を残すマスクを返す
+
+    values は (ショット数, 点数) の時間順の配列。区間の最大・最小を残すので
+    各ショット全体の最大値・最小値も必ず残る。
+    """
+    shot_count, point_count = values.shape
+    bucket_count = max(1, (target_points - 2) // 2)
+    bucket_size = -(-point_count // bucket_count)
+    padded = np.full((shot_count, bucket_count * bucket_size), np.nan)
+    padded[:, :point_count] = values
+    buckets = padded.reshape(shot_count, bucket_count, bucket_size)
+
+    offsets = np.arange(bucket_count) * bucket_size
+    missing = np.isnan(buckets)
+    highest = np.where(missing, -np.inf, buckets).argmax(axis=2) + offsets
+    lowest = np.where(missing, np.inf, buckets).argmin(axis=2) + offsets
+
+    keep = np.zeros((shot_count, bucket_count * bucket_size), dtype=bool)
+    rows = np.arange(shot_count)[:, np.newaxis]
+    keep[rows, highest] = True
+    keep[rows, lowest] = True
+    return keep[:, :point_count]
+
+def lttb_mask(values, target_points):
+    """LTTB で波形の形を保つ点を選ぶマスクを返す
+
+    区間ごとに、前に選んだ点と次の区間の平均点とで作る三角形の面積が最大の点を
+    選ぶ。ショット方向はまとめて計算し、区間の数だけ繰り返す。
+    """
+    shot_count, point_count = values.shape
+    keep = np.zeros(values.shape, dtype=bool)
+    if point_count <= 2 or target_points >= point_count:
+        keep[:] = True
+        return keep
+
+    rows = np.arange(shot_count)
+    keep[:, 0] = True
+    keep[:, -1] = True
+    # 先頭と末尾を除いた点を target_points - 2 個の区間に分ける
+    edges = np.linspace(1, point_count - 1, max(1, target_points - 2) + 1).astype(int)
+
+    selected_x = np.zeros(shot_count)
+    selected_y = values[:, 0].copy()
+    for start, stop, next_stop in zip(edges[:-1], edges[1:], np.append(edges[2:], point_count)):
+        if stop <= start:
+            continue
+        # 次の区間の平均点（最後の区間では末尾の点）
+        next_start = stop if stop < point_count - 1 else point_count - 1
+        next_stop = max(next_stop, next_start + 1)
+        following = values[:, next_start:next_stop]
+        counts = (~np.isnan(following)).sum(axis=1)
+        # 次の区間が全て欠損のショットは平均も欠損にする（面積が欠損になり選ばれにくくなる）
+        average_y = np.nansum(following, axis=1) / np.where(counts > 0, counts, np.nan)
+        average_x = (next_start + next_stop - 1) / 2
+
+        candidate_x = np.arange(start, stop)
+        candidate_y = values[:, start:stop]
+        area = np.abs((selected_x[:, np.newaxis] - average_x) * (candidate_y - selected_y[:, np.newaxis])
+                      - (selected_x[:, np.newaxis] - candidate_x) * (average_y[:, np.newaxis] - selected_y[:, np.newaxis]))
+        area = np.where(np.isnan(area), -1.0, area)
+        choice = area.argmax(axis=1)
+        keep[rows, start + choice] = True
+
+        # 欠損の点を選んだショットは、前に選んだ点を基準のまま使う
+        chosen_y = candidate_y[rows, choice]
+        valid = ~np.isnan(chosen_y)
+        selected_x = np.where(valid, start + choice, selected_x)
+        selected_y = np.where(valid, chosen_y, selected_y)
+    return keep
+
+def decimate_values(values, target_points=DEFAULT_TARGET_POINTS, method=DEFAULT_DECIMATION_METHOD):
+    """各ショットの波形を target_points 点程度に間引き、残さない点を欠損にした配列を返す
+
+    どの方式でも各ショットの最大値・最小値の点と、先頭・末尾の点は必ず残す。
+    点の位置（列）は変えないため、時間軸はそのまま保たれる。
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"不明な間引き方式です: {method}")
+    if target_points < 4:
+        raise ValueError(f"間引きの目標点数が小さすぎます: {target_points}")
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0 or target_points >= values.shape[1]:
+        return values.copy()
+
+    keep = minmax_mask(values, target_points) if method == 'minmax' else lttb_mask(values, target_points)
+
+    # 先頭・末尾と最大値・最小値を確実に残す（全て欠損のショットは最大値・最小値の対象外）
+    keep[:, 0] = True
+    keep[:, -1] = True
+    valid_rows = ~np.isnan(values).all(axis=1)
+    rows = np.flatnonzero(valid_rows)
+    keep[rows, np.nanargmax(values[valid_rows], axis=1)] = True
+    keep[rows, np.nanargmin(values[valid_rows], axis=1)] = True
+    return np.where(keep, values, np.nan)
+
+def column_time_order(labels):
+    """列名（転置前の行番号）から列の時間順の並びを返す
+
+    数値として読めない列名がある場合は、列の並び順を時間順とみなす。
+    """
+    try:
+        numbers = np.array([float(label) for label in labels])
+    except (TypeError, ValueError):
+        return np.arange(len(labels))
+    return np.argsort(numbers, kind='stable')
+
+def decimate_frame(df, target_points=DEFAULT_TARGET_POINTS, method=DEFAULT_DECIMATION_METHOD):
+    """ピボット結果のサンプルの行を間引いた DataFrame を返す
+
+    3列目以降の数値の列を列名（転置前の行番号、column_time_order）で時間順に並べて間引き、
+    残さない値を欠損にする。列の並びは変えないので、テンプレートの列位置と
+    時間の対応はそのまま。Time 行などサンプル名でない行は間引かない。
+    """
+    data_positions = [position for position in range(2, df.shape[1]) if df.dtypes.iloc[position].kind == 'f']
+    if not data_positions:
+        return df
+    time_order = column_time_order([df.columns[position] for position in data_positions])
+    sample_rows = np.flatnonzero(parse_sample_names(df.iloc[:, 1])['type_code'].to_numpy() != UNKNOWN_TYPE_CODE)
+    if len(sample_rows) == 0:
+        return df
+
+    values = df.iloc[sample_rows, data_positions].to_numpy(dtype=np.float64)
+    decimated = np.empty_like(values)
+    decimated[:, time_order] = decimate_values(values[:, time_order], target_points, method)
+
+    result = df.copy()
+    result.iloc[sample_rows, data_positions] = decimated
+    return result
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from src.hioki import HIOKI_DATA_TIME_OFFSET
+from src.sample_names import parse_sample_names, resolve_type_codes, sample_sort_order, SAMPLE_TYPES, UNKNOWN_TYPE_CODE
+
+# 結合済みCSVの時間軸の列名（単位は秒）
+TIME_COLUMN_NAME = 'Time'
+# 特徴量の表を保存するファイル名の接頭辞と、Excelに追加するシート名
+SUMMARY_PREFIX = 'Summary_'
+SUMMARY_SHEET_NAME = '特徴量'
+
+# サンプルの種類ごとの継続時間のしきい値（テンプレートの「4.9(ms)」「150Gの継続時間」などに対応）
+# 安全帯は FALLARR・FALLALL のどちらの名前でも FALLARR のしきい値を使う（SAMPLE_TYPE_ALIASES）
+DEFAULT_THRESHOLDS = {
+    'HEL_TOP': (4.9, 7.3),
+    'HEL_ZENGO': (4.9, 7.3),
+    'HEL_SIDE': (4.9, 7.3),
+    'BICYCLE': (150.0,),
+    'BASEBALL': (),
+    'FALLARR': (2.2,),
+}
+# 1サンプルあたりのしきい値の最大数（表の列数を一定にする）
+MAX_THRESHOLDS = 2
+# 時間（ミリ秒）の丸め桁数（サンプリング間隔の和で生じる誤差を除く）
+TIME_DECIMALS = 9
+
+def summary_columns():
+    """特徴量の表の列名"""
+    columns = ['サンプル名', '最大値', '最大値の時間(ms)']
+    for number in range(1, MAX_THRESHOLDS + 1):
+        columns += [f'しきい値{number}', f'しきい値{number}以上の時間(ms)']
+    return columns + ['力積']
+
+def threshold_matrix(type_codes, thresholds=None):
+    """サンプルごとのしきい値を (サンプル数, MAX_THRESHOLDS) の配列にする（無い所は欠損）"""
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    # 種類コードの順に並べた表から、サンプルごとの行をまとめて取り出す
+    by_code = np.full((len(SAMPLE_TYPES) + 1, MAX_THRESHOLDS), np.nan)
+    for code, sample_type in enumerate(SAMPLE_TYPES):
+        values = tuple(thresholds.get(sample_type, ()))[:MAX_THRESHOLDS]
+        by_code[code, :len(values)] = values
+    return by_code[np.asarray(type_codes)]
+
+def data_time_axis(time, offset=HIOKI_DATA_TIME_OFFSET):
+    """結合済みCSVの Time 列から、データの各行を測定した時刻を返す
+
+    データは Time 列より offset 行後から読み込んでいる（HIOKI_DATA_TIME_OFFSET）ため、
+    i 行目のデータの時刻は Time 列の i + offset 行目になる。Time 列の最後を越える分は
+    最後のサンプリング間隔で延ばす。
+    """
+    time = np.asarray(time, dtype=np.float64)
+    if offset == 0 or len(time) < 2:
+        return time
+    step = time[-1] - time[-2]
+    return np.concatenate([time[offset:], time[-1] + step * np.arange(1, offset + 1)])
+
+def extract_features(time, values, thresholds):
+    """全サンプルの特徴量をまとめて計算する
+
+    time は時間軸（秒）、values は (サンプル数, 点数) の波形、thresholds は
+    (サンプル数, しきい値の数) の配列。欠損の点は計算に含めない。
+    最大値・最大値の時間(ms)・しきい値ごとの継続時間(ms)・力積（値×秒）を返す。
+    """
+    time = np.asarray(time, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=1)
+
+    peak_index = np.where(valid, values, -np.inf).argmax(axis=1)
+    peak = np.where(has_data, values[np.arange(len(values)), peak_index], np.nan)
+    peak_time = np.where(has_data, time[peak_index] * 1000, np.nan)
+
+    # 各点が受け持つ時間幅（最後の点は直前の間隔と同じとする）
+    widths = np.diff(time, append=2 * time[-1] - time[-2]) if len(time) > 1 else np.zeros(len(time))
+    durations = np.empty(thresholds.shape)
+    for column in range(thresholds.shape[1]):
+        # 欠損やしきい値が無い場合の比較は False になる
+        with np.errstate(invalid='ignore'):
+            above = values >= thresholds[:, column:column + 1]
+        durations[:, column] = (above @ widths) * 1000
+    durations[np.isnan(thresholds)] = np.nan
+
+    # 台形公式による積分（欠損は 0 とみなす）
+    filled = np.where(valid, values, 0.0)
+    impulse = ((filled[:, 1:] + filled[:, :-1]) * (np.diff(time) / 2)).sum(axis=1)
+    impulse[~has_data] = np.nan
+
+    return peak, peak_time.round(TIME_DECIMALS), durations.round(TIME_DECIMALS), impulse
+
+def summary_table(labels, values, names=None, thresholds=None, block_rows=None, presorted=False):
+    """転置済みの波形（Time 行を含む）から特徴量の表を作る
+
+    labels は各行の名前、values は (行数, 点数) の配列。Time 行を（データの行と
+    そろえて data_time_axis で）時間軸にして、
+    サンプル名の行（種類の別名 FALLALL なども含む）だけを出力と同じ順に並べる。Time 行が無い
+    場合は None を返す。names には解析済みのサンプル名（parse_sample_names）を渡せる。
+    block_rows を指定すると、計算途中の配列が大きくならないようその行数ずつ計算する。
+    行が既に出力と同じ順に並んでいる場合は presorted=True とする（並べ替え直すと、
+    同じ順位の名前の並びが出力と変わるため）。
+    """
+    labels = np.asarray(labels, dtype=object)
+    time_rows = np.flatnonzero(labels == TIME_COLUMN_NAME)
+    if len(time_rows) == 0:
+        print(f"{TIME_COLUMN_NAME} 列が無いため特徴量を計算できません")
+        return None
+
+    names = parse_sample_names(labels) if names is None else names
+    order = np.arange(len(labels)) if presorted else sample_sort_order(names)
+    type_codes = resolve_type_codes(names)[order]
+    order = order[type_codes != UNKNOWN_TYPE_CODE]
+    type_codes = type_codes[type_codes != UNKNOWN_TYPE_CODE]
+
+    thresholds = threshold_matrix(type_codes, thresholds)
+    time = data_time_axis(values[time_rows[0]])
+    step = block_rows or max(1, len(order))
+    blocks = [extract_features(time, values[order[start:start + step]], thresholds[start:start + step])
+              for start in range(0, max(1, len(order)), step)]
+    peak, peak_time, durations, impulse = (np.concatenate(parts) for parts in zip(*blocks))
+
+    columns = summary_columns()
+    data = {columns[0]: labels[order], columns[1]: peak, columns[2]: peak_time}
+    for number in range(MAX_THRESHOLDS):
+        data[columns[3 + 2 * number]] = thresholds[:, number]
+        data[columns[4 + 2 * number]] = durations[:, number]
+    data[columns[-1]] = impulse
+    return pd.DataFrame(data)
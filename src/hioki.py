@@ -0,0 +1,73 @@
+import numpy as np
+
+# HIOKI8847のCSVレイアウト（ヘッダー行までの行数と1ショットあたりのデータ行数）
+HIOKI_HEADER_ROWS = 8
+HIOKI_DATA_ROWS = 2050
+# 従来の取り込みと同じく、データ（B列）は時間（A列）より1行後から読み込む。
+# そのため結合済みCSVの i 行目のデータは、Time 列の i + 1 行目の時刻に測定したもの
+HIOKI_DATA_TIME_OFFSET = 1
+
+def skip_preamble(data, line_count):
+    """先頭の指定行数をバイト単位で読み飛ばし、残りの開始位置を返す"""
+    position = 0
+    for _ in range(line_count):
+        position = data.find(b'\n', position) + 1
+        if position == 0:
+            return len(data)
+    return position
+
+def read_hioki_column(file_path, column, skip_rows, nrows=None):
+    """HIOKI8847のCSVから指定列の数値をfloat配列として読み込む
+
+    前置きの行はバイト単位で読み飛ばし、数値部分はShift-JISとして
+    デコードせずにそのままNumPyで変換する。
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    block = data[skip_preamble(data, skip_rows):]
+    if b'"' in block:
+        block = block.replace(b'"', b'')
+    text = block.replace(b'\r', b'').strip(b'\n')
+    if b'\n\n' in text:
+        # 空行は pd.read_csv と同じく読み飛ばす
+        text = b'\n'.join(line for line in text.split(b'\n') if line.strip())
+    if not text.strip():
+        return np.empty(0, dtype=np.float64)
+
+    # 列数が全行で揃っていれば1回の分割でまとめて取り出す
+    line_count = text.count(b'\n') + 1
+    column_count = text.split(b'\n', 1)[0].count(b',') + 1
+    tokens = text.replace(b'\n', b',').split(b',')
+    if len(tokens) == line_count * column_count and column < column_count:
+        values = tokens[column::column_count]
+    else:
+        values = [split_field(line, column) for line in text.split(b'\n')]
+    if nrows is not None:
+        values = values[:nrows]
+
+    try:
+        return np.array(list(map(float, values)), dtype=np.float64)
+    except ValueError:
+        # 空欄などを含む場合は1件ずつ変換し、変換できない値は欠損とする
+        return np.array([parse_float(value) for value in values], dtype=np.float64)
+
+def read_hioki_time(file_path):
+    """A列（Time）のデータをヘッダー行の次から最後まで読み込む"""
+    return read_hioki_column(file_path, 0, HIOKI_HEADER_ROWS)
+
+def read_hioki_data(file_path):
+    """B列のデータを pd.read_csv(skiprows=8, nrows=2050, usecols=[1]) と同じ範囲で読み込む"""
+    return read_hioki_column(file_path, 1, HIOKI_HEADER_ROWS + HIOKI_DATA_TIME_OFFSET, HIOKI_DATA_ROWS)
+
+def split_field(line, column):
+    """1行から指定列の値を取り出す（列が無ければ空欄）"""
+    fields = line.split(b',')
+    return fields[column] if column < len(fields) else b''
+
+def parse_float(value):
+    """数値に変換できない値は欠損として扱う"""
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+# キャッシュの保存先を指定する環境変数（未指定の場合は利用者ごとのローカルのフォルダ）
+CACHE_DIRECTORY_ENV = 'GraphCacheDirectory'
+APPLICATION_DIRECTORY_NAME = 'toyo-safety-qc'
+# 作業状態（保持期間インデックス・取り込みの記録・連番の目安）を置くフォルダ名
+STATE_NAME = 'state'
+
+def local_cache_directory(name):
+    """キャッシュの保存先を返す
+
+    OneDrive（SharePoint）で同期されるベースディレクトリには置かず、利用者ごとの
+    ローカルのフォルダを使う。環境変数 GraphCacheDirectory があればその下、
+    Windows では %LOCALAPPDATA%\\toyo-safety-qc\\cache、それ以外では
+    $XDG_CACHE_HOME（既定は ~/.cache）/toyo-safety-qc の下の name フォルダとする。
+    """
+    root = os.environ.get(CACHE_DIRECTORY_ENV)
+    if not root:
+        if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+            root = os.path.join(os.environ['LOCALAPPDATA'], APPLICATION_DIRECTORY_NAME, 'cache')
+        else:
+            cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            root = os.path.join(cache_home, APPLICATION_DIRECTORY_NAME)
+    return os.path.join(root, name)
+
+def local_state_path(base_directory, filename):
+    """ベースディレクトリごとの作業状態のファイルのパスを返す
+
+    作業状態は同期されるベースディレクトリ（の STATE フォルダ）には置かず、
+    local_cache_directory の下にベースディレクトリのパスごとのフォルダを作る
+    （テスト用と本番用のように別のベースディレクトリの記録が混ざらないようにする）。
+    """
+    key = hashlib.sha256(os.path.normcase(os.path.abspath(base_directory)).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(local_cache_directory(STATE_NAME), key, filename)
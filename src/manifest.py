@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+class ImportManifest:
+    """取り込み済みのソースファイルを内容のハッシュとサイズで記録する
+
+    取り込みの完了はアーカイブの書き出し用のスレッドから記録することがあるため、
+    記録の変更と保存はロックで排他する。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        """マニフェストを読み込む（存在しない・壊れている場合は空とする）"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except (OSError, ValueError) as e:
+            print(f"マニフェストの読み込みでエラー: {str(e)}")
+            return {}
+
+    def save(self):
+        """一時ファイルに書いてから置き換え、途中で中断しても壊れないように保存する"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def file_key(file_path, chunk_size=1024 * 1024):
+        """ファイル内容のSHA-256とサイズからキーを作る"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        return f"{digest.hexdigest()}:{size}"
+
+    def is_imported(self, key):
+        """取り込みが完了しているか"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry['status'] == 'imported'
+
+    def mark_pending(self, sources, output_filename):
+        """書き出し前に、取り込み中のファイルと出力先を記録する
+
+        sources は {キー: ソースファイル名} の辞書。
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            for key, source in sources.items():
+                self.entries[key] = {
+                    'source': source,
+                    'output': output_filename,
+                    'status': 'pending',
+                    'updated_at': now,
+                }
+            self.save()
+
+    def mark_imported(self, keys):
+        """取り込み完了として記録する"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            for key in keys:
+                self.entries[key]['status'] = 'imported'
+                self.entries[key]['updated_at'] = now
+            self.save()
+
+    def resume_pending(self, is_output_complete):
+        """前回中断した取り込みを確認する
+
+        出力ファイルが書き終わっていれば完了扱いにし、そうでなければ記録を
+        取り消して次回に再度取り込む。完了扱いにした出力ファイル名を返す。
+        """
+        with self.lock:
+            pending = [key for key, entry in self.entries.items() if entry['status'] == 'pending']
+            if not pending:
+                return []
+
+            completed = set()
+            for key in pending:
+                output_filename = self.entries[key]['output']
+                if is_output_complete(output_filename):
+                    completed.add(output_filename)
+                    self.entries[key]['status'] = 'imported'
+                else:
+                    del self.entries[key]
+            self.save()
+            return sorted(completed)
+
+    def prune(self, days):
+        """指定日数より古い記録を削除する"""
+        threshold = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        with self.lock:
+            expired = [key for key, entry in self.entries.items()
+                       if entry['status'] == 'imported' and entry['updated_at'] < threshold]
+            for key in expired:
+                del self.entries[key]
+            if expired:
+                self.save()
+            return len(expired)
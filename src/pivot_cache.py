@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+from src.local_cache import local_cache_directory
+from src.manifest import ImportManifest
+
+# ピボット結果の形式のバージョン（列の並べ替えや特徴量の計算を変えた場合は上げる）
+PIVOT_LAYOUT_VERSION = 4
+# キャッシュの保存先（同期されないローカルのキャッシュフォルダの下の名前）と合計サイズの上限
+CACHE_NAME = 'pivot'
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_EXTENSION = '.npz'
+
+def frame_to_arrays(df, prefix):
+    """サンプル名の列が1つだけで残りが数値の DataFrame を、npz に保存できる配列にする"""
+    is_label = [dtype.kind != 'f' for dtype in df.dtypes]
+    label_position = is_label.index(True)
+    numeric = df.drop(columns=df.columns[label_position])
+    return {
+        f'{prefix}_labels': df.iloc[:, label_position].to_numpy(dtype=str),
+        f'{prefix}_label_position': np.array(label_position),
+        f'{prefix}_values': numeric.to_numpy(dtype=np.float64),
+        f'{prefix}_columns': np.array([str(column) for column in df.columns], dtype=str),
+        # 列名の型（転置前の行番号の列名は int）を元に戻すため
+        f'{prefix}_column_is_int': np.array([isinstance(column, (int, np.integer)) for column in df.columns]),
+    }
+
+def frame_from_arrays(arrays, prefix):
+    """frame_to_arrays で保存した配列から DataFrame を作り直す"""
+    columns = [int(column) if is_int else str(column)
+               for column, is_int in zip(arrays[f'{prefix}_columns'], arrays[f'{prefix}_column_is_int'])]
+    label_position = int(arrays[f'{prefix}_label_position'])
+    label_column = columns.pop(label_position)
+    df = pd.DataFrame(arrays[f'{prefix}_values'], columns=columns, copy=False)
+    df.insert(label_position, label_column, arrays[f'{prefix}_labels'].astype(object))
+    return df
+
+def default_cache_directory():
+    """既定の保存先（local_cache_directory の下の pivot フォルダ）"""
+    return local_cache_directory(CACHE_NAME)
+
+class PivotCache:
+    """入力ファイルの内容のハッシュをキーにして、ピボット結果を保存・再利用する
+
+    結果はピボット後の数値配列とサンプル名を npz 形式で保存する。使用した
+    エントリは更新時刻を新しくし、合計サイズが max_bytes を超えたら最も長く
+    使われていないものから削除する。
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, filepath):
+        """入力ファイルの内容（SHA-256とサイズ）とピボット結果の形式のバージョンからキーを作る"""
+        return f"{ImportManifest.file_key(filepath).replace(':', '_')}_v{PIVOT_LAYOUT_VERSION}"
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def get(self, key):
+        """キャッシュされた (出力, 特徴量の表) を返す（無い場合はNone、特徴量が無い場合は表がNone）"""
+        path = self.entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                arrays = dict(arrays)
+            df_final = frame_from_arrays(arrays, 'output')
+            summary = frame_from_arrays(arrays, 'summary') if 'summary_values' in arrays else None
+        except Exception as e:
+            print(f"キャッシュの読み込みでエラー: {os.path.basename(path)} - {str(e)}")
+            self.discard(path)
+            return None
+
+        # 最近使ったエントリとして残るよう更新時刻を新しくする
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df_final, summary
+
+    def put(self, key, df_final, summary=None):
+        """ピボット結果を保存し、上限を超えた分を古いものから削除する"""
+        arrays = frame_to_arrays(df_final, 'output')
+        if summary is not None:
+            arrays.update(frame_to_arrays(summary, 'summary'))
+
+        path = self.entry_path(key)
+        # 同じ内容のファイルを並列に処理するプロセスと一時ファイルが重ならないようにする
+        temp_path = f"{path}.{os.getpid()}.part"
+        try:
+            # 書き終わってから置き換え、並列に動く他のプロセスが途中の内容を読まないようにする
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"キャッシュの保存でエラー: {os.path.basename(path)} - {str(e)}")
+            self.discard(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """合計サイズが上限以下になるまで、更新時刻の古いエントリから削除する"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(CACHE_EXTENSION):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self.discard(path)
+            total_bytes -= size
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,165 @@
+import functools
+import tempfile
+import numpy as np
+import pandas as pd
+from src.archive import open_archive
+from src.sample_names import parse_sample_names, sample_sort_order
+
+# ピボット方式: 'numpy'（型付き配列で処理）, 'pandas'（DataFrameを転置して処理）,
+# 'chunked'（メモリ使用量の上限内で、ファイルを少しずつ読み込んで処理）
+PIVOT_ENGINES = ('numpy', 'pandas', 'chunked')
+DEFAULT_PIVOT_ENGINE = 'numpy'
+
+# 'chunked' のメモリ使用量の上限（バイト）
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+# 読み込み・書き出しで1セルあたりに使うメモリの目安（解析途中の値や文字列を含む）
+READ_BYTES_PER_CELL = 64
+WRITE_BYTES_PER_CELL = 160
+
+# 出力の先頭2列の列名
+FIRST_COLUMN_NAME = 'New First Column'
+LABEL_COLUMN_NAME = 'New Column'
+# 転置後の列の並べ替え位置（52列目以降を25列目に移す）と、サンプル名の後で空欄にする列数
+MOVE_FROM = 51
+MOVE_TO = 24
+BLANK_COUNT = 22
+
+class PivotTable:
+    """転置後のデータ
+
+    サンプル名は labels、波形は行ごとに連続した float64 の2次元配列 values として
+    別々に持ち、DataFrame の転置のように全体を1つの表にまとめない。
+    columns は values の各列の列名（転置前の行番号）。names はサンプル名の
+    解析結果（parse_sample_names）で、後の処理段が名前を解析し直さずに使える。
+    """
+
+    def __init__(self, labels, values, columns, names):
+        self.labels = labels
+        self.values = values
+        self.columns = columns
+        self.names = names
+
+    @property
+    def shape(self):
+        return (len(self.labels), len(self.columns) + 1)
+
+def read_pivot_table(filepath, encoding='cp932'):
+    """結合済みCSVを読み込み、転置した PivotTable を返す"""
+    # 結合済みCSVは数値のみなので型推定を省く
+    return pivot_table_from_frame(pd.read_csv(filepath, encoding=encoding, dtype=np.float64))
+
+def pivot_table_from_frame(df):
+    """結合済みのDataFrame（Time列と各サンプルの列）を転置した PivotTable を返す"""
+    labels = np.array(df.columns, dtype=object)
+    # 列ごとに格納された数値ブロックの転置は、行ごとに連続した配列になる
+    values = np.ascontiguousarray(df.to_numpy(dtype=np.float64).T)
+    return PivotTable(labels, values, np.arange(df.shape[0]), parse_sample_names(labels))
+
+def sort_table(table):
+    """サンプル名の種類の優先順・番号順に行を並べ替える"""
+    order = sample_sort_order(table.names)
+    return PivotTable(table.labels[order], table.values.take(order, axis=0), table.columns,
+                      table.names.iloc[order].reset_index(drop=True))
+
+def adjusted_column_positions(width):
+    """CSVPivot.adjust_columns 後に残る列を、転置後の列位置で返す
+
+    width は転置後の列数（先頭のサンプル名の列を含む）。先頭の2列（追加する空の列と
+    サンプル名）は含まない。
+    """
+    order = (list(range(min(MOVE_TO, width))) + list(range(MOVE_FROM, width))
+             + list(range(MOVE_TO, min(MOVE_FROM, width))))
+    # 新しい列を先頭に挿入したあとの3列目（元の2列目）は削除される
+    del order[1]
+    return order[1:]
+
+class ColumnPlan:
+    """adjust_columns の列の並べ替えを、出力の列ごとの取得元として事前に計算したもの
+
+    出力は先頭の空の列とサンプル名の列に数値の列が続く。サンプル名を除いた
+    数値部分は空欄の列が先頭にまとまり、残りの列は転置後の列位置 sources から
+    取得するので、作成済みの配列に直接集められる。
+    """
+
+    def __init__(self, width):
+        positions = adjusted_column_positions(width)
+        blank_count = min(BLANK_COUNT, len(positions))
+        # 数値部分の列名（先頭の空の列と、転置前の行番号）
+        self.columns = [FIRST_COLUMN_NAME] + [position - 1 for position in positions]
+        self.blank_count = 1 + blank_count
+        self.sources = np.array(positions[blank_count:], dtype=np.intp) - 1
+        # 同じ列数のファイルで共有するため書き換えられないようにする
+        self.sources.flags.writeable = False
+
+    @property
+    def output_columns(self):
+        """出力の列名（2列目にサンプル名の列を含む）"""
+        return self.columns[:1] + [LABEL_COLUMN_NAME] + self.columns[1:]
+
+    def apply(self, values):
+        """転置後の数値配列（サンプル名の列を除く）から数値部分を組み立てる"""
+        out = np.empty((values.shape[0], len(self.columns)), dtype=np.float64)
+        out[:, :self.blank_count] = np.nan
+        # 出力先が連続した領域でないと take は一時配列を経由するため、行ごとに集める
+        for row, target in zip(values, out[:, self.blank_count:]):
+            np.take(row, self.sources, out=target, mode='clip')
+        return out
+
+    def frame(self, labels, values):
+        """出力用の DataFrame を作る（数値部分は1つの float64 ブロックのまま）"""
+        df = pd.DataFrame(self.apply(values), columns=self.columns, copy=False)
+        df.insert(1, LABEL_COLUMN_NAME, labels)
+        return df
+
+@functools.lru_cache(maxsize=8)
+def column_plan(width):
+    """転置後の列数ごとの ColumnPlan（同じ列数のファイルでは使い回す）"""
+    return ColumnPlan(width)
+
+def adjust_table(table):
+    """列を並べ替え、出力用の DataFrame を作る"""
+    return column_plan(table.shape[1]).frame(table.labels, table.values)
+
+def count_data_rows(filepath):
+    """CSVファイルのデータ行数（見出しの行と空行を除く）を数える（CSV_LOG の圧縮ファイルも可）"""
+    with open_archive(filepath, 'rb') as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+def read_sorted_table_chunked(filepath, encoding='cp932', memory_limit=DEFAULT_MEMORY_LIMIT):
+    """結合済みCSVを時間方向に少しずつ読み込み、並べ替え済みの PivotTable を返す
+
+    見出しのサンプル名から並び順を先に決め、読み込んだ行のまとまりごとに転置して
+    作成済みの配列の該当位置に書き込む。ファイル全体の DataFrame や転置の
+    一時配列は作らない。転置後の配列が memory_limit の半分を超える場合は
+    一時ファイルに対応付けた配列（np.memmap）を使う。
+    """
+    labels = np.array(pd.read_csv(filepath, encoding=encoding, nrows=0).columns, dtype=object)
+    names = parse_sample_names(labels)
+    order = sample_sort_order(names)
+    row_count = count_data_rows(filepath)
+
+    shape = (len(labels), row_count)
+    if shape[0] * shape[1] * 8 > memory_limit // 2:
+        # 一時ファイルは閉じると削除され、配列が使われなくなるまでは対応付けが残る
+        values = np.memmap(tempfile.TemporaryFile(), dtype=np.float64, mode='w+', shape=shape)
+    else:
+        values = np.empty(shape, dtype=np.float64)
+
+    chunk_rows = max(1, (memory_limit // 2) // (READ_BYTES_PER_CELL * len(labels)))
+    start = 0
+    with pd.read_csv(filepath, encoding=encoding, dtype=np.float64, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            stop = start + len(chunk)
+            values[:, start:stop] = chunk.to_numpy(dtype=np.float64).T[order]
+            start = stop
+    if start != row_count:
+        raise ValueError(f"読み込んだ行数が一致しません: {start} / {row_count}")
+
+    return PivotTable(labels[order], values, np.arange(row_count), names.iloc[order].reset_index(drop=True))
+
+def iter_adjusted_frames(table, memory_limit=DEFAULT_MEMORY_LIMIT):
+    """列を並べ替えた出力用の DataFrame を、memory_limit に収まる行数ずつ返す"""
+    plan = column_plan(table.shape[1])
+    block_rows = max(1, (memory_limit // 2) // (WRITE_BYTES_PER_CELL * len(plan.columns)))
+    for start in range(0, len(table.labels), block_rows):
+        yield plan.frame(table.labels[start:start + block_rows], table.values[start:start + block_rows])
@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+from src.local_cache import local_state_path
+
+# 保持期間管理用のインデックス（local_state_path で利用者ごとのローカルのフォルダに置く）
+RETENTION_INDEX_FILENAME = 'retention_index.json'
+# 登録・削除はインデックスを書き直さずジャーナルに1行ずつ追記し、apply でまとめて反映する。
+# 監視モードのように apply が長く呼ばれない場合も、この大きさを超えたら反映する
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+# インデックスに無い変更を取り込むため、この日数ごとにディレクトリを走査し直す
+RESCAN_INTERVAL_DAYS = 7
+# 他のプロセスがインデックスを更新し終わるのを待つ時間の上限（秒）
+INDEX_LOCK_TIMEOUT = 30.0
+INDEX_LOCK_POLL_INTERVAL = 0.05
+
+# プロセス内で共有するロック（インデックスのパスごと）
+INDEX_LOCKS = {}
+INDEX_LOCKS_GUARD = threading.Lock()
+
+def index_lock(index_path):
+    """インデックスのパスごとに、プロセス内で共有するロックを返す"""
+    with INDEX_LOCKS_GUARD:
+        return INDEX_LOCKS.setdefault(os.path.abspath(index_path), threading.Lock())
+
+class IndexFileLock:
+    """インデックスを読み込んでから保存し終わるまで、他のプロセスを待たせる
+
+    ロック用のファイルをOSの機能でロックするため、プロセスが異常終了しても
+    ロックが残ることはない。INDEX_LOCK_TIMEOUT 秒待っても取れなければ TimeoutError。
+    """
+
+    def __init__(self, path, timeout=INDEX_LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.handle = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.handle = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if msvcrt:
+                    self.handle.seek(0)
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self.handle.close()
+                    raise TimeoutError(f"保持期間インデックスのロックを取得できません: {self.path}")
+                time.sleep(INDEX_LOCK_POLL_INTERVAL)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if msvcrt:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.handle.close()
+
+class RetentionPolicy:
+    """ディレクトリごとの保持条件（経過日数と合計サイズの上限）"""
+
+    def __init__(self, max_age_days=None, max_total_bytes=None):
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_bytes
+
+class RetentionIndex:
+    """ファイルの作成時刻とサイズを記録し、期限切れのファイルだけを削除する
+
+    ディレクトリごとに作成時刻順のリストを持つため、削除対象は先頭の
+    期限切れ部分だけを見れば求められ、毎回ディレクトリ全体を走査する必要がない。
+    保存したファイルの登録（register）と移動・削除（forget）はジャーナルに
+    追記するだけにして、インデックス全体の読み込みと書き直しは apply の
+    ときに1回だけ行う（1件ごとの処理時間が記録済みのファイル数によらない）。
+    インデックスは処理段ごとのインスタンスや並行して動く他のプロセスと共有する
+    ため、同じパスのロック（プロセス内）とロック用のファイル（プロセス間）で排他する。
+    """
+
+    def __init__(self, base_directory, index_path=None):
+        self.base_directory = base_directory
+        self.index_path = index_path or local_state_path(base_directory, RETENTION_INDEX_FILENAME)
+        self.journal_path = self.index_path + JOURNAL_SUFFIX
+        self.lock = index_lock(self.index_path)
+        self.directories = {}
+
+    def locked(self):
+        """プロセス間の排他（self.lock を取得した後に使う）"""
+        return IndexFileLock(self.index_path + '.lock')
+
+    def load(self):
+        """インデックスを読み込み、ジャーナルの操作を反映する（ロックを取得した後に使う）"""
+        self.directories = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding='utf-8') as f:
+                    self.directories = json.load(f).get('directories', {})
+            except (OSError, ValueError) as e:
+                print(f"保持期間インデックスの読み込みでエラー: {str(e)}")
+        self.replay(self.read_journal())
+        return self.directories
+
+    def save(self):
+        """インデックスを保存し、反映したジャーナルを消す"""
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'directories': self.directories}, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+        # 保存後・削除前に中断した場合は次回同じ操作を反映し直すが、結果は変わらない
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+
+    def directory_key(self, directory):
+        return os.path.relpath(os.path.abspath(directory), os.path.abspath(self.base_directory))
+
+    def scan(self, directory):
+        """ディレクトリを走査してインデックスを作り直す"""
+        files = []
+        if os.path.isdir(directory):
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.startswith('.'):
+                    stat = entry.stat()
+                    files.append([entry.name, stat.st_mtime, stat.st_size])
+        files.sort(key=lambda item: item[1])
+        self.directories[self.directory_key(directory)] = {
+            'scanned_at': time.time(),
+            'files': files,
+            'total_bytes': sum(item[2] for item in files),
+        }
+
+    def ensure_directory(self, directory):
+        """未登録または走査から日数が経ったディレクトリだけを走査する"""
+        record = self.directories.get(self.directory_key(directory))
+        if record is None or time.time() - record['scanned_at'] > RESCAN_INTERVAL_DAYS * 24 * 60 * 60:
+            self.scan(directory)
+        return self.directories[self.directory_key(directory)]
+
+    def register(self, path):
+        """新しく保存したファイルを登録する
+
+        インデックスを更新できなくても処理は止めない（登録漏れは次回の走査で取り込まれる）。
+        """
+        try:
+            stat = os.stat(path)
+            self.append_journal([{'op': 'add', 'directory': self.directory_key(os.path.dirname(path)),
+                                  'name': os.path.basename(path), 'mtime': stat.st_mtime, 'size': stat.st_size}])
+        except OSError as e:
+            print(f"保持期間インデックスの更新でエラー: {os.path.basename(path)} - {str(e)}")
+
+    def forget(self, paths):
+        """移動・削除したファイルをインデックスから外す（更新できなくても処理は止めない）"""
+        try:
+            self.append_journal([{'op': 'remove', 'directory': self.directory_key(os.path.dirname(path)),
+                                  'name': os.path.basename(path)} for path in paths])
+        except OSError as e:
+            print(f"保持期間インデックスの更新でエラー: {str(e)}")
+
+    def append_journal(self, operations):
+        """登録・削除をジャーナルに追記する（大きくなったらインデックスに反映する）"""
+        lines = ''.join(json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations)
+        with self.lock, self.locked():
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                size = f.tell()
+            if size > JOURNAL_COMPACT_BYTES:
+                self.load()
+                self.save()
+
+    def read_journal(self):
+        """ジャーナルの操作を順に返す（書き込み途中で中断した行は無視する）"""
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        operations = []
+        for line in lines:
+            try:
+                operations.append(json.loads(line))
+            except ValueError:
+                continue
+        return operations
+
+    def replay(self, operations):
+        """ジャーナルの操作をインデックスに反映する（ディレクトリごとに1回だけ並べ替える）"""
+        changes = {}
+        for operation in operations:
+            changes.setdefault(operation['directory'], []).append(operation)
+        for key, directory_operations in changes.items():
+            record = self.ensure_directory(os.path.join(self.base_directory, key))
+            files = {item[0]: item for item in record['files']}
+            for operation in directory_operations:
+                files.pop(operation['name'], None)
+                if operation['op'] == 'add':
+                    files[operation['name']] = [operation['name'], operation['mtime'], operation['size']]
+            # 更新時刻が同じファイルは登録順のまま（sorted は安定）
+            record['files'] = sorted(files.values(), key=lambda item: item[1])
+            record['total_bytes'] = sum(item[2] for item in record['files'])
+
+    def apply(self, policies, now=None):
+        """各ディレクトリの保持条件を満たさないファイルをまとめて削除する
+
+        policies は {ディレクトリ: RetentionPolicy} の辞書。削除したパスのリストを返す。
+        """
+        now = now or time.time()
+        deleted = []
+        with self.lock, self.locked():
+            self.load()
+            for directory, policy in policies.items():
+                record = self.ensure_directory(directory)
+                files = record['files']
+
+                # 作成時刻順なので、期限切れは先頭からの連続した範囲になる
+                expired_count = 0
+                if policy.max_age_days is not None:
+                    threshold = now - policy.max_age_days * 24 * 60 * 60
+                    while expired_count < len(files) and files[expired_count][1] < threshold:
+                        expired_count += 1
+                total_bytes = record['total_bytes'] - sum(item[2] for item in files[:expired_count])
+                if policy.max_total_bytes is not None:
+                    while expired_count < len(files) and total_bytes > policy.max_total_bytes:
+                        total_bytes -= files[expired_count][2]
+                        expired_count += 1
+
+                for name, _, _ in files[:expired_count]:
+                    path = os.path.join(directory, name)
+                    try:
+                        os.remove(path)
+                        deleted.append(path)
+                    except FileNotFoundError:
+                        # 既に移動・削除されていたものはインデックスから外すだけ
+                        pass
+                del files[:expired_count]
+                record['total_bytes'] = total_bytes
+
+            self.save()
+        return deleted
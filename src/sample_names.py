@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+# サンプルの種類（並び順の優先順）
+SAMPLE_TYPES = ['HEL_TOP', 'HEL_ZENGO', 'HEL_SIDE', 'BICYCLE', 'BASEBALL', 'FALLARR']
+# サンプル名の先頭の「番号＋種類」（例: 0001HEL_TOP）
+SAMPLE_NAME_PATTERN = r"^(?P<number>\d+)(?P<sample_type>" + '|'.join(SAMPLE_TYPES) + r")"
+# 種類に当てはまらない名前（Time 行など）の種類コード
+UNKNOWN_TYPE_CODE = len(SAMPLE_TYPES)
+# 並び順では種類に含めない別名と、それが表す種類（安全帯は変換処理では FALLALL と呼ぶ）。
+# ピボット結果の並びを変えないよう、種類コードを求める場合（resolve_type_codes）だけに使う
+SAMPLE_TYPE_ALIASES = {'FALLALL': 'FALLARR'}
+SAMPLE_ALIAS_PATTERN = r"^\d+(?P<alias>" + '|'.join(SAMPLE_TYPE_ALIASES) + r")"
+
+def parse_sample_names(names):
+    """サンプル名をまとめて解析し、種類・種類コード・番号の表を返す
+
+    種類は SAMPLE_TYPES の順序を持つ Categorical、種類コードはその順位
+    （該当しない名前は UNKNOWN_TYPE_CODE）、番号は該当しない名前では 0 とする。
+    行の順序は names と同じなので、並べ替えや種類ごとの振り分けに
+    名前を解析し直さずに使える。
+    """
+    names = pd.Series(np.asarray(names, dtype=object), dtype=object)
+    extracted = names.str.extract(SAMPLE_NAME_PATTERN)
+    sample_type = pd.Categorical(extracted['sample_type'], categories=SAMPLE_TYPES, ordered=True)
+    codes = sample_type.codes.astype(np.int64)
+    codes[codes < 0] = UNKNOWN_TYPE_CODE
+    numbers = pd.to_numeric(extracted['number']).fillna(0).to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        'name': names,
+        'sample_type': sample_type,
+        'type_code': codes,
+        'number': numbers,
+    })
+
+def resolve_type_codes(parsed):
+    """解析結果の種類コードに、別名（SAMPLE_TYPE_ALIASES）の名前の種類を加えたものを返す"""
+    codes = parsed['type_code'].to_numpy().copy()
+    unknown = np.flatnonzero(codes == UNKNOWN_TYPE_CODE)
+    if len(unknown):
+        aliases = parsed['name'].iloc[unknown].str.extract(SAMPLE_ALIAS_PATTERN)['alias']
+        matched = aliases.notna().to_numpy()
+        codes[unknown[matched]] = [SAMPLE_TYPES.index(SAMPLE_TYPE_ALIASES[alias]) for alias in aliases[matched]]
+    return codes
+
+def sample_sort_order(parsed):
+    """解析結果から、種類の優先順・番号順に並べるインデックスを返す
+
+    従来の sort_values(key=...) と同じ並びを返す。従来の方法は安定なソートではなく、
+    同じ順位の名前（Time 行や種類に当てはまらない名前など）が元の順序にならない
+    ため、そのような名前がある場合は (種類コード, 番号) の組を従来と同じ方法
+    （オブジェクト配列の quicksort）で並べる。順位が全て異なる場合はどの方法でも
+    結果が同じなので、まとめて lexsort で並べる。
+    """
+    codes = parsed['type_code'].to_numpy()
+    numbers = parsed['number'].to_numpy()
+    order = np.lexsort((numbers, codes))
+    sorted_codes, sorted_numbers = codes[order], numbers[order]
+    if not ((sorted_codes[1:] == sorted_codes[:-1]) & (sorted_numbers[1:] == sorted_numbers[:-1])).any():
+        return order
+
+    keys = np.empty(len(codes), dtype=object)
+    keys[:] = list(zip(codes.tolist(), numbers.astype(np.int64).tolist()))
+    return keys.argsort(kind='quicksort')
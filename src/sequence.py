@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+
+from src.local_cache import local_state_path
+
+# 連番の目安を記録するファイル（local_state_path で利用者ごとのローカルのフォルダに置く）と、
+# 記録しておく系列の上限
+SEQUENCE_HINTS_FILENAME = 'sequence_hints.json'
+MAX_HINTS = 200
+
+# 確保中の印（保存先と同じフォルダの ".{ファイル名}.lock"）と、
+# 異常終了で残った印を無効とみなすまでの時間（秒）
+RESERVATION_SUFFIX = '.lock'
+RESERVATION_TIMEOUT = 24 * 60 * 60
+
+def sequence_hints_path(base_directory):
+    """ベースディレクトリごとの連番の目安の記録ファイルのパス"""
+    return local_state_path(base_directory, SEQUENCE_HINTS_FILENAME)
+
+def reservation_path(path):
+    """ファイル名を確保中であることを示す印のパス（Output_ や .CSV の検索には一致しない）"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, f".{filename}{RESERVATION_SUFFIX}")
+
+def create_reservation(lock_path):
+    """排他的作成（O_EXCL）で確保中の印を作る（既にあれば False）"""
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+def reserve(path):
+    """ファイル名を確保する（他のプロセスが確保中か、ファイルが既にあれば False）"""
+    lock_path = reservation_path(path)
+    if not create_reservation(lock_path):
+        try:
+            if time.time() - os.path.getmtime(lock_path) <= RESERVATION_TIMEOUT:
+                return False
+            # 異常終了で残った古い印は取り消して確保し直す
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        if not create_reservation(lock_path):
+            return False
+
+    # 印を作れても、保存済みのファイル（保存後に印を消したもの）があれば使えない
+    if os.path.exists(path):
+        os.remove(lock_path)
+        return False
+    return True
+
+def allocate_filename(directory, make_filename, start=0, hint_path=None):
+    """連番付きのユニークなファイル名を確保する
+
+    make_filename(番号) でファイル名を作り、その名前が未使用で、確保中の印
+    （reservation_path）を排他的作成（O_EXCL）で作成できた番号を採用する。
+    複数のプロセスが同時に実行しても同じ名前が重複して割り当てられることはない。
+    保存先には何も作らないため、確保しただけのファイル名が次の処理段の検索に
+    現れることはない。呼び出し側は保存し終えた後（または使わなかった場合）に
+    release_filename で確保を解除する。hint_path（sequence_hints_path）を指定すると
+    次に試す番号を記録し、既存ファイルを1件ずつ確認せずに済ませる。
+    """
+    os.makedirs(directory, exist_ok=True)
+    key = None
+    number = start
+    if hint_path:
+        key = hint_key(directory, make_filename(start))
+        number = max(start, read_hints(hint_path).get(key, 0))
+
+    while not reserve(os.path.join(directory, make_filename(number))):
+        number += 1
+
+    if hint_path:
+        write_hint(hint_path, key, number + 1)
+    return make_filename(number)
+
+def release_filename(path):
+    """確保を解除する（保存したファイルはそのまま残る）"""
+    try:
+        os.remove(reservation_path(path))
+    except OSError:
+        pass
+
+def hint_key(directory, filename):
+    """系列のキー（記録ファイルは利用者ごとのローカルのフォルダにあるため、保存先の絶対パスを使う）"""
+    return os.path.join(os.path.normcase(os.path.abspath(directory)), filename)
+
+def read_hints(hint_path):
+    """系列ごとの次に試す番号を読み込む（無い・壊れている場合は空）"""
+    try:
+        with open(hint_path, encoding='utf-8') as f:
+            hints = json.load(f)
+        return hints if isinstance(hints, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def write_hint(hint_path, key, number):
+    """次に試す番号を記録する（番号は目安なので、競合して古い値になっても問題ない）"""
+    hints = read_hints(hint_path)
+    hints.pop(key, None)
+    hints[key] = number
+    # 古い系列から捨てて記録の大きさを一定に保つ
+    for old_key in list(hints)[:-MAX_HINTS]:
+        del hints[old_key]
+
+    temp_path = f"{hint_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(hint_path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(hints, f, ensure_ascii=False)
+        os.replace(temp_path, hint_path)
+    except OSError as e:
+        print(f"連番の記録でエラー: {str(e)}")
@@ -0,0 +1,98 @@
+import io
+import os
+import pickle
+import zipfile
+import openpyxl
+from openpyxl.utils.indexed_list import IndexedList
+from src.xlsm_package import XlsmPackage
+
+class WorkbookPickler(pickle.Pickler):
+    """openpyxl のワークブックを pickle する
+
+    書式の一覧（IndexedList）は読み込んだテンプレートの重複した書式をそのまま
+    持っており、セルは一覧の位置で書式を参照している。通常の pickle では
+    重複を除く append で作り直されて位置がずれるため、コンストラクタで作り直す。
+    """
+
+    def reducer_override(self, obj):
+        if type(obj) is IndexedList:
+            return IndexedList, (list(obj),)
+        return NotImplemented
+
+class TemplateEntry:
+    """読み込み済みのテンプレート（pickle したワークブックと、元のファイルの内容）"""
+
+    def __init__(self, key, template_bytes, workbook_bytes=None):
+        self.key = key
+        self.template_bytes = template_bytes
+        self.workbook_bytes = workbook_bytes
+
+class TemplateCache:
+    """テンプレートを読み込んだ結果を、パス・更新時刻・サイズをキーにしてメモリ上で再利用する
+
+    openpyxl で読み込んだワークブックを pickle した形で持ち、使うたびに
+    pickle から作り直して複製を返す（テンプレートそのものは書き換わらない）。
+    監視モードのように同じプロセスで繰り返し変換する場合だけ効果があるため、
+    ファイルには保存しない。テンプレートが編集されて更新時刻かサイズが
+    変わった場合は読み込み直す。
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    @staticmethod
+    def key(template_path):
+        stat = os.stat(template_path)
+        return (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+
+    def load(self, template_path, workbook_writer='openpyxl'):
+        """テンプレートの複製を開いて返す（openpyxl のワークブックか XlsmPackage）"""
+        key = self.key(template_path)
+        entry = self.entries.get(key[0])
+        if entry is None or entry.key != key:
+            with open(template_path, 'rb') as f:
+                entry = TemplateEntry(key, f.read())
+            self.entries[key[0]] = entry
+
+        if workbook_writer == 'package':
+            # パッケージ方式は必要なパーツだけを読むため、ファイルの内容だけを使う
+            return XlsmPackage(io.BytesIO(entry.template_bytes))
+
+        if entry.workbook_bytes is None:
+            workbook = openpyxl.load_workbook(io.BytesIO(entry.template_bytes), keep_vba=True)
+            entry.workbook_bytes = self.dump_workbook(workbook)
+            if entry.workbook_bytes is not None:
+                # 複製と同じく、マクロ等は元のファイルの内容から保存する（読み込み時に
+                # 作られる追記モードの zip は閉じておく）
+                workbook.vba_archive.close()
+                workbook.vba_archive = zipfile.ZipFile(io.BytesIO(entry.template_bytes))
+            return workbook
+        return self.clone(entry)
+
+    @staticmethod
+    def dump_workbook(workbook):
+        """ワークブックを pickle する（マクロ等を保持する zip は元のファイルの内容から作り直すため外す）"""
+        vba_archive = workbook.vba_archive
+        workbook.vba_archive = None
+        try:
+            buffer = io.BytesIO()
+            WorkbookPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(workbook)
+            return buffer.getvalue()
+        except Exception as e:
+            print(f"テンプレートをキャッシュできません: {str(e)}")
+            return None
+        finally:
+            workbook.vba_archive = vba_archive
+
+    @staticmethod
+    def clone(entry):
+        workbook = pickle.loads(entry.workbook_bytes)
+        workbook.vba_archive = zipfile.ZipFile(io.BytesIO(entry.template_bytes))
+        return workbook
+
+# プロセス内で共有するキャッシュ（監視モードでは変換のたびに同じものを使う）
+SHARED_CACHE = TemplateCache()
+
+def shared_template_cache():
+    """プロセス内で共有のキャッシュを返す"""
+    return SHARED_CACHE
@@ -0,0 +1,136 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify のイベント（<sys/inotify.h> の値）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_UNMOUNT = 0x00002000
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_UNMOUNT
+EVENT_HEADER = struct.Struct('iIII')
+
+class PollingWatcher:
+    """ディレクトリの内容（ファイル名・サイズ・更新時刻）を定期的に比較して変更を検出する"""
+
+    def __init__(self):
+        self.snapshots = {}
+
+    def __contains__(self, directory):
+        return directory in self.snapshots
+
+    def add(self, directory):
+        self.snapshots[directory] = self.snapshot(directory)
+
+    def remove(self, directory):
+        self.snapshots.pop(directory, None)
+
+    @staticmethod
+    def snapshot(directory):
+        try:
+            files = set()
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    stat = entry.stat()
+                    files.add((entry.name, stat.st_size, stat.st_mtime))
+            return frozenset(files)
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        """timeout 秒待ち、その間に変更のあったディレクトリを返す"""
+        time.sleep(timeout)
+        changed = set()
+        for directory in list(self.snapshots):
+            current = self.snapshot(directory)
+            if current is None:
+                # ドライブが取り外された
+                self.remove(directory)
+                changed.add(directory)
+            elif current != self.snapshots[directory]:
+                self.snapshots[directory] = current
+                changed.add(directory)
+        return changed
+
+    def close(self):
+        self.snapshots = {}
+
+class InotifyWatcher:
+    """Linux の inotify でディレクトリの変更を待つ"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました")
+        self.directories = {}
+
+    def __contains__(self, directory):
+        return directory in self.directories.values()
+
+    def add(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch に失敗しました: {directory}")
+        self.directories[wd] = directory
+
+    def remove(self, directory):
+        for wd, watched in list(self.directories.items()):
+            if watched == directory:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+
+    def wait(self, timeout):
+        """timeout 秒以内に変更のあったディレクトリを返す"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size + name_length
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            changed.add(directory)
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_UNMOUNT):
+                # ディレクトリが削除・アンマウントされた
+                self.directories.pop(wd, None)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+        self.directories = {}
+
+def settled_directories(last_changed, now, settle_time):
+    """最後の変更から settle_time 秒以上経ったディレクトリを last_changed から外して返す
+
+    last_changed は {ディレクトリ: 最後に変更を検出した時刻（time.monotonic）} の辞書。
+    """
+    ready = [directory for directory, changed_at in last_changed.items()
+             if now - changed_at >= settle_time]
+    for directory in ready:
+        del last_changed[directory]
+    return ready
+
+def create_watcher(use_inotify=True):
+    """Linux では inotify、それ以外や使えない環境ではポーリングの監視を返す"""
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError) as e:
+            print(f"inotify が使えないためポーリングで監視します: {str(e)}")
+    return PollingWatcher()
@@ -0,0 +1,332 @@
+import functools
+import math
+import posixpath
+import re
+import shutil
+import time
+import zipfile
+from xml.sax.saxutils import escape, unescape
+
+WORKBOOK_PART = 'xl/workbook.xml'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+WORKSHEET_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+WORKSHEET_RELATIONSHIP_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+CALC_CHAIN_RELATIONSHIP_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain'
+NEW_SHEET_XML = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                 '<dimension ref="A1"/><sheetData/></worksheet>')
+
+ROW_PATTERN = re.compile(r'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+CELL_PATTERN = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+CELL_REFERENCE_PATTERN = re.compile(r'\br="([A-Z]+)(\d+)"')
+ROW_NUMBER_PATTERN = re.compile(r'\br="(\d+)"')
+STYLE_PATTERN = re.compile(r'\bs="\d+"')
+SPANS_PATTERN = re.compile(r'\sspans="[^"]*"')
+DIMENSION_PATTERN = re.compile(r'<dimension ref="([^"]*)"\s*/>')
+SHEET_DATA_PATTERN = re.compile(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', re.S)
+HAS_VALUE_PATTERN = re.compile(r'<v>[^<]|<is>|<f[ >]')
+RELATIONSHIP_PATTERN = re.compile(r'<Relationship\b[^>]*/>')
+# 変更しないパーツをコピーするときの読み込み単位
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def attribute(tag, name):
+    """開始タグから属性の値を取り出す（無い場合はNone）"""
+    match = re.search(rf'\b{name}="([^"]*)"', tag)
+    return match.group(1) if match else None
+
+@functools.lru_cache(maxsize=None)
+def get_column_letter(index):
+    """列番号（1始まり）を列名（A, B, ..., AA, ...）にする"""
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+@functools.lru_cache(maxsize=None)
+def column_index_from_string(letters):
+    """列名を列番号（1始まり）にする"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+def quoteattr_text(text):
+    """属性値（二重引用符で囲む）として書けるようにエスケープする"""
+    return escape(text, {'"': '&quot;'})
+
+def format_cell(reference, value, style=''):
+    """セルの値を <c> 要素にする（欠損は値の無いセル、文字列はインライン文字列）"""
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return f'<c r="{reference}"{style}/>'
+    if isinstance(value, bool):
+        return f'<c r="{reference}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"{style}><v>{value!r}</v></c>'
+    text = escape(str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{reference}"{style} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+def parse_range(reference):
+    """'A1:CSB15' のような範囲を (最小列, 最小行, 最大列, 最大行) にする"""
+    corners = [CELL_REFERENCE_PATTERN.match(f'r="{corner}"') for corner in reference.split(':')]
+    if not all(corners):
+        return None
+    columns = [column_index_from_string(corner.group(1)) for corner in corners]
+    rows = [int(corner.group(2)) for corner in corners]
+    return min(columns), min(rows), max(columns), max(rows)
+
+class SheetEdits:
+    """1つのシートに書き込む行（行番号 → (開始列, 値のリスト, 欠損を飛ばすか)）"""
+
+    def __init__(self):
+        self.rows = {}
+        self.max_row = 0
+        self.max_column = 0
+
+    def add(self, row, start_col, values, skip_missing):
+        self.rows[row] = (start_col, values, skip_missing)
+        self.max_row = max(self.max_row, row)
+        self.max_column = max(self.max_column, start_col + len(values) - 1)
+
+    def cells(self, row):
+        """書き込むセルを {列番号: 値} で返す（skip_missing の欠損は含めない）"""
+        start_col, values, skip_missing = self.rows[row]
+        return {column: value for column, value in enumerate(values, start=start_col)
+                if not (skip_missing and (value is None or value != value))}
+
+class XlsmPackage:
+    """.xlsm を zip パッケージとして扱い、転記するシートのXMLだけを作り直す
+
+    テンプレート全体を openpyxl で読み込まず、ブックの構成（workbook.xml と
+    そのリレーション）からシート名とシートのXMLの対応だけを調べる。保存時は
+    書き込むシートのXMLを行ごとに組み立てながら出力し、vbaProject.bin・
+    図形・画像・グラフなどそれ以外のパーツは中身を変えずにコピーする。
+    既存のセルに書き込む場合は書式（s属性）を残して値だけ置き換える。
+    文字列はインライン文字列として書くため sharedStrings.xml は変更しない。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path)
+        self.part_names = set(self.archive.namelist())
+        self.workbook_xml = self.archive.read(WORKBOOK_PART).decode('utf-8')
+        self.relationships_part = posixpath.join(posixpath.dirname(WORKBOOK_PART), '_rels',
+                                                 posixpath.basename(WORKBOOK_PART) + '.rels')
+        self.relationships_xml = self.archive.read(self.relationships_part).decode('utf-8')
+
+        targets = {}
+        for relationship in RELATIONSHIP_PATTERN.findall(self.relationships_xml):
+            targets[attribute(relationship, 'Id')] = self.resolve_target(attribute(relationship, 'Target'))
+        self.sheet_parts = {}
+        for tag in re.findall(r'<sheet\b[^>]*/>', self.workbook_xml):
+            self.sheet_parts[unescape(attribute(tag, 'name'), {'&quot;': '"', '&apos;': "'"})] = targets.get(attribute(tag, 'r:id'))
+
+        self.edits = {}
+        self.new_sheets = []
+        self.relationship_ids = {}
+        self.sheet_cache = {}
+
+    @property
+    def sheetnames(self):
+        return list(self.sheet_parts)
+
+    def resolve_target(self, target):
+        """リレーションの Target（workbook.xml からの相対パスか / からの絶対パス）をパーツ名にする"""
+        if target.startswith('/'):
+            return target[1:]
+        return posixpath.normpath(posixpath.join(posixpath.dirname(WORKBOOK_PART), target))
+
+    def sheet_xml(self, sheet_name):
+        if sheet_name not in self.sheet_cache:
+            part = self.sheet_parts[sheet_name]
+            self.sheet_cache[sheet_name] = (self.archive.read(part).decode('utf-8')
+                                            if part in self.part_names else NEW_SHEET_XML)
+        return self.sheet_cache[sheet_name]
+
+    def occupied_rows(self, sheet_name, column=2, first_row=2):
+        """指定した列に値のある行番号の集合（SheetCursor と同じく値の無いセルは空とみなす）"""
+        letter = get_column_letter(column)
+        pattern = re.compile(rf'<c r="{letter}(\d+)"[^>]*?(?:/>|>(.*?)</c>)', re.S)
+        return {int(row) for row, content in pattern.findall(self.sheet_xml(sheet_name))
+                if int(row) >= first_row and content and HAS_VALUE_PATTERN.search(content)}
+
+    def max_row(self, sheet_name):
+        """セルのある最後の行番号（これから書き込む行を含む、セルが無い場合は0）"""
+        rows = [int(row) for _, row in CELL_REFERENCE_PATTERN.findall(self.sheet_xml(sheet_name))]
+        edits = self.edits.get(sheet_name)
+        return max(rows + [edits.max_row if edits else 0])
+
+    def create_sheet(self, sheet_name):
+        """空のシートを末尾に追加する"""
+        part_number = 1
+        while f'xl/worksheets/sheet{part_number}.xml' in self.part_names | set(self.sheet_parts.values()):
+            part_number += 1
+        self.sheet_parts[sheet_name] = f'xl/worksheets/sheet{part_number}.xml'
+        self.new_sheets.append(sheet_name)
+
+    def write_rows(self, sheet_name, row_numbers, rows, start_col, skip_missing=False):
+        """rows の各行（値のリスト）を row_numbers の行の start_col 列目から書き込む
+
+        内容は保存時にシートのXMLへ反映する。skip_missing を指定すると
+        欠損値のセルは書き込まず、既存のセルをそのまま残す。
+        """
+        edits = self.edits.setdefault(sheet_name, SheetEdits())
+        for row, values in zip(row_numbers, rows):
+            edits.add(row, start_col, values, skip_missing)
+
+    def append_rows(self, sheet_name, rows, start_col=1):
+        """シートの最後の行の次から rows を書き込む"""
+        first_row = self.max_row(sheet_name) + 1
+        self.write_rows(sheet_name, range(first_row, first_row + len(rows)), rows, start_col)
+
+    def iter_sheet_xml(self, sheet_name):
+        """書き込み内容を反映したシートのXMLを少しずつ返す
+
+        書き込まない行は元のXMLをそのまま返し、書き込む行だけセルを組み立て直す。
+        """
+        xml = self.sheet_xml(sheet_name)
+        edits = self.edits.get(sheet_name)
+        if edits is None:
+            yield xml
+            return
+        sheet_data = SHEET_DATA_PATTERN.search(xml)
+        head, rows_xml, tail = xml[:sheet_data.start()], sheet_data.group(1) or '', xml[sheet_data.end():]
+
+        yield self.update_dimension(head, edits)
+        yield '<sheetData>'
+        pending = sorted(edits.rows)
+        position = 0
+        for match in ROW_PATTERN.finditer(rows_xml):
+            row_xml = match.group(0)
+            row = int(ROW_NUMBER_PATTERN.search(row_xml).group(1))
+            while position < len(pending) and pending[position] < row:
+                yield self.new_row(pending[position], edits)
+                position += 1
+            if position < len(pending) and pending[position] == row:
+                yield self.merge_row(row_xml, row, edits)
+                position += 1
+            else:
+                yield row_xml
+        for row in pending[position:]:
+            yield self.new_row(row, edits)
+        yield '</sheetData>'
+        yield tail
+
+    @staticmethod
+    def update_dimension(head, edits):
+        """<dimension> の範囲を書き込んだセルまで広げる"""
+        match = DIMENSION_PATTERN.search(head)
+        if not match:
+            return head
+        bounds = parse_range(match.group(1)) or (1, 1, 1, 1)
+        last_column = get_column_letter(max(bounds[2], edits.max_column))
+        reference = f"{get_column_letter(bounds[0])}{bounds[1]}:{last_column}{max(bounds[3], edits.max_row)}"
+        return head[:match.start(1)] + reference + head[match.end(1):]
+
+    def new_row(self, row, edits):
+        cells = edits.cells(row)
+        return f'<row r="{row}">' + ''.join(format_cell(f'{get_column_letter(column)}{row}', cells[column])
+                                            for column in sorted(cells)) + '</row>'
+
+    def merge_row(self, row_xml, row, edits):
+        """既存の行に書き込むセルを合わせる（既存のセルの書式は残す）"""
+        start_tag_end = row_xml.index('>') + 1
+        start_tag = row_xml[:start_tag_end]
+        if start_tag.endswith('/>'):
+            start_tag, content = start_tag[:-2] + '>', ''
+        else:
+            content = row_xml[start_tag_end:-len('</row>')]
+        # spans は行内のセルの範囲を示す省略可能な属性で、列を追加すると合わなくなるため外す
+        start_tag = SPANS_PATTERN.sub('', start_tag)
+
+        cells = {}
+        for match in CELL_PATTERN.finditer(content):
+            reference = CELL_REFERENCE_PATTERN.search(match.group(1))
+            cells[column_index_from_string(reference.group(1))] = match
+        output = {column: match.group(0) for column, match in cells.items()}
+        for column, value in edits.cells(row).items():
+            existing = cells.get(column)
+            style = STYLE_PATTERN.search(existing.group(1)) if existing else None
+            output[column] = format_cell(f'{get_column_letter(column)}{row}', value,
+                                         f' {style.group(0)}' if style else '')
+        return start_tag + ''.join(output[column] for column in sorted(output)) + '</row>'
+
+    def patched_workbook_xml(self):
+        """新しいシートを登録し、開いたときに再計算するよう指定した workbook.xml"""
+        xml = self.workbook_xml
+        # openpyxl の保存と同じく、転記した値を参照する数式を開いたときに再計算させる
+        calc = re.search(r'<calcPr\b[^>]*?(/?)>', xml)
+        if calc and 'fullCalcOnLoad=' not in calc.group(0):
+            xml = xml[:calc.start(1)] + ' fullCalcOnLoad="1"' + xml[calc.start(1):]
+        if self.new_sheets:
+            sheet_ids = [int(value) for value in re.findall(r'<sheet\b[^>]*\bsheetId="(\d+)"', xml)]
+            entries = ''.join(f'<sheet name="{quoteattr_text(name)}" sheetId="{max(sheet_ids) + number}" '
+                              f'r:id="{self.relationship_ids[name]}"/>'
+                              for number, name in enumerate(self.new_sheets, start=1))
+            xml = xml.replace('</sheets>', entries + '</sheets>', 1)
+        return xml
+
+    def patched_relationships_xml(self):
+        """新しいシートのリレーションを追加し、calcChain のリレーションを外した workbook.xml.rels"""
+        xml = self.relationships_xml
+        for relationship in RELATIONSHIP_PATTERN.findall(xml):
+            if attribute(relationship, 'Type') == CALC_CHAIN_RELATIONSHIP_TYPE:
+                xml = xml.replace(relationship, '')
+        entries = ''.join(f'<Relationship Id="{self.relationship_ids[name]}" Type="{WORKSHEET_RELATIONSHIP_TYPE}" '
+                          f'Target="{posixpath.relpath(self.sheet_parts[name], posixpath.dirname(WORKBOOK_PART))}"/>'
+                          for name in self.new_sheets)
+        return xml.replace('</Relationships>', entries + '</Relationships>', 1)
+
+    def patched_content_types_xml(self, xml):
+        """新しいシートのパーツを登録し、calcChain を外した [Content_Types].xml"""
+        xml = re.sub(r'<Override PartName="/xl/calcChain.xml"[^>]*/>', '', xml)
+        entries = ''.join(f'<Override PartName="/{self.sheet_parts[name]}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>'
+                          for name in self.new_sheets)
+        return xml.replace('</Types>', entries + '</Types>', 1)
+
+    def save(self, path):
+        """書き込み内容を反映したパッケージを path に保存する"""
+        used_ids = {int(value) for value in re.findall(r'Id="rId(\d+)"', self.relationships_xml)}
+        self.relationship_ids = {name: f'rId{max(used_ids, default=0) + number}'
+                                 for number, name in enumerate(self.new_sheets, start=1)}
+        calc_chain_parts = {self.resolve_target(attribute(relationship, 'Target'))
+                            for relationship in RELATIONSHIP_PATTERN.findall(self.relationships_xml)
+                            if attribute(relationship, 'Type') == CALC_CHAIN_RELATIONSHIP_TYPE}
+        edited_parts = {self.sheet_parts[name]: name for name in self.edits if name not in self.new_sheets}
+
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as output:
+            for info in self.archive.infolist():
+                if info.filename in calc_chain_parts:
+                    # 計算順のキャッシュは Excel が作り直す（上書きしたセルの数式が残っていると修復が必要になる）
+                    continue
+                # 書き込み中に更新される ZipInfo を元のパッケージと共有しないよう作り直す
+                output_info = zipfile.ZipInfo(info.filename, info.date_time)
+                output_info.compress_type = zipfile.ZIP_DEFLATED
+                output_info.external_attr = info.external_attr
+                if info.filename in edited_parts:
+                    self.write_sheet_part(output, output_info, edited_parts[info.filename])
+                elif info.filename == WORKBOOK_PART:
+                    output.writestr(output_info, self.patched_workbook_xml().encode('utf-8'))
+                elif info.filename == self.relationships_part:
+                    output.writestr(output_info, self.patched_relationships_xml().encode('utf-8'))
+                elif info.filename == CONTENT_TYPES_PART:
+                    xml = self.patched_content_types_xml(self.archive.read(info).decode('utf-8'))
+                    output.writestr(output_info, xml.encode('utf-8'))
+                else:
+                    # 変更しないパーツは展開した中身をそのまま書き込む
+                    with self.archive.open(info) as source, output.open(output_info, 'w') as target:
+                        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+            for name in self.new_sheets:
+                output_info = zipfile.ZipInfo(self.sheet_parts[name], time.localtime()[:6])
+                output_info.compress_type = zipfile.ZIP_DEFLATED
+                self.write_sheet_part(output, output_info, name)
+
+    def write_sheet_part(self, output, info, sheet_name):
+        with output.open(info, 'w') as target:
+            for piece in self.iter_sheet_xml(sheet_name):
+                target.write(piece.encode('utf-8'))
+
+    def close(self):
+        self.archive.close()
@@ -0,0 +1,8 @@
+import pytest
+
+from src.local_cache import CACHE_DIRECTORY_ENV
+
+@pytest.fixture(autouse=True)
+def local_cache_directory(tmp_path, monkeypatch):
+    """キャッシュと作業状態を利用者のフォルダではなくテストごとのフォルダに置く"""
+    monkeypatch.setenv(CACHE_DIRECTORY_ENV, str(tmp_path / 'local_cache'))
@@ -0,0 +1,36 @@
+"""テスト・ベンチマーク用のHIOKI8847と同じレイアウトのCSVを作る"""
+import os
+import numpy as np
+
+PREAMBLE = [
+    '"MEMORY HiCORDER 8847","測定ファイル"',
+    '"Title comment",""',
+    '"Trigger Time","24-12-17 10:30:00"',
+    '"CH","CH1-1"',
+    '"Mode","Voltage"',
+    '"Range","1kN/div"',
+    '"Unit","kN"',
+    '"Time","CH1-1"',
+]
+
+def hioki_rows(count, seed=0):
+    """HIOKI8847と同じ表記のデータ行（Time, CH1-1）"""
+    values = np.random.default_rng(seed).normal(0, 0.1, count)
+    return [f"{index * 5e-05 - 0.0125:+.5E},{value:+.5E}" for index, value in enumerate(values)]
+
+def write_hioki_file(path, lines):
+    """行のリストを HIOKI8847 と同じ Shift-JIS・CRLF で書き出す"""
+    with open(path, 'w', encoding='shift_jis', newline='') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+    return str(path)
+
+def make_sample_files(directory, file_count, row_count=2501, sample_name='HEL_TOP'):
+    """HIOKI8847と同じレイアウトのテスト用CSVを作成する"""
+    rng = np.random.default_rng(0)
+    time_values = np.arange(row_count) * 5e-05 - 0.0125
+    paths = []
+    for index in range(file_count):
+        values = rng.normal(0, 0.1, row_count)
+        lines = PREAMBLE + [f"{t:+.5E},{v:+.5E}" for t, v in zip(time_values, values)]
+        paths.append(write_hioki_file(os.path.join(directory, f"{index + 1:04d}{sample_name}.CSV"), lines))
+    return paths
@@ -0,0 +1,82 @@
+"""CSV_LOG へのアーカイブ（src.archive）と、アーカイブを保存してから元ファイルを削除する取り込みの確認"""
+import os
+
+import pytest
+
+import src.archive
+from src.archive import ARCHIVE_MODES, ArchiveWriter, archive_filename, find_archive, open_archive, write_archive
+from src.csvimport import CSVImporter
+from tests.hioki_samples import make_sample_files
+
+DATA = 'Time,0001HEL_TOP\r\n-0.0125,0.1\r\n-0.01245,-0.2\r\n'.encode('utf-8') * 100
+
+@pytest.mark.parametrize('mode', ARCHIVE_MODES)
+def test_archive_round_trip(tmp_path, mode):
+    path = str(tmp_path / archive_filename('2024-12-17_InspectionLOG.CSV', mode))
+    write_archive(DATA, path)
+
+    assert find_archive(str(tmp_path), '2024-12-17_InspectionLOG.CSV') == path
+    assert not os.path.exists(path + '.part')
+    with open_archive(path) as f:
+        assert f.read() == DATA
+    if mode != 'copy':
+        assert os.path.getsize(path) < len(DATA)
+
+def test_archive_writer_calls_on_complete_after_saving(tmp_path):
+    saved = []
+    writer = ArchiveWriter(on_saved=saved.append)
+    path = str(tmp_path / 'a.CSV.gz')
+    writer.submit(DATA, path, on_complete=lambda: saved.append(os.path.exists(path)))
+    writer.wait()
+    assert saved == [path, True]
+    assert writer.threads == []
+
+def test_archive_writer_skips_on_complete_on_error(tmp_path, capsys):
+    completed = []
+    writer = ArchiveWriter(on_saved=completed.append)
+    writer.submit(DATA, str(tmp_path / 'missing' / 'a.CSV'), on_complete=lambda: completed.append('done'))
+    writer.wait()
+    assert completed == []
+    assert 'アーカイブ保存でエラー' in capsys.readouterr().out
+
+def make_importer(tmp_path, **options):
+    source = tmp_path / 'usb' / 'HIOKI8847'
+    source.mkdir(parents=True)
+    make_sample_files(str(source), 3, row_count=50)
+    importer = CSVImporter(str(tmp_path / 'base'), archive_mode='gzip', **options)
+    return importer, str(source)
+
+def test_sources_are_kept_until_the_archive_is_saved(tmp_path, monkeypatch):
+    importer, source = make_importer(tmp_path)
+
+    def fail(data, path):
+        raise OSError('disk full')
+    with monkeypatch.context() as patch:
+        patch.setattr(src.archive, 'write_archive', fail)
+        assert importer.process_directory(source)
+        importer.archiver.wait()
+
+    # アーカイブを保存できなかったため、元ファイルは残り取り込み中のまま
+    assert len(os.listdir(source)) == 3
+    assert os.listdir(importer.copy_directory) == []
+    assert {entry['status'] for entry in importer.manifest.entries.values()} == {'pending'}
+
+    # 次回はCSVフォルダの出力からアーカイブを作り直し、同じ内容を再び取り込まない
+    outputs = os.listdir(importer.save_directory)
+    assert importer.process_directory(source)
+    importer.archiver.wait()
+    assert os.listdir(source) == []
+    assert os.listdir(importer.save_directory) == outputs
+    assert os.listdir(importer.copy_directory) == [outputs[0] + '.gz']
+    assert {entry['status'] for entry in importer.manifest.entries.values()} == {'imported'}
+
+def test_sources_are_removed_after_the_archive(tmp_path):
+    importer, source = make_importer(tmp_path)
+    assert importer.process_directory(source)
+    importer.archiver.wait()
+
+    output, = os.listdir(importer.save_directory)
+    assert os.listdir(source) == []
+    with open_archive(os.path.join(importer.copy_directory, output + '.gz')) as f:
+        with open(os.path.join(importer.save_directory, output), 'rb') as original:
+            assert f.read() == original.read()
@@ -0,0 +1,48 @@
+"""数値の列をまとめて文字列にするCSV書き出し（src.csvwriter）と DataFrame.to_csv の出力を比較する"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.csvwriter import write_frame_csv, write_frames_csv
+
+def pivot_frame(row_count=20):
+    """ピボット結果（Output_）と同じ構成の DataFrame"""
+    values = np.random.default_rng(1).normal(0, 0.1, (row_count, 6)).round(5)
+    values[2, 3] = np.nan
+    values[4, 1] = -0.0
+    values[5, 2] = np.inf
+    values[7, 0] = 1e-07
+    values[8, 0] = 1e20
+    frame = pd.DataFrame(values, columns=[str(column) for column in range(1, 7)])
+    frame.insert(0, 'New Column', [f'HEL_TOP-{index}' for index in range(row_count)])
+    frame.insert(0, 'New First Column', np.nan)
+    return frame
+
+def quoted_frame():
+    frame = pivot_frame(10)
+    frame['New Column'] = ['a,b', 'say "hi"', 'line\nbreak', None, '野球帽', ' space ', '', 'x', 'y', 'z']
+    return frame.rename(columns={'1': 'a,b', '2': 'q"x'})
+
+WRITER_CASES = {
+    'pivot': (pivot_frame(), {}),
+    'float_format': (pivot_frame(), {'float_format': '%.6f'}),
+    'chunked': (pivot_frame(), {'chunk_rows': 3}),
+    'quoted': (quoted_frame(), {}),
+    'header_only': (pivot_frame().iloc[:0], {}),
+    'mixed_types': (pd.DataFrame({'a': [1, 2, 3], 'b': ['x', np.nan, 'y'], 'c': [1.5, np.nan, 2.0]}), {}),
+}
+
+@pytest.mark.parametrize('name', WRITER_CASES)
+def test_csv_writer_matches_to_csv(tmp_path, name):
+    frame, options = WRITER_CASES[name]
+    write_frame_csv(frame, tmp_path / 'fast.csv', **options)
+    options.pop('chunk_rows', None)
+    frame.to_csv(tmp_path / 'pandas.csv', encoding='cp932', index=False, **options)
+    assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes()
+
+def test_csv_writer_frames_match_to_csv(tmp_path):
+    frame = pivot_frame()
+    frames = iter([frame.iloc[:7], frame.iloc[7:7], frame.iloc[7:]])
+    write_frames_csv(frame.columns, frames, tmp_path / 'fast.csv')
+    frame.to_csv(tmp_path / 'pandas.csv', encoding='cp932', index=False)
+    assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes()
@@ -0,0 +1,78 @@
+"""波形の間引き（src.decimation）で残す点と、列名による時間順の確認"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.convert_options import DECIMATION_METHODS
+from src.decimation import column_time_order, decimate_frame, decimate_values
+
+POINT_COUNT = 2050
+TARGET_POINTS = 100
+
+def sample_values(seed=0):
+    """最大値・最小値の位置がショットごとに異なる波形（欠損や先頭・末尾の極値を含む）"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0, 0.1, (6, POINT_COUNT)).cumsum(axis=1)
+    values[1, 0] = 50.0
+    values[2, -1] = -50.0
+    values[3, 700:760] = np.nan
+    values[4, :10] = np.nan
+    values[5, 1234] = 80.0
+    return values
+
+@pytest.mark.parametrize('method', DECIMATION_METHODS)
+def test_extremes_and_endpoints_are_kept(method):
+    values = sample_values()
+    decimated = decimate_values(values, TARGET_POINTS, method)
+
+    kept = ~np.isnan(decimated)
+    rows = np.arange(len(values))
+    assert (kept[rows, np.nanargmax(values, axis=1)]).all()
+    assert (kept[rows, np.nanargmin(values, axis=1)]).all()
+    np.testing.assert_array_equal(np.nanmax(decimated, axis=1), np.nanmax(values, axis=1))
+    np.testing.assert_array_equal(np.nanmin(decimated, axis=1), np.nanmin(values, axis=1))
+    # 先頭・末尾の点は（欠損でなければ）残る
+    np.testing.assert_array_equal(decimated[:, [0, -1]], values[:, [0, -1]])
+    # 残した点の値と位置は変えない
+    np.testing.assert_array_equal(decimated[kept], values[kept])
+    assert kept.sum(axis=1).max() <= TARGET_POINTS + 4
+
+def test_short_series_is_not_decimated():
+    values = sample_values()[:, :50]
+    for method in DECIMATION_METHODS:
+        np.testing.assert_array_equal(decimate_values(values, TARGET_POINTS, method), values)
+
+def test_column_time_order():
+    assert column_time_order([3, 1, 2]).tolist() == [1, 2, 0]
+    assert column_time_order(['10', '9', '1']).tolist() == [2, 1, 0]
+    # 数値でない列名がある場合は列の並び順のまま
+    assert column_time_order(['b', 'a', 1]).tolist() == [0, 1, 2]
+    assert column_time_order([None, 1]).tolist() == [0, 1]
+
+def pivot_frame(labels, values):
+    """ピボット結果と同じ並び（空欄の列・サンプル名の列・数値の列）の DataFrame"""
+    df = pd.DataFrame(values, columns=labels)
+    df.insert(0, 'New Column', [f"{index + 1:04d}HEL_TOP" for index in range(len(values) - 1)] + ['Time'])
+    df.insert(0, 'New First Column', np.nan)
+    return df
+
+@pytest.mark.parametrize('labels, shuffle', [
+    (list(range(1, POINT_COUNT + 1)), True),
+    ([str(label) for label in range(1, POINT_COUNT + 1)], True),
+    ([f"t{label}" for label in range(1, POINT_COUNT + 1)], False),
+], ids=['int', 'str', 'non_numeric'])
+@pytest.mark.parametrize('method', DECIMATION_METHODS)
+def test_decimate_frame_handles_column_labels(labels, shuffle, method):
+    # 列を時間順から入れ替えても列名の時間順で間引く（数値でない列名では列の並び順を時間順とする）
+    values = sample_values()
+    permutation = np.random.default_rng(1).permutation(POINT_COUNT) if shuffle else np.arange(POINT_COUNT)
+    labels = [labels[index] for index in permutation]
+    df = pivot_frame(labels, values[:, permutation])
+
+    result = decimate_frame(df, TARGET_POINTS, method)
+
+    expected = decimate_values(values[:-1], TARGET_POINTS, method)[:, permutation]
+    np.testing.assert_array_equal(result.iloc[:-1, 2:].to_numpy(dtype=np.float64), expected)
+    # Time 行は間引かない
+    np.testing.assert_array_equal(result.iloc[-1, 2:].to_numpy(dtype=np.float64), values[-1, permutation])
+    assert list(result.columns) == list(df.columns)
@@ -0,0 +1,66 @@
+"""特徴量（src.features）の時間軸と、キャッシュを使う場合の特徴量の計算の確認"""
+import os
+
+import numpy as np
+import pytest
+
+from src.csvimport import CSVImporter, READERS
+from src.csvpivot import CSVPivot
+from src.features import data_time_axis, summary_columns, TIME_DECIMALS
+from tests.hioki_samples import PREAMBLE, hioki_rows, write_hioki_file
+
+# 波形の最大値を置くデータ行（ヘッダーの次の行を0とする）
+SPIKE_ROW = 200
+
+def import_spike_file(tmp_path, reader):
+    """SPIKE_ROW 行目だけが大きい HIOKI8847 のファイルを取り込み、結合済みCSVのパスと最大値の行の Time を返す"""
+    source = tmp_path / 'usb' / 'HIOKI8847'
+    source.mkdir(parents=True)
+    rows = hioki_rows(2501)
+    spike_time = rows[SPIKE_ROW].split(',')[0]
+    rows[SPIKE_ROW] = f"{spike_time},+9.00000E+00"
+    write_hioki_file(source / '0001HEL_TOP.CSV', PREAMBLE + rows)
+
+    importer = CSVImporter(str(tmp_path / 'base'), reader=reader)
+    assert importer.process_directory(str(source))
+    importer.archiver.wait()
+    merged = [os.path.join(importer.save_directory, name) for name in os.listdir(importer.save_directory)]
+    assert len(merged) == 1
+    return merged[0], float(spike_time)
+
+@pytest.mark.parametrize('reader', READERS)
+def test_peak_time_matches_the_measured_row(tmp_path, reader):
+    merged_path, spike_time = import_spike_file(tmp_path, reader)
+    _, summary = CSVPivot(str(tmp_path / 'base'), summary=True, cache=False).pivot_file_with_summary(merged_path)
+
+    columns = summary_columns()
+    assert summary[columns[1]].tolist() == [9.0]
+    assert summary[columns[2]].tolist() == [round(spike_time * 1000, TIME_DECIMALS)]
+
+def test_data_time_axis_shifts_by_the_offset():
+    time = np.array([0.0, 0.5, 1.0, 1.5])
+    np.testing.assert_array_equal(data_time_axis(time, offset=1), [0.5, 1.0, 1.5, 2.0])
+    np.testing.assert_array_equal(data_time_axis(time, offset=2), [1.0, 1.5, 2.0, 2.5])
+    np.testing.assert_array_equal(data_time_axis(time, offset=0), time)
+    np.testing.assert_array_equal(data_time_axis([0.25], offset=1), [0.25])
+
+def test_cache_stores_summary_only_when_requested(tmp_path):
+    merged_path, _ = import_spike_file(tmp_path, 'fast')
+    pivot = CSVPivot(str(tmp_path / 'base'), summary=False, cache=True)
+    calls = []
+    compute_file_with_summary = pivot.compute_file_with_summary
+    pivot.compute_file_with_summary = lambda filepath: calls.append(filepath) or compute_file_with_summary(filepath)
+
+    # 特徴量が不要な場合は計算せず、キャッシュにも保存しない
+    df_final = pivot.pivot_file(merged_path)
+    key = pivot.cache.key(merged_path)
+    assert calls == []
+    assert pivot.cache.get(key)[1] is None
+
+    # 後から特徴量が必要になった場合は計算し直して保存し、次からはキャッシュを使う
+    df_with_summary, summary = pivot.pivot_file_with_summary(merged_path)
+    assert calls == [merged_path]
+    assert df_with_summary.equals(df_final)
+    assert pivot.cache.get(key)[1].equals(summary)
+    pivot.pivot_file_with_summary(merged_path)
+    assert calls == [merged_path]
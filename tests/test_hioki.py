@@ -0,0 +1,46 @@
+"""HIOKI8847専用パーサー（src.hioki）と pd.read_csv による読み込みの結果を比較する"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.csvimport import read_data_column
+from src.hioki import read_hioki_data, read_hioki_time
+from tests.hioki_samples import PREAMBLE, hioki_rows, write_hioki_file
+
+def read_time_with_pandas(path):
+    """CSVImporter(reader='pandas') と同じA列の読み込み"""
+    return pd.read_csv(path, skiprows=7, encoding='shift_jis', usecols=[0]).iloc[:, 0].to_numpy(dtype=np.float64)
+
+def read_data_with_pandas(path):
+    return read_data_column(path).iloc[:, 0].to_numpy(dtype=np.float64)
+
+ROWS = hioki_rows(2501)
+HIOKI_CASES = {
+    'full': PREAMBLE + ROWS,
+    'short': PREAMBLE + ROWS[:100],
+    'one_row': PREAMBLE + ROWS[:1],
+    'quoted': PREAMBLE + [','.join(f'"{field}"' for field in row.split(',')) for row in ROWS[:50]],
+    'missing_field': PREAMBLE + [row.split(',')[0] if index % 7 == 3 else row for index, row in enumerate(ROWS[:50])],
+    'blank_value': PREAMBLE + [row.split(',')[0] + ',' if index % 5 == 0 else row for index, row in enumerate(ROWS[:50])],
+    'blank_line': PREAMBLE + ROWS[:10] + [''] + ROWS[10:20],
+}
+
+@pytest.mark.parametrize('name', HIOKI_CASES)
+def test_hioki_reader_matches_pandas(tmp_path, name):
+    path = write_hioki_file(tmp_path / f'0001HEL_{name}.CSV', HIOKI_CASES[name])
+    np.testing.assert_array_equal(read_hioki_time(path), read_time_with_pandas(path))
+    np.testing.assert_array_equal(read_hioki_data(path), read_data_with_pandas(path))
+
+def test_hioki_reader_extra_fields(tmp_path):
+    # 列の多い行があっても、B列は pd.read_csv(usecols=[1]) と同じ値になる
+    lines = PREAMBLE + [row + (',9' if index % 7 == 0 else '') for index, row in enumerate(ROWS[:50])]
+    path = write_hioki_file(tmp_path / '0001HEL_TOP.CSV', lines)
+    np.testing.assert_array_equal(read_hioki_data(path), read_data_with_pandas(path))
+
+@pytest.mark.parametrize('lines', [PREAMBLE, PREAMBLE[:5], []], ids=['header_only', 'preamble_only', 'empty'])
+def test_hioki_reader_without_data(tmp_path, lines):
+    # pd.read_csv は EmptyDataError になる内容で、専用パーサーは空の配列を返す
+    path = tmp_path / '0001HEL_TOP.CSV'
+    path.write_bytes('\r\n'.join(lines).encode('shift_jis'))
+    assert read_hioki_time(str(path)).shape == (0,)
+    assert read_hioki_data(str(path)).shape == (0,)
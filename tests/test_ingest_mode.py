@@ -0,0 +1,64 @@
+"""読み込みモード（CSVImporter.read_data_columns）の結果と、失敗時の扱いの確認"""
+import os
+from concurrent.futures import BrokenExecutor, Future
+
+import numpy as np
+import pytest
+
+import src.csvimport
+from src.csvimport import CSVImporter, INGEST_MODES
+from tests.hioki_samples import make_sample_files
+
+def make_source(tmp_path, file_count=4):
+    source = tmp_path / 'HIOKI8847'
+    source.mkdir()
+    make_sample_files(str(source), file_count, row_count=50)
+    return str(source)
+
+def read_columns(tmp_path, source, files, ingest_mode):
+    importer = CSVImporter(str(tmp_path / 'base'), ingest_mode=ingest_mode, max_workers=2)
+    return importer.read_data_columns(source, files)
+
+class BrokenThreadPool:
+    """ワーカーが異常終了した（BrokenExecutor）ことにするプール"""
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_exception(BrokenExecutor('worker died'))
+        return future
+
+@pytest.mark.parametrize('ingest_mode', INGEST_MODES)
+def test_columns_are_read_in_file_order(tmp_path, ingest_mode):
+    source = make_source(tmp_path)
+    files = sorted(os.listdir(source))
+    expected = read_columns(tmp_path, source, files, 'serial')
+    for column, expected_column in zip(read_columns(tmp_path, source, files, ingest_mode), expected):
+        np.testing.assert_array_equal(column, expected_column)
+
+def test_file_error_is_not_retried_serially(tmp_path, capsys):
+    source = make_source(tmp_path)
+    # 読み込めない（OSError になる）ファイル
+    os.mkdir(os.path.join(source, '0003HEL_TOP.CSV.d'))
+    files = sorted(os.listdir(source))
+    with pytest.raises(OSError):
+        read_columns(tmp_path, source, files, 'thread')
+    assert '逐次処理に切り替え' not in capsys.readouterr().out
+
+def test_broken_pool_falls_back_to_serial(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(src.csvimport, 'ThreadPoolExecutor', BrokenThreadPool)
+    source = make_source(tmp_path)
+    files = sorted(os.listdir(source))
+    columns = read_columns(tmp_path, source, files, 'thread')
+
+    assert 'ワーカーが異常終了したため' in capsys.readouterr().out
+    for column, expected_column in zip(columns, read_columns(tmp_path, source, files, 'serial')):
+        np.testing.assert_array_equal(column, expected_column)
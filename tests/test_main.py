@@ -0,0 +1,12 @@
+"""main.py の起動時の読み込みの確認"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_main_does_not_import_heavy_modules():
+    # 引数の解析だけで pandas・openpyxl を読み込まない（各処理の実行時に読み込む）
+    code = "import sys, main; print(' '.join(sorted(m for m in ('pandas', 'openpyxl', 'numpy') if m in sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
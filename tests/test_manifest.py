@@ -0,0 +1,90 @@
+"""取り込み済みファイルの記録（src.manifest）と、中断した取り込みの再開の確認"""
+import os
+
+from src.csvimport import CSVImporter
+from src.manifest import ImportManifest
+from tests.hioki_samples import make_sample_files
+
+def make_source(tmp_path, file_count=3):
+    source = tmp_path / 'usb' / 'HIOKI8847'
+    source.mkdir(parents=True)
+    make_sample_files(str(source), file_count, row_count=50)
+    return str(source)
+
+def run_import(tmp_path, source, **options):
+    """取り込みを1回実行する（実行ごとに別のプロセスで動くのと同じく新しいインスタンスを使う）"""
+    importer = CSVImporter(str(tmp_path / 'base'), **options)
+    result = importer.process_directory(source)
+    importer.archiver.wait()
+    return importer, result
+
+def test_manifest_is_kept_outside_the_base_directory(tmp_path):
+    importer = CSVImporter(str(tmp_path / 'base'))
+    assert importer.manifest.path.startswith(str(tmp_path / 'local_cache'))
+    assert not os.path.exists(tmp_path / 'base' / 'STATE')
+
+def test_imported_files_are_skipped(tmp_path):
+    source = make_source(tmp_path)
+    importer, _ = run_import(tmp_path, source)
+    outputs = os.listdir(importer.save_directory)
+
+    # 同じ内容のファイルが再びUSBに置かれても取り込まず、削除だけ行う
+    make_sample_files(source, 3, row_count=50)
+    importer, result = run_import(tmp_path, source)
+    assert result
+    assert os.listdir(source) == []
+    assert os.listdir(importer.save_directory) == outputs
+
+def test_import_interrupted_after_saving_is_not_duplicated(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+
+    # 出力とアーカイブを保存した後、完了の記録と元ファイルの削除の前に中断する
+    with monkeypatch.context() as patch:
+        patch.setattr(CSVImporter, 'finish_import', lambda self, *args: None)
+        importer, _ = run_import(tmp_path, source)
+    outputs = os.listdir(importer.save_directory)
+    assert len(outputs) == 1
+    assert {entry['status'] for entry in importer.manifest.entries.values()} == {'pending'}
+
+    importer, result = run_import(tmp_path, source)
+    assert result
+    assert os.listdir(source) == []
+    assert os.listdir(importer.save_directory) == outputs
+    assert {entry['status'] for entry in importer.manifest.entries.values()} == {'imported'}
+
+def test_import_interrupted_before_saving_is_retried(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+
+    def fail(self, directory, files, output_path):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(CSVImporter, 'write_merged_frame', fail)
+        try:
+            run_import(tmp_path, source)
+        except KeyboardInterrupt:
+            pass
+    importer = CSVImporter(str(tmp_path / 'base'))
+    assert os.listdir(importer.save_directory) == []
+    assert len(importer.manifest.entries) == 3
+
+    # 出力が無いため記録を取り消し、1回だけ取り込み直す（確保したファイル名も残らない）
+    importer, result = run_import(tmp_path, source)
+    assert result
+    assert len(os.listdir(importer.save_directory)) == 1
+    assert os.listdir(source) == []
+    assert {entry['status'] for entry in importer.manifest.entries.values()} == {'imported'}
+
+def test_manifest_resume_and_prune(tmp_path):
+    path = str(tmp_path / 'import_manifest.json')
+    manifest = ImportManifest(path)
+    manifest.mark_pending({'a:1': 'A.CSV', 'b:1': 'B.CSV'}, 'done.CSV')
+    manifest.mark_pending({'c:1': 'C.CSV'}, 'lost.CSV')
+
+    manifest = ImportManifest(path)
+    assert manifest.resume_pending(lambda filename: filename == 'done.CSV') == ['done.CSV']
+    assert manifest.is_imported('a:1') and manifest.is_imported('b:1')
+    assert 'c:1' not in manifest.entries
+
+    manifest.entries['a:1']['updated_at'] = '2000-01-01T00:00:00'
+    assert manifest.prune(90) == 1
+    assert ImportManifest(path).entries.keys() == {'b:1'}
@@ -0,0 +1,94 @@
+"""ピボット結果（Output_）の読み込み（read_output_file / load_csv_files）と pd.read_csv の結果を比較する"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.csvtoxlsxconverter import load_csv_files, parse_output_bytes, read_output_file
+
+OUTPUT_HEADER = 'New First Column,New Column,1,2,3\r\n'
+OUTPUT_CASES = {
+    'pivot': OUTPUT_HEADER + ',HEL_TOP-1,0.1,-0.2,\r\n,HEL_TOP-2,,1e-05,3.0\r\n',
+    'lf': OUTPUT_HEADER.replace('\r', '') + ',HEL_TOP-1,0.1,-0.2,\n',
+    'no_final_newline': OUTPUT_HEADER + ',HEL_TOP-1,0.1,-0.2,0.3',
+    'missing_label': OUTPUT_HEADER + ',,0.1,0.2,0.3\r\n',
+    'japanese': OUTPUT_HEADER + ',野球帽-1,0.1,0.2,0.3\r\n',
+    'header_only': OUTPUT_HEADER,
+    'quoted': OUTPUT_HEADER + ',"HEL,1",0.1,-0.2,\r\n,"say ""x""",1,2,3\r\n',
+    'short_row': OUTPUT_HEADER + ',HEL_TOP-1,0.1\r\n,HEL_TOP-2,1,2,3\r\n',
+    'blank_line': OUTPUT_HEADER + ',HEL_TOP-1,0.1,-0.2,\r\n\r\n,HEL_TOP-2,1,2,3\r\n',
+}
+
+def write_output(directory, name, text):
+    output_dir = os.path.join(directory, 'OUTPUT')
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, name)
+    with open(path, 'wb') as f:
+        f.write(text.encode('cp932'))
+    return path
+
+@pytest.mark.parametrize('name', OUTPUT_CASES)
+def test_output_reader_matches_read_csv(tmp_path, name):
+    path = write_output(str(tmp_path), 'Output_1.csv', OUTPUT_CASES[name])
+    columns, labels, values = read_output_file(path)
+    expected = pd.read_csv(path, encoding='cp932')
+    assert columns == list(expected.columns)
+    assert pd.isna(labels).tolist() == expected.iloc[:, 1].isna().tolist()
+    assert [label for label in labels if not pd.isna(label)] == expected.iloc[:, 1].dropna().tolist()
+    np.testing.assert_array_equal(values, expected.drop(columns=expected.columns[1]).to_numpy(dtype=np.float64))
+
+def test_output_reader_rejects_extra_fields(tmp_path):
+    # pd.read_csv は1列目を行ラベルにして列がずれるため、読み込み失敗として扱う
+    path = write_output(str(tmp_path), 'Output_1.csv', OUTPUT_HEADER + ',HEL_TOP-1,0.1,2,3,4\r\n')
+    with pytest.raises(ValueError):
+        read_output_file(path)
+
+@pytest.mark.parametrize('data', [b'\r\n', b'\n\n', b'""\r\n'])
+def test_file_without_columns_is_rejected(tmp_path, data):
+    path = tmp_path / 'Output_1.csv'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        read_output_file(str(path))
+
+def test_header_only_file_has_no_rows():
+    columns, labels, values = parse_output_bytes(OUTPUT_HEADER.encode('cp932'))
+    assert columns == ['New First Column', 'New Column', '1', '2', '3']
+    assert len(labels) == 0
+    assert values.shape == (0, 4)
+
+def test_load_csv_files_matches_concat(tmp_path):
+    texts = [OUTPUT_CASES['pivot'],
+             'New First Column,New Column,1,2,3,4\r\n,HEL_TOP-3,1,2,3,4\r\n',
+             OUTPUT_CASES['quoted'],
+             OUTPUT_CASES['header_only']]
+    paths = [write_output(str(tmp_path), f'Output_{index}.csv', text) for index, text in enumerate(texts, start=1)]
+
+    data, loaded_files = load_csv_files(str(tmp_path), max_workers=1)
+    expected = pd.concat([pd.read_csv(path, encoding='cp932') for path in paths], ignore_index=True)
+    assert loaded_files == paths
+    assert list(data.columns) == list(expected.columns)
+    assert data['New Column'].fillna('').tolist() == expected['New Column'].fillna('').tolist()
+    value_columns = [column for column in expected.columns if column != 'New Column']
+    np.testing.assert_array_equal(data[value_columns].to_numpy(dtype=np.float64),
+                                  expected[value_columns].to_numpy(dtype=np.float64))
+
+def test_unreadable_files_are_dropped(tmp_path):
+    directory = str(tmp_path)
+    valid = write_output(directory, 'Output_1.csv', OUTPUT_CASES['pivot'])
+    write_output(directory, 'Output_2.csv', '\r\n')
+    header_only = write_output(directory, 'Output_3.csv', OUTPUT_HEADER)
+
+    data, loaded_files = load_csv_files(directory, max_workers=1)
+    assert loaded_files == [valid, header_only]
+    assert list(data.columns) == ['New First Column', 'New Column', '1', '2', '3']
+    assert data['New Column'].tolist() == ['HEL_TOP-1', 'HEL_TOP-2']
+    np.testing.assert_array_equal(data['1'].to_numpy(), [0.1, np.nan])
+
+def test_only_unreadable_files(tmp_path):
+    directory = str(tmp_path)
+    write_output(directory, 'Output_1.csv', '\n')
+
+    data, loaded_files = load_csv_files(directory, max_workers=1)
+    assert data.empty
+    assert loaded_files == []
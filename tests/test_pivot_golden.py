@@ -0,0 +1,69 @@
+"""ピボット結果（Output_）を、従来の処理で作成した出力（tests/test_data/golden）とバイト単位で比較する
+
+golden の Output_*.gz は、最初の版の CSVPivot（read_and_preprocess → sort_data →
+adjust_columns → to_csv）で作成したもの。入力は tests/test_data/CSV_LOG の結合済み
+ファイルと、golden/input の次のファイル:
+- 2025-01-10: FALLALL（並び順では種類に当てはまらない別名）・種類に当てはまらない名前・
+  Time 行が同じ順位になり、従来の安定でない並べ替えの順序を再現する必要があるもの
+- 2025-01-11: 転置後の列数が MOVE_FROM より少なく、列の移動が起きないもの
+"""
+import gzip
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.csvpivot import CSVPivot, WRITERS
+from src.pivot_engine import MOVE_FROM, PIVOT_ENGINES, column_plan
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), 'test_data')
+GOLDEN_DIRECTORY = os.path.join(TEST_DATA, 'golden')
+GOLDEN_INPUTS = [os.path.join(directory, name)
+                 for directory in (os.path.join(TEST_DATA, 'CSV_LOG'), os.path.join(GOLDEN_DIRECTORY, 'input'))
+                 for name in sorted(os.listdir(directory))]
+# engine='chunked' で読み込み・書き出しが複数のまとまりに分かれる大きさ
+SMALL_MEMORY_LIMIT = 200 * 1024
+
+def golden_output(input_path):
+    with gzip.open(os.path.join(GOLDEN_DIRECTORY, f"Output_{os.path.basename(input_path)}.gz"), 'rb') as f:
+        return f.read()
+
+def normalize_newlines(data):
+    # 従来の to_csv は os.linesep で改行するため、改行コードをそろえて比較する
+    return data.replace(b'\r\n', b'\n')
+
+@pytest.mark.parametrize('writer', WRITERS)
+@pytest.mark.parametrize('engine', PIVOT_ENGINES)
+def test_output_matches_golden(tmp_path, engine, writer):
+    csv_dir = tmp_path / 'CSV'
+    csv_dir.mkdir()
+    for input_path in GOLDEN_INPUTS:
+        shutil.copy(input_path, csv_dir)
+
+    pivot = CSVPivot(str(tmp_path), engine=engine, writer=writer, summary=False, cache=False,
+                     memory_limit=SMALL_MEMORY_LIMIT)
+    assert pivot.process_files()
+
+    for input_path in GOLDEN_INPUTS:
+        filename, ext = os.path.splitext(os.path.basename(input_path))
+        with open(tmp_path / 'OUTPUT' / f"Output_{filename}_1{ext}", 'rb') as f:
+            assert normalize_newlines(f.read()) == normalize_newlines(golden_output(input_path)), input_path
+
+@pytest.mark.parametrize('engine', ['numpy', 'pandas'])
+def test_frame_output_matches_golden(tmp_path, engine):
+    # 取り込みから結合結果をメモリ上で受け取る場合（pivot_frame）も同じ出力になる
+    pivot = CSVPivot(str(tmp_path), engine=engine, summary=False, cache=False)
+    for input_path in GOLDEN_INPUTS:
+        output_path = str(tmp_path / os.path.basename(input_path))
+        pivot.write_output(pivot.pivot_frame(pd.read_csv(input_path, encoding='cp932')), output_path)
+        with open(output_path, 'rb') as f:
+            assert normalize_newlines(f.read()) == normalize_newlines(golden_output(input_path)), input_path
+
+def test_narrow_file_column_plan():
+    input_path = os.path.join(GOLDEN_DIRECTORY, 'input', '2025-01-11_InspectionLOG.CSV')
+    width = len(pd.read_csv(input_path, usecols=[0])) + 1
+    assert width < MOVE_FROM
+
+    header = golden_output(input_path).split(b'\n', 1)[0].rstrip(b'\r').decode('cp932')
+    assert ','.join(map(str, column_plan(width).output_columns)) == header
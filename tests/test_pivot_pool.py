@@ -0,0 +1,82 @@
+"""プロセスプールでのピボット（CSVPivot.process_files_in_pool）の失敗時の扱いの確認"""
+import os
+import shutil
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import src.csvpivot
+from src.csvpivot import CSVPivot
+from tests.test_pivot_golden import TEST_DATA, golden_output, normalize_newlines
+
+INPUTS = sorted(os.listdir(os.path.join(TEST_DATA, 'CSV_LOG')))
+
+def make_base(tmp_path, broken_file=None):
+    csv_dir = tmp_path / 'CSV'
+    csv_dir.mkdir()
+    for name in INPUTS:
+        shutil.copy(os.path.join(TEST_DATA, 'CSV_LOG', name), csv_dir)
+    if broken_file is not None:
+        # 読み込めない（OSError になる）ファイル。プールが使えない場合と区別して扱う必要がある
+        (csv_dir / broken_file).mkdir()
+    return CSVPivot(str(tmp_path), pivot_mode='process', max_workers=2, summary=False, cache=False)
+
+def assert_outputs_match_golden(tmp_path):
+    for name in INPUTS:
+        filename, ext = os.path.splitext(name)
+        with open(tmp_path / 'OUTPUT' / f"Output_{filename}_1{ext}", 'rb') as f:
+            assert normalize_newlines(f.read()) == normalize_newlines(golden_output(name)), name
+    assert sorted(os.listdir(tmp_path / 'PROCESSED')) == INPUTS
+
+class BreakingExecutor:
+    """最初のジョブだけを実行し、以降はワーカーが異常終了した（BrokenProcessPool）ことにする"""
+
+    def __init__(self, max_workers):
+        self.submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, options, input_path, output_path, summary_path):
+        future = Future()
+        self.submitted += 1
+        if self.submitted == 1:
+            future.set_result(function(options, input_path, output_path, summary_path))
+        else:
+            # 異常終了したワーカーの書きかけの出力
+            with open(output_path, 'w') as f:
+                f.write('partial')
+            future.set_exception(BrokenProcessPool('worker died'))
+        return future
+
+def test_file_error_is_not_retried_serially(tmp_path, capsys):
+    pivot = make_base(tmp_path, broken_file='2024-12-17a_InspectionLOG.CSV')
+    assert not pivot.process_files()
+
+    output = capsys.readouterr().out
+    assert '処理中にエラーが発生しました' in output
+    assert '逐次処理に切り替え' not in output
+    # 失敗したファイルより前だけが処理済みになり、以降の出力は残らない
+    assert os.listdir(tmp_path / 'PROCESSED') == [INPUTS[0]]
+    assert os.listdir(tmp_path / 'OUTPUT') == ['Output_2024-12-17_InspectionLOG_1.CSV']
+
+def test_broken_pool_falls_back_to_serial(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(src.csvpivot, 'ProcessPoolExecutor', BreakingExecutor)
+    pivot = make_base(tmp_path)
+    assert pivot.process_files()
+
+    assert 'ワーカープロセスが異常終了したため' in capsys.readouterr().out
+    assert_outputs_match_golden(tmp_path)
+
+def test_pool_creation_failure_falls_back_to_serial(tmp_path, monkeypatch, capsys):
+    def fail(max_workers):
+        raise OSError('no semaphores')
+
+    monkeypatch.setattr(src.csvpivot, 'ProcessPoolExecutor', fail)
+    pivot = make_base(tmp_path)
+    assert pivot.process_files()
+
+    assert 'プロセスプールを作成できないため' in capsys.readouterr().out
+    assert_outputs_match_golden(tmp_path)
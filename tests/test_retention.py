@@ -0,0 +1,121 @@
+"""保持期間インデックス（src.retention）の登録・削除・反映とロックの確認"""
+import json
+import os
+import threading
+
+import pytest
+
+import src.retention
+from src.retention import IndexFileLock, RetentionIndex, RetentionPolicy
+
+def make_file(directory, name, size, mtime):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+def assert_consistent(index, directory):
+    """インデックスが作成時刻順で、合計サイズがファイルの一覧と一致すること"""
+    record = index.directories[index.directory_key(directory)]
+    assert [item[1] for item in record['files']] == sorted(item[1] for item in record['files'])
+    assert record['total_bytes'] == sum(item[2] for item in record['files'])
+    on_disk = sorted(name for name in os.listdir(directory) if not name.startswith('.'))
+    assert sorted(item[0] for item in record['files']) == on_disk
+    assert record['total_bytes'] == sum(os.path.getsize(os.path.join(directory, name)) for name in on_disk)
+
+def test_index_is_kept_outside_the_base_directory(tmp_path):
+    index = RetentionIndex(str(tmp_path / 'base'))
+    assert os.path.commonpath([index.index_path, str(tmp_path / 'local_cache')]) == str(tmp_path / 'local_cache')
+    assert index.index_path != RetentionIndex(str(tmp_path / 'other')).index_path
+
+def test_register_forget_apply_keep_total_bytes(tmp_path):
+    directory = tmp_path / 'base' / 'OUTPUT'
+    directory.mkdir(parents=True)
+    index = RetentionIndex(str(tmp_path / 'base'))
+    paths = [make_file(str(directory), f'Output_{number}.csv', number * 10, 1000 + number) for number in range(1, 7)]
+    # 移動してきた古いファイル・同じファイルの再登録・削除したファイル
+    paths.append(make_file(str(directory), 'old.csv', 5, 500))
+    for path in paths:
+        index.register(path)
+    index.register(paths[2])
+    os.remove(paths[3])
+    index.forget([paths[3]])
+
+    # 登録・削除はジャーナルに追記するだけで、インデックスは書き直さない
+    assert not os.path.exists(index.index_path)
+    with open(index.journal_path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 9
+
+    deleted = index.apply({str(directory): RetentionPolicy(max_age_days=1, max_total_bytes=120)}, now=1003 + 86400)
+    assert deleted == [paths[6], paths[0], paths[1], paths[2]]
+    assert not os.path.exists(index.journal_path)
+    assert_consistent(index, str(directory))
+
+    # 保存したインデックスを別のインスタンスから読んでも同じ内容になる
+    reloaded = RetentionIndex(str(tmp_path / 'base'))
+    with reloaded.lock, reloaded.locked():
+        reloaded.load()
+    assert reloaded.directories == index.directories
+
+def test_unregistered_directory_is_scanned(tmp_path):
+    directory = tmp_path / 'base' / 'PROCESSED'
+    directory.mkdir(parents=True)
+    old = make_file(str(directory), 'a.csv', 10, 100)
+    index = RetentionIndex(str(tmp_path / 'base'))
+    index.register(make_file(str(directory), 'b.csv', 20, 200))
+
+    assert index.apply({str(directory): RetentionPolicy(max_total_bytes=20)}, now=300) == [old]
+    assert_consistent(index, str(directory))
+
+def test_journal_is_compacted_when_it_grows(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.retention, 'JOURNAL_COMPACT_BYTES', 500)
+    directory = tmp_path / 'base' / 'OUTPUT'
+    directory.mkdir(parents=True)
+    index = RetentionIndex(str(tmp_path / 'base'))
+    for number in range(20):
+        index.register(make_file(str(directory), f'Output_{number}.csv', 10, 1000 + number))
+        assert not os.path.exists(index.journal_path) or os.path.getsize(index.journal_path) <= 500 + 200
+
+    with open(index.index_path, encoding='utf-8') as f:
+        assert json.load(f)['directories']['OUTPUT']['files']
+    index.apply({}, now=2000)
+    assert_consistent(index, str(directory))
+
+def test_torn_journal_line_is_ignored(tmp_path):
+    directory = tmp_path / 'base' / 'OUTPUT'
+    directory.mkdir(parents=True)
+    index = RetentionIndex(str(tmp_path / 'base'))
+    index.register(make_file(str(directory), 'Output_1.csv', 10, 1000))
+    with open(index.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "direc')
+
+    assert index.apply({str(directory): RetentionPolicy()}, now=2000) == []
+    assert_consistent(index, str(directory))
+
+def test_concurrent_registrations_are_not_lost(tmp_path):
+    directory = tmp_path / 'base' / 'OUTPUT'
+    directory.mkdir(parents=True)
+    paths = [make_file(str(directory), f'Output_{number}.csv', number, 1000 + number) for number in range(1, 41)]
+    # 処理段ごとのインスタンスがそれぞれのスレッドから登録する
+    indexes = [RetentionIndex(str(tmp_path / 'base')) for _ in range(4)]
+    threads = [threading.Thread(target=lambda i=i: [indexes[i].register(path) for path in paths[i::4]])
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    indexes[0].apply({str(directory): RetentionPolicy()}, now=2000)
+    assert_consistent(indexes[0], str(directory))
+    assert len(indexes[0].directories['OUTPUT']['files']) == 40
+
+def test_index_file_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / 'state' / 'retention_index.json.lock')
+    with IndexFileLock(path):
+        # 同じファイルを別に開いたロックは取れない（fcntl.flock / msvcrt.locking はハンドルごと）
+        with pytest.raises(TimeoutError):
+            with IndexFileLock(path, timeout=0.1):
+                pass
+    with IndexFileLock(path, timeout=0.1):
+        pass
@@ -0,0 +1,79 @@
+"""連番付きファイル名の確保（src.sequence）の確認"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.sequence import (RESERVATION_TIMEOUT, allocate_filename, read_hints, release_filename,
+                          reservation_path, sequence_hints_path)
+
+def make_output_name(number):
+    return f"Output_{number}.csv"
+
+def allocate_in_process(directory, hint_path):
+    return allocate_filename(directory, make_output_name, start=1, hint_path=hint_path)
+
+def test_concurrent_callers_get_different_names(tmp_path):
+    directory = str(tmp_path / 'OUTPUT')
+    hint_path = sequence_hints_path(str(tmp_path))
+    names = []
+    barrier = threading.Barrier(8)
+
+    def allocate():
+        barrier.wait()
+        names.append(allocate_filename(directory, make_output_name, start=1, hint_path=hint_path))
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 別のプロセスからも、確保中の名前とは重ならない
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        names += list(executor.map(allocate_in_process, [directory] * 2, [hint_path] * 2))
+
+    assert len(set(names)) == 10
+    # 保存先には確保中の印だけがあり、Output_ の検索には現れない
+    assert all(name.startswith('.') and name.endswith('.lock') for name in os.listdir(directory))
+
+def test_saved_and_reserved_names_are_skipped(tmp_path):
+    directory = tmp_path / 'CSV'
+    directory.mkdir()
+    (directory / 'Output_1.csv').write_text('saved')
+    first = allocate_filename(str(directory), make_output_name, start=1)
+    assert first == 'Output_2.csv'
+    assert allocate_filename(str(directory), make_output_name, start=1) == 'Output_3.csv'
+
+    # 解除した名前は、保存していなければ再び使える
+    release_filename(str(directory / first))
+    assert not os.path.exists(reservation_path(str(directory / first)))
+    assert allocate_filename(str(directory), make_output_name, start=1) == first
+
+def test_stale_reservation_is_reclaimed(tmp_path):
+    directory = tmp_path / 'CSV'
+    directory.mkdir()
+    stale = reservation_path(str(directory / 'Output_1.csv'))
+    fresh = reservation_path(str(directory / 'Output_2.csv'))
+    for lock_path in (stale, fresh):
+        open(lock_path, 'w').close()
+    old = time.time() - RESERVATION_TIMEOUT - 60
+    os.utime(stale, (old, old))
+
+    # 24時間より古い印は異常終了で残ったものとみなして取り直し、新しい印は避ける
+    assert allocate_filename(str(directory), make_output_name, start=1) == 'Output_1.csv'
+    assert os.path.getmtime(stale) > old
+    assert allocate_filename(str(directory), make_output_name, start=1) == 'Output_3.csv'
+
+def test_hints_skip_to_the_next_number(tmp_path):
+    directory = str(tmp_path / 'OUTPUT')
+    hint_path = sequence_hints_path(str(tmp_path))
+    assert not hint_path.startswith(str(tmp_path / 'OUTPUT'))
+    for number in range(1, 4):
+        name = allocate_filename(directory, make_output_name, start=1, hint_path=hint_path)
+        open(os.path.join(directory, name), 'w').close()
+        release_filename(os.path.join(directory, name))
+    assert list(read_hints(hint_path).values()) == [4]
+
+    # 記録が古くても（他の利用者が保存した場合など）既存のファイルを確認して進める
+    open(os.path.join(directory, 'Output_4.csv'), 'w').close()
+    assert allocate_filename(directory, make_output_name, start=1, hint_path=hint_path) == 'Output_5.csv'
@@ -0,0 +1,45 @@
+"""シートごとにまとめて転記する方式（SheetCursor / write_block_to_sheet）と1セルずつの転記を比較する"""
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from src.csvtoxlsxconverter import SheetCursor, find_start_row, write_block_to_sheet, write_data_to_sheet
+from tests.test_xlsm_package import make_template, sheet_contents
+
+def test_sheet_cursor_skips_rows_with_values(tmp_path):
+    template = str(tmp_path / 'template.xlsx')
+    make_template(template)
+    sheet = openpyxl.load_workbook(template)['LOG_Helmet']
+    # 2行目と4行目に値があり、3行目は書式だけのセル
+    cursor = SheetCursor(sheet, 2)
+    assert [cursor.next_row() for _ in range(3)] == [3, 5, 6]
+
+    empty = openpyxl.Workbook().active
+    assert SheetCursor(empty, 2).next_row() == 2
+
+@pytest.mark.parametrize('skip_missing', [False, True])
+def test_block_writer_matches_cell_by_cell(tmp_path, skip_missing):
+    template = str(tmp_path / 'template.xlsx')
+    make_template(template)
+    rows = pd.DataFrame([
+        [np.nan, 'HEL_TOP-1', 0.1, np.nan, -0.0],
+        [np.nan, 'HEL_TOP-2', 1e20, -0.5, np.nan],
+        [np.nan, 'HEL_TOP-3', 1.0, 2.0, 3.0],
+    ], columns=['New First Column', 'New Column', '1', '2', '3'])
+
+    # 従来の方式（行ごとに転記先の行を探して1セルずつ書き込む）
+    workbook = openpyxl.load_workbook(template)
+    sheet = workbook['LOG_Helmet']
+    for index in range(len(rows)):
+        write_data_to_sheet(sheet, rows.iloc[[index]], find_start_row(sheet, 2), 2, skip_missing=skip_missing)
+    workbook.save(tmp_path / 'cell.xlsx')
+
+    workbook = openpyxl.load_workbook(template)
+    write_block_to_sheet(workbook['LOG_Helmet'], rows.to_numpy(dtype=object).tolist(), 2, skip_missing=skip_missing)
+    workbook.save(tmp_path / 'block.xlsx')
+
+    # テンプレートの書式（C3 の太字・表示形式）は値を書き込んでも残る
+    contents = sheet_contents(tmp_path / 'block.xlsx')
+    assert contents['LOG_Helmet'][2][2] == (0.1, True, '0.000')
+    assert contents == sheet_contents(tmp_path / 'cell.xlsx')
@@ -0,0 +1,75 @@
+"""テンプレートのキャッシュ（src.template_cache）の複製と、テンプレートを直接読み込んだ結果を比較する"""
+import os
+import zipfile
+
+import openpyxl
+
+from src.csvtoxlsxconverter import fill_workbook
+from src.template_cache import TemplateCache
+from tests.test_xlsm_package import filtered_frame
+
+# 転記するデータ（filtered_frame）のシートがあるテンプレート
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), 'test_data', 'templates', 'ヘルメットグラフ作成.xlsm')
+
+def workbook_contents(path):
+    """セルの値と書式・シートの設定を比較用に取り出す
+
+    書式は一覧の位置（style_id）ではなく内容で比べる（複製は重複した書式の
+    項目をまとめて保存するため位置が変わる）。同じ位置の書式は内容も同じなので、
+    内容は位置ごとに一度だけ求める。
+    """
+    workbook = openpyxl.load_workbook(path)
+    styles = {}
+
+    def style(cell):
+        if cell.style_id not in styles:
+            styles[cell.style_id] = (cell.style, cell.number_format, repr(cell.font), repr(cell.fill),
+                                     repr(cell.border), repr(cell.alignment), repr(cell.protection))
+        return styles[cell.style_id]
+
+    contents = {}
+    for sheet in workbook.worksheets:
+        contents[sheet.title] = {
+            'cells': [[(cell.coordinate, cell.value, style(cell)) for cell in row] for row in sheet.iter_rows()],
+            'merged': sorted(str(cell_range) for cell_range in sheet.merged_cells.ranges),
+            'columns': {key: (dimension.width, dimension.hidden) for key, dimension in sheet.column_dimensions.items()},
+            'charts': len(sheet._charts),
+        }
+    contents['names'] = sorted(workbook.defined_names)
+    workbook.close()
+    with zipfile.ZipFile(path) as archive:
+        contents['parts'] = sorted(archive.namelist())
+        contents['vba'] = archive.read('xl/vbaProject.bin') if 'xl/vbaProject.bin' in archive.namelist() else None
+    return contents
+
+def test_cached_clone_saves_the_same_workbook(tmp_path):
+    template_path = TEMPLATE_PATH
+    cache = TemplateCache()
+    paths = []
+    # 1回目はテンプレートを読み込み、2回目以降は複製を使う（複製を書き換えても次の複製は変わらない）
+    for index in range(3):
+        workbook = cache.load(template_path)
+        fill_workbook(workbook, filtered_frame())
+        paths.append(str(tmp_path / f"{index}.xlsm"))
+        workbook.save(paths[-1])
+    assert cache.entries[os.path.abspath(template_path)].workbook_bytes is not None
+
+    workbook = openpyxl.load_workbook(template_path, keep_vba=True)
+    fill_workbook(workbook, filtered_frame())
+    workbook.save(tmp_path / 'direct.xlsm')
+
+    expected = workbook_contents(str(tmp_path / 'direct.xlsm'))
+    for path in paths:
+        assert workbook_contents(path) == expected
+
+def test_edited_template_is_reloaded(tmp_path):
+    template_path = str(tmp_path / 'template.xlsx')
+    workbook = openpyxl.Workbook()
+    workbook.active['A1'] = 'old'
+    workbook.save(template_path)
+    cache = TemplateCache()
+    assert cache.load(template_path).active['A1'].value == 'old'
+
+    workbook.active['A1'] = 'new value'
+    workbook.save(template_path)
+    assert cache.load(template_path).active['A1'].value == 'new value'
@@ -0,0 +1,68 @@
+"""監視モードの変更検出（src.watcher）と、変更が落ち着いたディレクトリの判定の確認"""
+import shutil
+import sys
+
+import pytest
+
+from src.watcher import InotifyWatcher, PollingWatcher, create_watcher, settled_directories
+
+def test_settled_directories_waits_for_quiet_period():
+    last_changed = {'S:/HIOKI8847': 10.0, 'U:/HIOKI8847': 12.0}
+    assert settled_directories(last_changed, 12.5, settle_time=3.0) == []
+    assert settled_directories(last_changed, 13.0, settle_time=3.0) == ['S:/HIOKI8847']
+    assert last_changed == {'U:/HIOKI8847': 12.0}
+
+    # 待っている間に変更があれば、そこから数え直す
+    last_changed['U:/HIOKI8847'] = 14.0
+    assert settled_directories(last_changed, 15.5, settle_time=3.0) == []
+    assert settled_directories(last_changed, 17.0, settle_time=3.0) == ['U:/HIOKI8847']
+    assert last_changed == {}
+
+def test_polling_watcher_detects_changes(tmp_path):
+    directory = tmp_path / 'HIOKI8847'
+    directory.mkdir()
+    watcher = PollingWatcher()
+    watcher.add(str(directory))
+    assert str(directory) in watcher
+    assert watcher.wait(0) == set()
+
+    (directory / '0001HEL_TOP.CSV').write_text('a')
+    assert watcher.wait(0) == {str(directory)}
+    assert watcher.wait(0) == set()
+
+    # 書き込み中のファイルのサイズが変わった
+    (directory / '0001HEL_TOP.CSV').write_text('abc')
+    assert watcher.wait(0) == {str(directory)}
+
+def test_polling_watcher_drops_removed_drive(tmp_path):
+    directory = tmp_path / 'HIOKI8847'
+    directory.mkdir()
+    watcher = PollingWatcher()
+    watcher.add(str(directory))
+    shutil.rmtree(directory)
+
+    assert watcher.wait(0) == {str(directory)}
+    assert str(directory) not in watcher
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify は Linux のみ')
+def test_inotify_watcher_detects_changes(tmp_path):
+    directory = tmp_path / 'HIOKI8847'
+    directory.mkdir()
+    watcher = InotifyWatcher()
+    try:
+        watcher.add(str(directory))
+        assert watcher.wait(0) == set()
+        (directory / '0001HEL_TOP.CSV').write_text('a')
+        assert watcher.wait(1.0) == {str(directory)}
+
+        shutil.rmtree(directory)
+        assert str(directory) in watcher.wait(1.0)
+        # 削除されたディレクトリは監視対象から外れ、次に接続されたときに追加し直す
+        watcher.wait(0.1)
+        assert str(directory) not in watcher
+    finally:
+        watcher.close()
+
+def test_create_watcher_falls_back_to_polling():
+    watcher = create_watcher(use_inotify=False)
+    assert isinstance(watcher, PollingWatcher)
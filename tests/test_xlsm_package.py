@@ -0,0 +1,73 @@
+"""転記するシートのXMLだけを作り直す出力（XlsmPackage）と openpyxl による出力を比較する"""
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font
+
+from src.csvtoxlsxconverter import fill_workbook, write_summary_sheet
+from src.xlsm_package import XlsmPackage
+
+def make_template(path):
+    """転記済みの行・書式・数式のあるテンプレート"""
+    workbook = openpyxl.Workbook()
+    workbook.active.title = 'グラフ'
+    workbook['グラフ']['A1'] = '=LOG_Helmet!C2*2'
+    sheet = workbook.create_sheet('LOG_Helmet')
+    sheet.append(['', 'サンプル名', 1, 2, 3])
+    sheet.append([None, 'HEL_TOP-0', 0.5, 0.25, 0.125])
+    sheet['C3'].font = Font(bold=True)
+    sheet['C3'].number_format = '0.000'
+    sheet['B4'] = 'HEL_TOP-old'
+    workbook.create_sheet('LOG_BaseBall')
+    workbook.save(path)
+
+def filtered_frame():
+    """転記するデータ（1列目は空欄、2列目のサンプル名で転記先のシートが決まる）"""
+    return pd.DataFrame([
+        [np.nan, 'HEL_TOP-1', 0.1, np.nan, -0.0],
+        [np.nan, 'BASEBALL-1', 1e-07, 2.0, 3.0],
+        [np.nan, 'HEL_TOP-2', 1e20, -0.5, np.nan],
+        [np.nan, 'HEL_<&"x">', 1.0, 2.0, 3.0],
+    ], columns=['New First Column', 'New Column', '1', '2', '3'])
+
+def sheet_contents(path):
+    workbook = openpyxl.load_workbook(path)
+    contents = {name: [[(cell.value, cell.font.bold, cell.number_format) for cell in row]
+                       for row in workbook[name].iter_rows()]
+                for name in workbook.sheetnames}
+    workbook.close()
+    return contents
+
+@pytest.mark.parametrize('skip_missing', [False, True])
+def test_package_writer_matches_openpyxl(tmp_path, skip_missing):
+    template = str(tmp_path / 'template.xlsx')
+    make_template(template)
+    summary = pd.DataFrame({'サンプル名': ['HEL_TOP-1', 'BASEBALL-1'], 'peak': [1.5, np.nan]})
+
+    workbook = openpyxl.load_workbook(template)
+    used = fill_workbook(workbook, filtered_frame(), skip_missing=skip_missing)
+    write_summary_sheet(workbook, summary)
+    workbook.save(tmp_path / 'openpyxl.xlsx')
+
+    package = XlsmPackage(template)
+    assert fill_workbook(package, filtered_frame(), skip_missing=skip_missing) == used
+    write_summary_sheet(package, summary)
+    package.save(str(tmp_path / 'package.xlsx'))
+    package.close()
+
+    assert sheet_contents(tmp_path / 'package.xlsx') == sheet_contents(tmp_path / 'openpyxl.xlsx')
+
+def test_package_writer_new_sheet_name(tmp_path):
+    template = str(tmp_path / 'template.xlsx')
+    make_template(template)
+    package = XlsmPackage(template)
+    package.create_sheet('A&B "x"')
+    package.append_rows('A&B "x"', [[' 前後に空白 ', 1, True], [None, 2.5, '<tag>']])
+    package.save(str(tmp_path / 'package.xlsx'))
+    package.close()
+
+    workbook = openpyxl.load_workbook(tmp_path / 'package.xlsx')
+    assert workbook.sheetnames == ['グラフ', 'LOG_Helmet', 'LOG_BaseBall', 'A&B "x"']
+    assert [list(row) for row in workbook['A&B "x"'].values] == [[' 前後に空白 ', 1, True], [None, 2.5, '<tag>']]
+    workbook.close()